@@ -0,0 +1,41 @@
+import sys
+import time
+sys.path.append('.')     # So that we can run this from the top directory
+
+from PIL import Image
+
+from gamehelper.image_sheet import ImageSheet
+
+
+# A 10x7 sheet of 250x350 cards, as for Tabletop Simulator, with flat
+# colours and some photographic texture
+
+sheet = ImageSheet(card_width = 250, card_height = 350, columns = 10, rows = 7)
+for i in range(70):
+    card = Image.new('RGBA', (250, 350), (i * 3, 120, 255 - i * 3, 255))
+    if i % 3 == 0:
+        card.paste(Image.effect_noise((150, 150), 40).convert('RGBA'), (50, 50))
+    sheet.add(card)
+
+settings = [('PNG',  {}),
+            ('PNG',  {'compress_level': 1}),
+            ('PNG',  {'compress_level': 9}),
+            ('PNG',  {'colours': 64}),
+            ('PNG',  {'workers': 2}),
+            ('PNG',  {'workers': 4}),
+            ('PNG',  {'workers': 4, 'compress_level': 1}),
+            ('WEBP', {}),
+            ('WEBP', {'quality': 95}),
+            ('JPEG', {'quality': 85}),
+            ]
+
+
+print(f'Saving a {sheet.columns}x{sheet.rows} sheet of 250x350 cards')
+print()
+print(f'{"Format":<6}  {"Options":<36}  {"Time":>8}  {"Size":>10}')
+
+for format, options in settings:
+    start = time.perf_counter()
+    data  = sheet.save(format = format, **options)
+    took  = time.perf_counter() - start
+    print(f'{format:<6}  {str(options):<36}  {took * 1000:>5.0f} ms  {len(data) // 1024:>7} KB')
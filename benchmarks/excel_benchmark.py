@@ -0,0 +1,54 @@
+import sys
+import timeit
+sys.path.append('.')     # So that we can run this from the top directory
+
+from openpyxl import Workbook
+
+from gamehelper.excelhelper import ExcelHelper
+
+
+# A card database of 5,000 rows and 12 columns, with a list down the side
+# and another across the top
+
+rows    = 5000
+columns = 12
+
+wb = Workbook()
+ws = wb.active
+for c in range(columns):
+    ws.cell(row = 3, column = c + 2, value = f'Field {c}')
+for r in range(rows):
+    for c in range(columns):
+        ws.cell(row = r + 4, column = c + 2, value = f'Card {r}' if c == 0 else r * c)
+ws['A1'] = 'Across'
+for c in range(200):
+    ws.cell(row = 1, column = c + 3, value = c)
+
+xh      = ExcelHelper(wb)
+costs   = xh.table_lookup('B3')
+names   = [f'Card {r % 98}' for r in range(5000)]
+table   = xh.vertical_table('B3')
+repeat  = 5
+methods = [('vertical_table',     lambda: xh.vertical_table('B3')),
+           ('vertical_dicts',     lambda: xh.vertical_dicts('B3')),
+           ('vertical_columns',   lambda: xh.vertical_columns('B3')),
+           ('find_values_below',  lambda: xh.find_values_below('B3')),
+           ('find_values_beside', lambda: xh.find_values_beside('A1')),
+           ('find x 50',          lambda: [xh.find(f'Card {r}') for r in range(50)]),
+           ('find_in_table x 5000',
+                                  lambda: [xh.find_value_in_table('B3', name, 'Field 5') for name in names]),
+           ('table_lookup x 5000',
+                                  lambda: [costs.value(name, 'Field 5') for name in names]),
+           ('put_values_below x 12',
+                                  lambda: [ExcelHelper(Workbook()).put_values_below('A1', [row[c] for row in table])
+                                           for c in range(columns)]),
+           ('put_table',          lambda: ExcelHelper(Workbook()).put_table('A1', table)),
+           ]
+
+
+print(f'Reading a table of {rows} rows and {columns} columns, best of {repeat}')
+print()
+
+for name, method in methods:
+    took = min(timeit.repeat(method, number = 1, repeat = repeat))
+    print(f'{name:<20}  {took * 1000:>8.1f} ms')
@@ -0,0 +1,29 @@
+import sys
+import timeit
+sys.path.append('.')     # So that we can run this from the top directory
+
+from PIL import Image
+
+from gamehelper.utils import resampling_policies, resize
+
+
+# A print-resolution card (63x88mm at 600dpi) scaled for the screen
+
+card   = Image.effect_noise((1488, 2079), 60).convert('RGBA')
+sizes  = [(744, 1040),    # Half size
+          (250, 350),     # About a sixth, for Screentop and the like
+          (63, 88),       # A thumbnail
+          ]
+repeat = 5
+
+
+print(f'Resizing a {card.width}x{card.height} card, best of {repeat}')
+print()
+print(f'{"Size":>10}  {"Pillow default":>14}' + ''.join(f'  {policy:>8}' for policy in resampling_policies))
+
+for size in sizes:
+    default = min(timeit.repeat(lambda: card.resize(size = size), number = 1, repeat = repeat))
+    times   = [min(timeit.repeat(lambda: resize(card, size, policy), number = 1, repeat = repeat))
+               for policy in resampling_policies]
+    print(f'{size[0]:>4}x{size[1]:<5}  {default * 1000:>11.1f} ms' +
+          ''.join(f'  {t * 1000:>5.1f} ms' for t in times))
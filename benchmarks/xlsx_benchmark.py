@@ -0,0 +1,80 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+sys.path.append('.')     # So that we can run this from the top directory
+
+from openpyxl import Workbook
+
+from gamehelper.excelhelper import ExcelHelper
+
+
+# A card database of 5,000 rows and 12 columns, and another sheet of
+# settings, saved to a file
+
+rows    = 5000
+columns = 12
+
+wb = Workbook()
+ws = wb.active
+ws.title = 'Cards'
+for c in range(columns):
+    ws.cell(row = 3, column = c + 2, value = f'Field {c}')
+for r in range(rows):
+    for c in range(columns):
+        ws.cell(row = r + 4, column = c + 2, value = f'Card {r}' if c == 0 else r * c)
+settings = wb.create_sheet('Settings')
+settings['A1'] = 'Title'
+settings['B1'] = 'My game'
+
+folder    = tempfile.mkdtemp()
+filename  = os.path.join(folder, 'cards.xlsx')
+cache_dir = os.path.join(folder, 'cache')
+wb.save(filename)
+
+
+def startup(options: dict) -> float:
+    """
+    Time a fresh Python importing ExcelHelper and reading one setting.
+    """
+    args   = ''.join(f', {name} = {value!r}' for name, value in options.items())
+    script = ('import sys; sys.path.append(".");'
+              'from gamehelper.excelhelper import ExcelHelper;'
+              f'xh = ExcelHelper({filename!r}{args});'
+              'xh.wb.active = xh.wb["Settings"];'
+              'xh.find_value_beside("Title")')
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', script], check = True)
+    return time.perf_counter() - start
+
+
+def load(options: dict) -> float:
+    """
+    Time loading the workbook and reading the whole card table.
+    """
+    start = time.perf_counter()
+    xh = ExcelHelper(filename, **options)
+    xh.vertical_dicts('B3')
+    xh.close()
+    return time.perf_counter() - start
+
+
+repeat = 5
+
+print(f'Reading a workbook with {rows} rows and {columns} columns, best of {repeat}')
+print()
+print(f'{"Reader":<12}  {"Startup":>9}  {"Load table":>10}')
+
+readers = [('openpyxl',    {}),
+           ('values_only', {'values_only': True}),
+           ('cached',      {'values_only': True, 'cache_dir': cache_dir}),
+           ]
+
+for name, options in readers:
+    started = min(startup(options) for _ in range(repeat))
+    loaded  = min(load(options) for _ in range(repeat))
+    print(f'{name:<12}  {started * 1000:>6.0f} ms  {loaded * 1000:>7.0f} ms')
+
+shutil.rmtree(folder)
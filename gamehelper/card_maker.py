@@ -22,14 +22,15 @@ class CardMaker:
     _DEFAULT_TEXT_LINE_SPACING_MM = 1.5
 
     def __init__(self,
-                 width:    float,
-                 height:   float,
-                 width_mm: float | None              = None,
-                 width_px: int | None                = None,
-                 gutter:   float                     = 0,
-                 image:    Image.Image | None        = None,
-                 colour:   tuple[int, int, int, int] = (0, 0, 0, 0),
-                 unit:     str | None                = None,
+                 width:      float,
+                 height:     float,
+                 width_mm:   float | None              = None,
+                 width_px:   int | None                = None,
+                 gutter:     float                     = 0,
+                 image:      Image.Image | None        = None,
+                 colour:     tuple[int, int, int, int] = (0, 0, 0, 0),
+                 unit:       str | None                = None,
+                 resampling: str                       = 'fast',
                  ) -> None:
         """
         A maker for card with the given dimensions, excluding the gutter.
@@ -38,20 +39,24 @@ class CardMaker:
         Values are converted to ints.
         The cards will be transparent by default.
         We must specify the default unit of these and future length parameters.
+        Images are resized with the `resampling` policy, which is `'draft'`,
+        `'fast'` or `'final'`; see `utils.resize()`.
         """
 
         if unit is None:
             raise ValueError('Must specify the unit being used')
         if not(unit in ['px', 'mm']):
             raise ValueError(f"Unit must be px or mm, but got '{unit}'")
+        utils.check_resampling(resampling)
 
-        self._width    = width
-        self._width_px = width_px
-        self._width_mm = width_mm
+        self._width      = width
+        self._width_px   = width_px
+        self._width_mm   = width_mm
 
-        self._height   = height
-        self._gutter   = gutter
-        self._unit     = unit
+        self._height     = height
+        self._gutter     = gutter
+        self._unit       = unit
+        self._resampling = resampling
 
         self._set_unit_properties()
 
@@ -481,7 +486,6 @@ class CardMaker:
 
         else:
             im = Image.open(filename)
-            im = im.convert('RGBA')
 
         # We may need to resize it.
         # If it's an SVG we have to resize it as we (re)load it.
@@ -502,7 +506,14 @@ class CardMaker:
 
         elif resize:
             # NB: Suspected error here! size is not necessarily in px.
-            im = im.resize(size = size_px)
+            # For a draft, let a JPEG decode at a fraction of its size, but
+            # no smaller than we need.
+            if self._resampling == 'draft':
+                im.draft(None, size_px)
+            im = utils.resize(im.convert('RGBA'), size_px, self._resampling)
+
+        elif not(is_svg):
+            im = im.convert('RGBA')
 
         return im
 
@@ -559,7 +570,7 @@ class CardMaker:
             im = im_or_filename
             (resize, size_px) = self.need_resize_px(im, size, width, height)
             if resize:
-                im = im.resize(size = size_px)
+                im = utils.resize(im, size_px, self._resampling)
 
         # Switch to pixels
 
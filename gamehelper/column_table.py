@@ -0,0 +1,247 @@
+import datetime
+import operator
+import sys
+from array           import array
+from collections.abc import Callable, Iterator, Mapping, Sequence
+
+
+class ColumnRow(Mapping):
+    """
+    A row of a `ColumnTable`. It behaves like a read-only dict of the
+    row's values, keyed by the table's headers, but holds only the table
+    and the row's index.
+    """
+
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table: 'ColumnTable', index: int) -> None:
+        self._table = table
+        self._index = index
+
+
+    def __getitem__(self, header: str | float | int | datetime.datetime) -> str | float | int | datetime.datetime:
+        table = self._table
+        return table._columns[table._positions[header]][self._index]
+
+
+    def __iter__(self) -> Iterator[str | float | int | datetime.datetime]:
+        return iter(self._table._positions)
+
+
+    def __len__(self) -> int:
+        return len(self._table._positions)
+
+
+    def __repr__(self) -> str:
+        return f'ColumnRow({dict(self)!r})'
+
+
+class ColumnTable(object):
+    """
+    A table held as one sequence per column, rather than as a dict per row.
+    A column of whole numbers is an `array` of 64-bit ints, and a column of
+    floats an `array` of doubles. Other columns are lists, with their
+    strings interned so each different string is held only once.
+
+    Iterating over the table, or indexing it, gives `ColumnRow`s, which
+    behave like the dicts of `ExcelHelper.vertical_dicts()`.
+
+    Tables from `select()`, `filter()` and `group_by()` share their columns
+    with the table they came from, rather than copying them.
+    """
+
+    def __init__(self,
+                 headers: Sequence[str | float | int | datetime.datetime],
+                 columns: Sequence[Sequence[str | float | int | datetime.datetime]],
+                 ) -> None:
+        """
+        Make a table with the given headers and a column of values for each.
+        The columns must all be the same length. As with a dict, if a
+        header is repeated the last column with it is the one that's used.
+        """
+        if len(headers) != len(columns):
+            raise ValueError(f'{len(headers)} headers but {len(columns)} columns')
+        if len(set(len(column) for column in columns)) > 1:
+            raise ValueError('Columns must all be the same length')
+
+        self.headers    = list(headers)
+        self._columns   = [_compact(column) for column in columns]
+        self._positions = {header: i for i, header in enumerate(self.headers)}
+
+        # The indexes of this table's rows in the columns, or None if it
+        # has all of them
+
+        self._rows = None
+
+
+    def __len__(self) -> int:
+        if self._rows is None:
+            return len(self._columns[0]) if self._columns else 0
+        return len(self._rows)
+
+
+    def __getitem__(self, index: int) -> ColumnRow:
+        rows = range(len(self)) if self._rows is None else self._rows
+        try:
+            return ColumnRow(self, rows[index])
+        except IndexError:
+            raise IndexError('ColumnTable index out of range')
+
+
+    def __iter__(self) -> Iterator[ColumnRow]:
+        rows = range(len(self)) if self._rows is None else self._rows
+        for index in rows:
+            yield ColumnRow(self, index)
+
+
+    def __repr__(self) -> str:
+        return f'<ColumnTable of {len(self)} rows, columns {self.headers!r}>'
+
+
+    def column(self, header: str | float | int | datetime.datetime) -> Sequence[str | float | int | datetime.datetime]:
+        """
+        The values in the column with the given header.
+        """
+        if not(header in self._positions):
+            raise LookupError(f'No column {header} in table')
+
+        column = self._columns[self._positions[header]]
+        if self._rows is None:
+            return column
+        return _take(column, self._rows)
+
+
+    def to_dicts(self) -> list[dict[str | float | int | datetime.datetime,
+                                    str | float | int | datetime.datetime]]:
+        """
+        The rows as a list of dicts, just as from `ExcelHelper.vertical_dicts()`.
+        """
+        columns = [self.column(header) for header in self.headers]
+        return [dict(zip(self.headers, values)) for values in zip(*columns)]
+
+
+    def select(self, *headers: str | float | int | datetime.datetime) -> 'ColumnTable':
+        """
+        A table of just the columns with the given headers, in that order.
+        """
+        for header in headers:
+            if not(header in self._positions):
+                raise LookupError(f'No column {header} in table')
+
+        table = ColumnTable.__new__(ColumnTable)
+        table.headers    = list(headers)
+        table._columns   = [self._columns[self._positions[header]] for header in headers]
+        table._positions = {header: i for i, header in enumerate(table.headers)}
+        table._rows      = self._rows
+        return table
+
+
+    def filter(self,
+               predicate: Callable[[ColumnRow], bool] | None = None,
+               **tests:   str | float | int | datetime.datetime | Callable[[str | float | int | datetime.datetime], bool],
+               ) -> 'ColumnTable':
+        """
+        A table of the rows for which `predicate` is true, and which pass
+        the tests given by keyword for their columns. A test is a value the
+        column must equal, or a function of the column's value which must
+        be true. For example
+        ```
+        spells = table.filter(Type = 'Spell')
+        cheap  = spells.filter(Cost = lambda cost: cost < 3)
+        big    = table.filter(lambda row: row['Cost'] * row['Power'] > 20)
+        ```
+        Keyword tests are much quicker than a predicate, as they read just
+        their columns.
+        """
+        rows = self._rows
+
+        for header, test in tests.items():
+            if not(header in self._positions):
+                raise LookupError(f'No column {header} in table')
+
+            column = self._columns[self._positions[header]]
+            if rows is None:
+                rows = range(len(column))
+
+            if callable(test):
+                rows = [i for i in rows if test(column[i])]
+            else:
+                rows = [i for i in rows if column[i] == test]
+
+        if not(predicate is None):
+            rows = range(len(self)) if rows is None else rows
+            rows = [i for i in rows if predicate(ColumnRow(self, i))]
+
+        return self._with_rows(rows)
+
+
+    def group_by(self, header: str | float | int | datetime.datetime) -> dict[str | float | int | datetime.datetime,
+                                                                              'ColumnTable']:
+        """
+        Split the table by the values in the column with the given header.
+        Returns a dict from each value to a table of the rows with that
+        value, in the order each value first appears.
+        """
+        if not(header in self._positions):
+            raise LookupError(f'No column {header} in table')
+
+        column = self._columns[self._positions[header]]
+        groups = {}
+        if self._rows is None:
+            for i, value in enumerate(column):
+                groups.setdefault(value, []).append(i)
+        else:
+            for i in self._rows:
+                groups.setdefault(column[i], []).append(i)
+
+        return {value: self._with_rows(rows) for value, rows in groups.items()}
+
+
+    def _with_rows(self, rows: list[int] | None) -> 'ColumnTable':
+        """
+        A table sharing this one's columns, but with just the given rows.
+        """
+        table = ColumnTable.__new__(ColumnTable)
+        table.headers    = self.headers
+        table._columns   = self._columns
+        table._positions = self._positions
+        table._rows      = rows
+        return table
+
+
+def _take(column: array | list, rows: list[int]) -> array | list:
+    """
+    The values in a column at the given rows, as the same type of column.
+    """
+
+    # itemgetter() picks out many items at once, but gives a single item
+    # rather than a tuple if there's only one
+
+    if len(rows) == 0:
+        values = ()
+    elif len(rows) == 1:
+        values = (column[rows[0]],)
+    else:
+        values = operator.itemgetter(*rows)(column)
+
+    if isinstance(column, array):
+        return array(column.typecode, values)
+    return list(values)
+
+
+def _compact(values: Sequence[str | float | int | datetime.datetime]) -> array | list:
+    """
+    Make a column of values as compact as possible: an array if they're
+    all ints or all floats, or else a list with the strings interned.
+    """
+    types = set(type(value) for value in values)
+
+    if types == {int}:
+        try:
+            return array('q', values)
+        except OverflowError:
+            pass
+    elif types == {float}:
+        return array('d', values)
+
+    return [sys.intern(value) if type(value) is str else value for value in values]
@@ -1,9 +1,23 @@
+from __future__ import annotations
+
+import bisect
 import datetime
+import hashlib
+import itertools
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from typing          import TYPE_CHECKING
+
+from .column_table import ColumnTable
+from .table_lookup import TableLookup
+from .xlsx_reader  import XLSXWorkbook, coordinate_to_tuple, open_workbook, range_boundaries
 
-import openpyxl
+# OpenPyXL is slow to import, so it's only imported when a workbook is
+# loaded with it
 
-from openpyxl           import Workbook
-from openpyxl.cell.cell import Cell
+if TYPE_CHECKING:
+    from openpyxl           import Workbook
+    from openpyxl.cell.cell import Cell
+    from openpyxl.worksheet.worksheet import Worksheet
 
 
 class ExcelHelper(object):
@@ -24,18 +38,72 @@ class ExcelHelper(object):
     """
 
 
-    def __init__(self, wb_or_filename: Workbook | str) -> None:
+    def __init__(self,
+                 wb_or_filename: Workbook | XLSXWorkbook | str,
+                 read_only:      bool                      = False,
+                 values_only:    bool                      = False,
+                 cache_dir:      str | None                = None,
+                 write_only:     bool                      = False,
+                 ) -> None:
         """
         Call this with an OpenPyXL Workbook object or a string filename.
+
+        ## Parameters
+
+        - `read_only`: If given a filename, open the workbook in OpenPyXL's
+          read-only mode. Cells are then parsed as they are read, rather
+          than all at once when the workbook is loaded, so memory stays flat
+          however big the sheets are. This suits `iter_vertical_table()`
+          and `iter_vertical_dicts()`. The `put_...()` methods can't be used,
+          and `close()` should be called when done to close the file.
+        - `values_only`: If given a filename, read it with the lightweight
+          `XLSXWorkbook` rather than OpenPyXL. This is much quicker to
+          import and to load, but reads only cell values, so formulas give
+          the values Excel last calculated. Values can be put into cells,
+          but the workbook can't be saved.
+        - `cache_dir`: If given with `values_only`, keep a snapshot of the
+          workbook's values in this directory, and read that instead of the
+          file next time, if the file hasn't changed. See `open_workbook()`
+          in `gamehelper.xlsx_reader`.
+        - `write_only`: If given a filename, make a new workbook to be saved
+          there by `save()`, in OpenPyXL's write-only mode. Rows are written
+          to the file as they're put, so a big report takes little memory.
+          Only the `put_...()` methods can be used, and each worksheet must
+          be written from the top down. See `put_table()`.
         """
-        if type(wb_or_filename) is str:
+        if not(cache_dir is None) and not(values_only):
+            raise ValueError('A cache_dir can only be used with values_only')
+        if write_only and (read_only or values_only):
+            raise ValueError("A workbook can't be write_only as well as read_only or values_only")
+
+        self._filename = wb_or_filename if type(wb_or_filename) is str else None
+
+        if type(wb_or_filename) is str and write_only:
+            import openpyxl
+
+            wb = openpyxl.Workbook(write_only = True)
+            wb.create_sheet()
+            self._wb = wb
+        elif type(wb_or_filename) is str and values_only:
             filename = wb_or_filename
-            wb       = openpyxl.reader.excel.load_workbook(filename)
+            self._wb = open_workbook(filename, cache_dir)
+        elif type(wb_or_filename) is str:
+            import openpyxl
+
+            filename = wb_or_filename
+            wb       = openpyxl.reader.excel.load_workbook(filename, read_only = read_only)
             self._wb = wb
         else:
             wb       = wb_or_filename
             self._wb = wb
 
+        # Indexes of values for find(), by worksheet. See _index().
+        self._indexes = {}
+
+        # The row being written on each write-only worksheet. See _stream_rows().
+        self._streams = {}
+        self._saved   = False    # Whether a write-only workbook has been saved
+
 
     @property
     def wb(self):
@@ -45,15 +113,44 @@ class ExcelHelper(object):
         return self._wb
 
 
+    def close(self) -> None:
+        """
+        Close the workbook's file. Only needed if the workbook was opened
+        read-only or values-only.
+        """
+        self._wb.close()
+
+
+    def save(self, filename: str | None = None) -> None:
+        """
+        Save the workbook to the given file, or else to the file it was
+        opened from. A write-only workbook can only be saved once.
+        """
+        if filename is None:
+            filename = self._filename
+        if filename is None:
+            raise ValueError('No filename to save the workbook to')
+        if self._saved:
+            raise ValueError('A write-only workbook can only be saved once')
+
+        for ws, (row, values) in self._streams.items():
+            ws.append(values)
+        self._streams = {}
+
+        self._wb.save(filename)
+        self._saved = self._is_write_only()
+
+
     def cc(self, coordinate_or_cell: str | Cell) -> (str, Cell):
         """
         Given a coordinate (string) or cell (object) return both the
         coordinate and the cell.
         """
-        if type(coordinate_or_cell) is openpyxl.cell.cell.Cell:
-            return (coordinate_or_cell.coordinate, coordinate_or_cell)
+        if type(coordinate_or_cell) is str:
+            row, column = coordinate_to_tuple(coordinate_or_cell)
+            return (coordinate_or_cell, self._cell(self._wb.active, row, column))
         else:
-            return (coordinate_or_cell, self._wb.active[coordinate_or_cell])
+            return (coordinate_or_cell.coordinate, coordinate_or_cell)
 
 
     def down(self,
@@ -65,8 +162,8 @@ class ExcelHelper(object):
         in the active worksheet.
         """
 
-        coord, cell = self.cc(coordinate_or_cell)
-        return self._wb.active.cell(row = cell.row + count, column = cell.column)
+        row, column = self._row_column(coordinate_or_cell)
+        return self._cell(self._wb.active, row + count, column)
 
 
     def right(self,
@@ -78,49 +175,183 @@ class ExcelHelper(object):
         in the active worksheet.
         """
 
-        coord, cell = self.cc(coordinate_or_cell)
-        return self._wb.active.cell(row = cell.row, column = cell.column + count)
+        row, column = self._row_column(coordinate_or_cell)
+        return self._cell(self._wb.active, row, column + count)
 
 
     def find(self,
              value:  str | float | int | datetime.datetime,
-             column: int                                   = 100,
-             row:    int                                   = 100,
+             column: int | None                            = None,
+             row:    int | None                            = None,
              ) -> Cell:
         """
         Find the cell with the given value in the active workbook,
-        searching from the top left as far as the given row and column.
-        """
-        for c in range(1, column+1):
-            ws = self._wb.active
-            for r in range(1, row+1):
-                cell = ws.cell(column = c, row = r)
-                if cell.value == value:
-                    return cell
+        searching from the top left, down each column in turn. The search
+        may be limited to the given number of columns and rows.
 
-        raise LookupError(f'Could not find {value} within {col}umn columns and {row} rows')
+        Values are looked up in an index of the worksheet, which is built
+        the first time it's needed. Cells found in it are checked to still
+        have the value, and if none do it's rebuilt to be sure. See
+        `reindex()`.
+        """
+        ws = self._wb.active
+        c, r = self._find_position(value, column, row)
+        return ws.cell(row = r, column = c)
 
 
     def find_value_beside(self,
                           value:  str | float | int | datetime.datetime,
-                          column: int                                   = 100,
-                          row:    int                                   = 100,
+                          column: int | None                            = None,
+                          row:    int | None                            = None,
                           ) -> str | float | int | datetime.datetime:
         """
         Find the cell with the given value in the active workbook, and return
         the value of the cell to its right.
-        Will search from the top left as far as the given row and column.
+        Searches as for `find()`.
         """
-        for c in range(1, column+1):
-            ws = self._wb.active
-            for r in range(1, row+1):
-                cell = ws.cell(column = c, row = r)
-                if cell.value == value:
-                    return ws.cell(row = r, column = c+1).value
+        ws = self._wb.active
+        c, r = self._find_position(value, column, row)
+        return self._cell(ws, r, c+1).value
 
+
+    def _find_position(self,
+                       value:  str | float | int | datetime.datetime,
+                       column: int | None,
+                       row:    int | None,
+                       ) -> tuple[int, int]:
+        """
+        Find the (column, row) of the first cell with the given value, within
+        the given number of columns and rows if they're given.
+        """
+        ws = self._wb.active
+
+        # Empty cells aren't in the index, so search for them one by one
+
+        if value is None:
+            columns = column or ws.max_column
+            rows    = row or ws.max_row
+            for c in range(1, columns+1):
+                for r in range(1, rows+1):
+                    if self._cell(ws, r, c).value is None:
+                        return (c, r)
+        else:
+
+            # Cells may have been changed since the index was built, so if
+            # it has nothing for the value rebuild it, unless it's just
+            # been built. Read-only worksheets can't change.
+
+            before   = self._indexes.get(ws, (None, None))[1]
+            index    = self._index(ws)
+            position = self._indexed_position(ws, index, value, column, row)
+
+            if position is None and index is before and hasattr(ws, '_cells'):
+                self._indexes.pop(ws, None)
+                position = self._indexed_position(ws, self._index(ws), value, column, row)
+
+            if not(position is None):
+                return position
+
+        if column is None and row is None:
+            raise LookupError(f'Could not find {value}')
         raise LookupError(f'Could not find {value} within {column} columns and {row} rows')
 
 
+    def _indexed_position(self,
+                          ws:     Worksheet,
+                          index:  dict[str | float | int | datetime.datetime, list[tuple[int, int]]],
+                          value:  str | float | int | datetime.datetime,
+                          column: int | None,
+                          row:    int | None,
+                          ) -> tuple[int, int] | None:
+        """
+        The first (column, row) in the index for the value, within the given
+        number of columns and rows, whose cell still has the value, or
+        `None`. Positions whose cells have changed are dropped.
+        """
+        cells     = getattr(ws, '_cells', None)
+        positions = index.get(value, [])
+
+        for c, r in list(positions):
+            if not(cells is None):
+                cell = cells.get((r, c))
+                if cell is None or not(cell.value == value):
+                    positions.remove((c, r))
+                    continue
+            if (column is None or c <= column) and (row is None or r <= row):
+                return (c, r)
+
+        if not(positions):
+            index.pop(value, None)
+        return None
+
+
+    def _cell(self,
+              ws:     Worksheet,
+              row:    int,
+              column: int,
+              ) -> Cell:
+        """
+        Get a cell, as `ws.cell()` does. That adds the cell to the worksheet
+        if it's empty, so allow for that in the worksheet's index, which
+        would otherwise look stale and be rebuilt.
+        """
+        cells = getattr(ws, '_cells', None)
+        if cells is None or (row, column) in cells:
+            return ws.cell(row = row, column = column)
+
+        cell = ws.cell(row = row, column = column)
+        if ws in self._indexes:
+            count, index = self._indexes[ws]
+            if count == len(cells) - 1:
+                self._indexes[ws] = (len(cells), index)
+        return cell
+
+
+    def _index(self, ws: Worksheet) -> dict[str | float | int | datetime.datetime, list[tuple[int, int]]]:
+        """
+        Get the index of a worksheet, building it if need be. The index
+        maps each value to the (column, row) of the cells that have it,
+        in the order `find()` searches.
+        An index is rebuilt if the number of cells in its worksheet changes.
+        """
+        cells = getattr(ws, '_cells', None)
+        count = None if cells is None else len(cells)
+
+        if ws in self._indexes:
+            index_count, index = self._indexes[ws]
+            if index_count == count:
+                return index
+
+        index = {}
+        if cells is None:
+            for ws_row in ws.iter_rows():
+                for cell in ws_row:
+                    if not(cell.value is None):
+                        index.setdefault(cell.value, []).append((cell.column, cell.row))
+        else:
+            for (r, c), cell in cells.items():
+                if not(cell.value is None):
+                    index.setdefault(cell.value, []).append((c, r))
+
+        for positions in index.values():
+            positions.sort()
+
+        self._indexes[ws] = (count, index)
+        return index
+
+
+    def reindex(self) -> None:
+        """
+        Forget the indexes used by `find()` and `find_value_beside()`, so
+        they're rebuilt when next needed. The helper's own `put_...()`
+        methods keep the indexes up to date, and `find()` notices values
+        that have changed or gone. But if a value is changed some other way
+        to one that's also further on, `find()` may find the further one
+        until this is called.
+        """
+        self._indexes = {}
+
+
     def find_non_blank_below(self,
                              coordinate_or_cell: str | Cell,
                              ) -> Cell:
@@ -128,30 +359,21 @@ class ExcelHelper(object):
         Find the first non-blank cell below the given coordinate or cell.
         """
 
-        coord, cell = self.cc(coordinate_or_cell)
-
-        ws = self._wb.active
-        row = cell.row
-        col = cell.column
+        coord    = self._coordinate(coordinate_or_cell)
+        row, col = self._row_column(coordinate_or_cell)
 
+        ws    = self._wb.active
         limit = 100
-        max_row = row + limit
-        out = []
 
         # Move down to find where the first value is
 
-        found_value = False
-        cell = None
-
-        while not(found_value) and row < max_row:
-            row += 1
-            cell = ws.cell(row = row, column = col)
-            found_value = not(cell.value is None)
+        values = itertools.islice(self._values_down(row + 1, col), limit - 1)
 
-        if row == max_row:
-            raise(LookupError(f'No values found within {limit} rows of {coord}'))
+        for r, value in enumerate(values, row + 1):
+            if not(value is None):
+                return self._cell(ws, r, col)
 
-        return cell
+        raise(LookupError(f'No values found within {limit} rows of {coord}'))
 
 
     def find_values_below(self,
@@ -163,21 +385,15 @@ class ExcelHelper(object):
         some values.
         """
 
-        ws = self._wb.active
         cell = self.find_non_blank_below(coordinate_or_cell)
-        row = cell.row
-        col = cell.column
-        out = []
+        out  = []
 
-        # Move down, adding to our output, until we get an empty cell
+        # Read down, adding to our output, until we get an empty cell
 
-        found_blank = False
-
-        while not(found_blank):
-            out.append(cell.value)
-            row += 1
-            cell = ws.cell(row = row, column = col)
-            found_blank = (cell.value is None)
+        for val in self._values_down(cell.row, cell.column):
+            if val is None:
+                break
+            out.append(val)
 
         return out
 
@@ -191,15 +407,116 @@ class ExcelHelper(object):
         active workbook.
         """
 
-        coord, cell = self.cc(coordinate_or_cell)
-
+        row, col = self._row_column(coordinate_or_cell)
         ws = self._wb.active
-        row = cell.row
-        col = cell.column
+
+        if self._is_write_only():
+            self._stream_rows(ws, row + 1, col, [[val] for val in array])
+            return
 
         for val in array:
             row += 1
-            ws.cell(column = col, row = row, value = val)
+            self._put_value(ws, row, col, val)
+
+
+    def _put_value(self,
+                   ws:    Worksheet,
+                   row:   int,
+                   col:   int,
+                   value: str | float | int | datetime.datetime,
+                   ) -> None:
+        """
+        Put a value in a cell, and update the worksheet's index if it has one.
+        """
+        cells = getattr(ws, '_cells', None)
+        count = None if cells is None else len(cells)
+
+        # If cells have been added some other way then the index is stale,
+        # so forget it and let it be rebuilt when it's next needed
+
+        index = None
+        if ws in self._indexes:
+            index_count, index = self._indexes.pop(ws)
+            if index_count != count:
+                index = None
+
+        cell       = ws.cell(column = col, row = row)
+        old_value  = cell.value
+        cell.value = value
+
+        if index is None:
+            return
+
+        if not(old_value is None):
+            positions = index.get(old_value, [])
+            if not((col, row) in positions):
+                return
+            positions.remove((col, row))
+            if not(positions):
+                del index[old_value]
+        if not(value is None):
+            bisect.insort(index.setdefault(value, []), (col, row))
+
+        self._indexes[ws] = (None if cells is None else len(cells), index)
+
+
+    def _row_column(self, coordinate_or_cell: str | Cell) -> tuple[int, int]:
+        """
+        The row and column of a coordinate or cell. Unlike `cc()` this
+        doesn't need a cell, which write-only worksheets don't have, and
+        which for an empty cell of a read-only worksheet doesn't know where
+        it is.
+        """
+        if type(coordinate_or_cell) is str:
+            return coordinate_to_tuple(coordinate_or_cell)
+        return (coordinate_or_cell.row, coordinate_or_cell.column)
+
+
+    def _coordinate(self, coordinate_or_cell: str | Cell) -> str:
+        """
+        The coordinate of a coordinate or cell, as `_row_column()`.
+        """
+        if type(coordinate_or_cell) is str:
+            return coordinate_or_cell
+        return coordinate_or_cell.coordinate
+
+
+    def _is_write_only(self) -> bool:
+        return getattr(self._wb, 'write_only', False)
+
+
+    def _stream_rows(self,
+                     ws:     Worksheet,
+                     row:    int,
+                     column: int,
+                     rows:   Iterable[Sequence[str | float | int | datetime.datetime]],
+                     ) -> None:
+        """
+        Put rows of values on a write-only worksheet, from the given row and
+        column. A write-only worksheet can only add whole rows to the end,
+        so we hold on to the last row we've been given until something is
+        put below it, or the workbook is saved, and can still put values
+        beside those in it. Putting values above that row is an error.
+        """
+        open_row, open_values = self._streams.get(ws, (1, []))
+
+        for values in rows:
+            if row < open_row:
+                raise ValueError(f'Row {row} of write-only worksheet {ws.title} has already been written')
+
+            if row > open_row:
+                ws.append(open_values)
+                for _ in range(row - open_row - 1):
+                    ws.append([])
+                open_row, open_values = (row, [])
+
+            end = column - 1 + len(values)
+            if len(open_values) < end:
+                open_values.extend([None] * (end - len(open_values)))
+            open_values[column - 1 : end] = values
+            row += 1
+
+        self._streams[ws] = (open_row, open_values)
 
 
     def find_values_beside(self,
@@ -212,38 +529,32 @@ class ExcelHelper(object):
         some values.
         """
 
-        coord, cell = self.cc(coordinate_or_cell)
+        coord    = self._coordinate(coordinate_or_cell)
+        row, col = self._row_column(coordinate_or_cell)
 
         ws = self._wb.active
-        row = cell.row
-        col = cell.column
 
         limit = 100
         max_col = col + limit
         out = []
 
-        # Move down to find where the first value is
+        # Read across to find where the first value is
 
-        found_value = False
-        cell = None
+        values = self._values_across(row, col + 1)
+        val    = None
 
-        while not(found_value) and col < max_col:
+        while val is None and col < max_col:
             col += 1
-            cell = ws.cell(row = row, column = col)
-            found_value = not(cell.value is None)
+            val = next(values)
 
         if col == max_col:
             raise(LookupError(f'No values found within {limit} columns of {coord}'))
 
-        # Move down, adding to our output, until we get an empty cell
+        # Carry on across, adding to our output, until we get an empty cell
 
-        found_blank = False
-
-        while not(found_blank):
-            out.append(cell.value)
-            col += 1
-            cell = ws.cell(row = row, column = col)
-            found_blank = (cell.value is None)
+        while not(val is None):
+            out.append(val)
+            val = next(values)
 
         return out
 
@@ -257,15 +568,71 @@ class ExcelHelper(object):
         in the active workbook.
         """
 
-        coord, cell = self.cc(coordinate_or_cell)
-
+        row, col = self._row_column(coordinate_or_cell)
         ws = self._wb.active
-        row = cell.row
-        col = cell.column
+
+        if self._is_write_only():
+            self._stream_rows(ws, row, col + 1, [array])
+            return
 
         for val in array:
             col += 1
-            ws.cell(column = col, row = row, value = val)
+            self._put_value(ws, row, col, val)
+
+
+    def put_table(self,
+                  coordinate_or_cell: str | Cell,
+                  rows:               Iterable[Sequence[str | float | int | datetime.datetime]],
+                  ) -> None:
+        """
+        Put rows of values into the active worksheet, with the first value
+        of the first row in the given coordinate or cell. This is the
+        reverse of `vertical_table()`, and much quicker than putting the
+        values a row or column at a time.
+
+        `find()` reindexes the worksheet after this, rather than each value
+        being added to its index as it's put.
+
+        Rows that start in column A, just below the last row of the
+        worksheet, are appended whole, which is quicker again.
+
+        On a write-only workbook the rows are written to the file as we go.
+        Each worksheet has to be written from the top down: values can be
+        put beside the last row put, or anywhere below it, but not above.
+        """
+        row, col = self._row_column(coordinate_or_cell)
+        ws = self._wb.active
+
+        if self._is_write_only():
+            self._stream_rows(ws, row, col, rows)
+            return
+
+        self._indexes.pop(ws, None)
+
+        # An OpenPyXL worksheet appends below the last row it's put a cell
+        # in. The lightweight reader's worksheets don't append
+
+        if col == 1 and hasattr(ws, 'append') and row == ws._current_row + 1:
+            for values in rows:
+                ws.append(list(values))
+            return
+
+        for r, values in enumerate(rows, row):
+            for c, value in enumerate(values, col):
+                ws.cell(row = r, column = c).value = value
+
+
+    def put_columns(self,
+                    coordinate_or_cell: str | Cell,
+                    table:              ColumnTable,
+                    ) -> None:
+        """
+        Put a `ColumnTable` into the active worksheet, with its headers
+        across from the given coordinate or cell and its rows below, as
+        `vertical_columns()` would read it back. See `put_table()`.
+        """
+        columns = [table.column(header) for header in table.headers]
+        self.put_table(coordinate_or_cell, itertools.chain([table.headers], zip(*columns)))
 
 
     def find_value_in_table(self,
@@ -276,29 +643,65 @@ class ExcelHelper(object):
         """
         Given a coordinate or cell, search down for the cell with the row name, across
         for the cell with the column name, and return the value in that cell.
+
+        This searches up to 100 cells each way every time. To look up many
+        values in the same table, use `table_lookup()`.
         """
 
-        coord, cell = self.cc(coordinate_or_cell)
-        ws = self._wb.active
-        row = None
-        column = None
+        coord      = self._coordinate(coordinate_or_cell)
+        top, left  = self._row_column(coordinate_or_cell)
+        row        = None
+        column     = None
 
-        for r in range(cell.row, cell.row + 100):
-            here = ws.cell(row = r, column = cell.column)
-            if here.value == row_name:
-                row = r
+        for r, value in enumerate(itertools.islice(self._values_down(top, left), 100)):
+            if value == row_name:
+                row = top + r
                 break
 
-        for c in range(cell.column, cell.column + 100):
-            here = ws.cell(row = cell.row, column = c)
-            if here.value == column_name:
-                column = c
+        for c, value in enumerate(itertools.islice(self._values_across(top, left), 100)):
+            if value == column_name:
+                column = left + c
                 break
 
-        if row == None or column == None:
-            raise(LookupError(f'Cannot find cell for ({row_name},{column_name}( in table at {coord}'))
+        if row is None or column is None:
+            raise(LookupError(f'Cannot find cell for ({row_name},{column_name}) in table at {coord}'))
+
+        return next(self._rows_from(row, column, 1))[0]
 
-        return ws.cell(row = r, column = c).value
+
+    def table_lookup(self,
+                     coordinate_or_cell: str | Cell,
+                     limit:              int        = 100,
+                     ) -> TableLookup:
+        """
+        Read the table whose top left cell is given, with row names down
+        its first column and column names across its first row, for looking
+        up many values quickly. For example
+        ```
+        costs = xh.table_lookup('B3')
+        costs.value('Fire', 'Ice') == xh.find_value_in_table('B3', 'Fire', 'Ice')
+        ```
+        Once it's made the lookup doesn't see changes to the sheet.
+
+        ## Parameters
+
+        - `limit`: How many cells down and across to look for names, as
+          `find_value_in_table()` does.
+        """
+        row, column = self._row_column(coordinate_or_cell)
+
+        row_names    = list(itertools.islice(self._values_down(row, column), limit))
+        column_names = list(itertools.islice(self._values_across(row, column), limit))
+
+        # Leave out the blanks after the last names
+
+        while row_names and row_names[-1] is None:
+            row_names.pop()
+        while column_names and column_names[-1] is None:
+            column_names.pop()
+
+        rows = list(itertools.islice(self._rows_from(row, column, len(column_names)), len(row_names)))
+        return TableLookup(row_names, column_names, rows)
 
 
     def value_from(self,
@@ -311,18 +714,98 @@ class ExcelHelper(object):
         cell some number of rows and columns relative to this.
         """
 
-        coord, cell = self.cc(coordinate_or_cell)
+        top, left = self._row_column(coordinate_or_cell)
         ws = self._wb.active
 
-        return ws.cell(row = cell.row + row, column = cell.column + column).value
+        return self._cell(ws, top + row, left + column).value
+
+
+    def _values_down(self, row: int, column: int) -> Iterator[str | float | int | datetime.datetime]:
+        """
+        Yield the values in a column of the active worksheet, from the given
+        row downwards, without end. See `_rows_from()`.
+        """
+        ws    = self._wb.active
+        cells = getattr(ws, '_cells', None)
+
+        if cells is None:
+            for (val,) in self._rows_from(row, column, 1):
+                yield val
+
+        while True:
+            cell = cells.get((row, column))
+            yield None if cell is None else cell.value
+            row += 1
+
+
+    def _values_across(self, row: int, column: int) -> Iterator[str | float | int | datetime.datetime]:
+        """
+        Yield the values in a row of the active worksheet, from the given
+        column rightwards, without end. See `_rows_from()`.
+        """
+        ws    = self._wb.active
+        cells = getattr(ws, '_cells', None)
+
+        if cells is None:
+            for values in ws.iter_rows(min_row = row, max_row = row, min_col = column, values_only = True):
+                yield from values
+            while True:
+                yield None
+
+        while True:
+            cell = cells.get((row, column))
+            yield None if cell is None else cell.value
+            column += 1
+
+
+    def _rows_from(self,
+                   row:    int,
+                   column: int,
+                   cols:   int,
+                   ws:     Worksheet | None = None,
+                   ) -> Iterator[tuple[str | float | int | datetime.datetime, ...]]:
+        """
+        Yield rows of `cols` values from the given worksheet, or else the
+        active one, starting at the given row and column and going down,
+        without end. Past the last row with anything in it the values are
+        all `None`.
+
+        A normal worksheet holds its cells in a dict, which we read directly.
+        Its `iter_rows()` looks up each cell in turn just as `cell()` does,
+        so that would be no quicker, and it would create empty cells. A
+        read-only worksheet is parsed as it's read, so we read that a row at
+        a time with `iter_rows()`.
+        """
+        if ws is None:
+            ws = self._wb.active
+        cells   = getattr(ws, '_cells', None)
+        columns = range(column, column + cols)
+
+        if cells is None:
+            if cols > 0:
+                yield from ws.iter_rows(min_row     = row,
+                                        min_col     = column,
+                                        max_col     = column + cols - 1,
+                                        values_only = True,
+                                        )
+            blank = (None,) * cols
+            while True:
+                yield blank
+
+        while True:
+            yield tuple(None if cell is None else cell.value
+                        for cell in (cells.get((row, c)) for c in columns))
+            row += 1
 
 
     def _count_columns(self,
-                       header_cell:       str,
+                       row:               int,
+                       column:            int,
                        last_column_label: str = None,
                        ) -> int:
         """
-        Count the number of columns in the table starting at `header_cell`.
+        Count the number of columns in the table whose header starts at the
+        given row and column.
 
         ## Parameters
 
@@ -330,24 +813,24 @@ class ExcelHelper(object):
           header cell. If given, count up to and including the column with
           that label.
         """
-        cols = 0
+        cols   = 0
+        values = self._values_across(row, column)
+
         if last_column_label is None:
-            while not(header_cell.value is None):
+            while not(next(values) is None):
                 cols += 1
-                header_cell = self.right(header_cell)
         else:
-            while header_cell.value != last_column_label:
+            while next(values) != last_column_label:
                 cols += 1
-                header_cell = self.right(header_cell)
             cols += 1
         return cols
 
 
     def vertical_table(self,
-                       coordinate_or_cell: str | float | int | datetime.datetime,
-                       last_column_label:  str                                   = None,
-                       ) -> list[str | float | int | datetime.datetime,
-                                 str | float | int | datetime.datetime]:
+                       coordinate_or_cell: str | Cell,
+                       last_column_label:  str        = None,
+                       fingerprints:       bool       = False,
+                       ) -> list[list[str | float | int | datetime.datetime]]:
         """
         Given a starting cell, which is the first cell of a table header,
         return a table of cells below that. Each element of the table is a
@@ -359,44 +842,44 @@ class ExcelHelper(object):
         - `last_column_label`: If given, the last header column is the one
           that matches this label, rather than the last non-empty header
           cell.
+        - `fingerprints`: If true, each element is a pair of the row's
+          `row_fingerprint()` and the row.
         """
+        return list(self.iter_vertical_table(coordinate_or_cell, last_column_label, fingerprints))
 
-        coord, cell = self.cc(coordinate_or_cell)
-
-        # How many columns in the table?
-
-        cols = self._count_columns(cell, last_column_label)
-
-        # Read the rows, stop when we have our first blank
 
-        table         = []
-        got_blank_row = False
-        start_cell    = self.down(cell)
-
-        while not(got_blank_row):
-            found_cell_content = False
-            row = []
-            for i in range(cols):
-                val = self.right(start_cell, i).value
-                row.append(val)
+    def iter_vertical_table(self,
+                            coordinate_or_cell: str | Cell,
+                            last_column_label:  str        = None,
+                            fingerprints:       bool       = False,
+                            ) -> Iterator[list[str | float | int | datetime.datetime]]:
+        """
+        As `vertical_table()`, but yield each row of the table as it's read.
+        With a read-only workbook this means rows can be used before the
+        rest of the sheet has been parsed.
+        """
 
-                if not(val is None):
-                    found_cell_content = True
+        row, column = self._row_column(coordinate_or_cell)
 
-            table.append(row)
-            start_cell = self.down(start_cell)
-            got_blank_row = not(found_cell_content)
+        # How many columns in the table?
 
-        # We've appended a blank row, so fix that
+        cols = self._count_columns(row, column, last_column_label)
 
-        table = table[:-1]
+        # Read the rows in bulk, stop when we have our first blank
 
-        return table
+        for values in self._rows_from(row + 1, column, cols):
+            if all(val is None for val in values):
+                break
+            if fingerprints:
+                yield (row_fingerprint(values), list(values))
+            else:
+                yield list(values)
 
 
     def vertical_dicts(self,
                        coordinate_or_cell: str | Cell,
                        last_column_label:  str        = None,
+                       fingerprints:       bool       = False,
                        ) -> list[dict[str | float | int | datetime.datetime,
                                       str | float | int | datetime.datetime]]:
         """
@@ -412,40 +895,422 @@ class ExcelHelper(object):
         - `last_column_label`: If given, the last header column is the one
           that matches this label, rather than the last non-empty header
           cell.
+        - `fingerprints`: If true, each element is a pair of the row's
+          `row_fingerprint()` and the row's dict.
+        """
+        return list(self.iter_vertical_dicts(coordinate_or_cell, last_column_label, fingerprints))
+
+
+    def iter_vertical_dicts(self,
+                            coordinate_or_cell: str | Cell,
+                            last_column_label:  str        = None,
+                            fingerprints:       bool       = False,
+                            ) -> Iterator[dict[str | float | int | datetime.datetime,
+                                               str | float | int | datetime.datetime]]:
+        """
+        As `vertical_dicts()`, but yield each row of the table as it's read.
+        With a read-only workbook this means rows can be used before the
+        rest of the sheet has been parsed.
         """
 
-        coord, cell = self.cc(coordinate_or_cell)
+        row, column = self._row_column(coordinate_or_cell)
 
         # How many columns in the table?
 
-        cols = self._count_columns(cell, last_column_label)
+        cols = self._count_columns(row, column, last_column_label)
 
         # Read the header labels
 
-        headers = [self.right(cell, i).value for i in range(cols)]
+        headers = next(self._rows_from(row, column, cols))
+
+        # Read the rows in bulk, stop when we have our first blank row
+
+        for values in self._rows_from(row + 1, column, cols):
+            if all(val is None for val in values):
+                break
+            values = dict(zip(headers, values))
+            if fingerprints:
+                yield (row_fingerprint(values), values)
+            else:
+                yield values
+
+
+    def vertical_columns(self,
+                         coordinate_or_cell: str | Cell,
+                         last_column_label:  str        = None,
+                         ) -> ColumnTable:
+        """
+        Given a starting cell, which is the first cell of a table header,
+        return the table below it as a `ColumnTable`. This holds the same
+        rows as `vertical_dicts()`, but a column at a time, which takes
+        much less memory and is quicker to filter and group.
+
+        ## Parameters
+
+        - `last_column_label`: If given, the last header column is the one
+          that matches this label, rather than the last non-empty header
+          cell.
+        """
+
+        row, column = self._row_column(coordinate_or_cell)
+
+        # How many columns in the table?
+
+        cols = self._count_columns(row, column, last_column_label)
+
+        # Read the header labels, then the rows in bulk until our first
+        # blank row, adding each value to its column
+
+        headers = next(self._rows_from(row, column, cols))
+        columns = [[] for _ in range(cols)]
+        appends = [values.append for values in columns]
+
+        for values in self._rows_from(row + 1, column, cols):
+            if all(val is None for val in values):
+                break
+            for append, val in zip(appends, values):
+                append(val)
+
+        return ColumnTable(headers, columns)
+
+
+    def named_table(self, name: str) -> list[list[str | float | int | datetime.datetime]]:
+        """
+        Return the rows of data in the Excel Table, or the range with a
+        defined name, with the given `name`, as lists of values. See
+        `named_dicts()`.
+        """
+        ws, headers, min_row, min_col, max_row, max_col = self._named_range(name)
+        rows = self._rows_from(min_row, min_col, max_col - min_col + 1, ws)
+        return [list(values) for values in itertools.islice(rows, max_row - min_row + 1)]
+
+
+    def named_dicts(self, name: str) -> list[dict[str | float | int | datetime.datetime,
+                                                  str | float | int | datetime.datetime]]:
+        """
+        Return the rows of data in the Excel Table, or the range with a
+        defined name, with the given `name`, as dicts keyed by the column
+        headers.
+
+        The table's exact extent is read from its definition, so it can be
+        anywhere in the workbook, and it may include blank rows. An Excel
+        Table's headers are its column names, and its totals row is left
+        out. The first row of a named range is its headers.
+
+        Tables are looked for first, then names defined for the active
+        worksheet, then names defined for the whole workbook.
+        """
+        ws, headers, min_row, min_col, max_row, max_col = self._named_range(name)
+        rows = self._rows_from(min_row, min_col, max_col - min_col + 1, ws)
+        return [dict(zip(headers, values)) for values in itertools.islice(rows, max_row - min_row + 1)]
+
+
+    def named_columns(self, name: str) -> ColumnTable:
+        """
+        Return the rows of data in the Excel Table, or the range with a
+        defined name, with the given `name`, as a `ColumnTable`. See
+        `named_dicts()`.
+        """
+        ws, headers, min_row, min_col, max_row, max_col = self._named_range(name)
+        rows = self._rows_from(min_row, min_col, max_col - min_col + 1, ws)
+        rows = itertools.islice(rows, max_row - min_row + 1)
+        return ColumnTable(headers, [list(column) for column in zip(*rows)] or [[] for _ in headers])
+
+
+    def _named_range(self, name: str) -> tuple[Worksheet, list[str | float | int | datetime.datetime],
+                                               int, int, int, int]:
+        """
+        Find the Excel Table or defined name with the given name. Return
+        its worksheet, its headers, and the (min row, min column, max row,
+        max column) of its rows of data.
+        """
+        wb = self._wb
+
+        # Excel Tables have names that are unique in the workbook. Read-only
+        # worksheets don't have their tables
+
+        for ws in wb.worksheets:
+            for table in getattr(ws, 'tables', {}).values():
+                if name in (table.name, table.displayName):
+                    min_row, min_col, max_row, max_col = range_boundaries(table.ref)
+                    min_row += table.headerRowCount or 0
+                    max_row -= table.totalsRowCount or 0
+
+                    headers = list(table.column_names)
+                    if not(headers) and table.headerRowCount:
+                        headers = list(next(self._rows_from(min_row - 1, min_col, max_col - min_col + 1, ws)))
+                    return (ws, headers, min_row, min_col, max_row, max_col)
+
+        # A name may be defined for a worksheet, or for the whole workbook
+
+        defined = getattr(wb.active, 'defined_names', {}).get(name) or wb.defined_names.get(name)
+        if defined is None:
+            raise LookupError(f'No table or defined name {name}')
+
+        title, ref = _split_reference(defined.attr_text)
+        if not(title in wb.sheetnames):
+            raise LookupError(f'Defined name {name} refers to missing sheet {title}')
+
+        ws = wb[title]
+        min_row, min_col, max_row, max_col = range_boundaries(ref)
+        headers = list(next(self._rows_from(min_row, min_col, max_col - min_col + 1, ws)))
+        return (ws, headers, min_row + 1, min_col, max_row, max_col)
+
+
+    def vertical_dicts_many(self,
+                            coordinates_or_cells: Sequence[str | Cell],
+                            last_column_labels:   Sequence[str | None] | None = None,
+                            ) -> list[list[dict[str | float | int | datetime.datetime,
+                                                str | float | int | datetime.datetime]]]:
+        """
+        As `vertical_dicts()` for each of several tables on the active
+        worksheet, given the first cell of each table's header. Returns a
+        list of tables in the same order.
+
+        All the tables are read in one pass down the worksheet, which saves
+        reading a read-only worksheet again for each table.
+
+        ## Parameters
+
+        - `last_column_labels`: If given, a label or `None` for each table,
+          as for `last_column_label` in `vertical_dicts()`.
+        """
+        if last_column_labels is None:
+            last_column_labels = [None] * len(coordinates_or_cells)
+        if len(last_column_labels) != len(coordinates_or_cells):
+            raise ValueError('Need one last column label for each table')
+
+        specs = []
+        for coordinate_or_cell, label in zip(coordinates_or_cells, last_column_labels):
+            row, column = self._row_column(coordinate_or_cell)
+            specs.append({'coord':      self._coordinate(coordinate_or_cell),
+                          'header_row': row,
+                          'column':     column,
+                          'cols':       None,
+                          'label':      label,
+                          'headers':    None,
+                          'last_row':   None,
+                          })
+
+        return self._read_tables_in_one_pass(self._wb.active, specs)
+
+
+    def sheet_tables(self) -> dict[str, list[dict[str | float | int | datetime.datetime,
+                                                   str | float | int | datetime.datetime]]]:
+        """
+        Find all the Excel Tables on the active worksheet, and return the
+        rows of each as for `named_dicts()`, in a dict by table name. All
+        the tables are read in one pass down the worksheet.
+        """
+        ws     = self._wb.active
+        names  = []
+        specs  = []
+
+        for table in getattr(ws, 'tables', {}).values():
+            _, headers, min_row, min_col, max_row, max_col = self._named_range(table.name)
+            names.append(table.displayName or table.name)
+            specs.append({'coord':      table.ref,
+                          'header_row': min_row - 1,
+                          'column':     min_col,
+                          'cols':       max_col - min_col + 1,
+                          'label':      None,
+                          'headers':    headers,
+                          'last_row':   max_row,
+                          })
+
+        return dict(zip(names, self._read_tables_in_one_pass(ws, specs)))
+
+
+    def _read_tables_in_one_pass(self,
+                                 ws:    Worksheet,
+                                 specs: list[dict],
+                                 ) -> list[list[dict[str | float | int | datetime.datetime,
+                                                     str | float | int | datetime.datetime]]]:
+        """
+        Read several tables from a worksheet in one pass down its rows,
+        and return each as a list of dicts. Each table is given as a dict
+        of:
+
+        - `coord`: Where the table is, for error messages.
+        - `header_row`, `column`: Where its header starts.
+        - `cols`: How many columns it has, or `None` to count them along the
+          header up to the first blank or `label`.
+        - `headers`: Its headers, or `None` to read them from the header row.
+        - `last_row`: Its last row of data, or `None` to stop before the
+          first blank row.
+
+        The header rows of tables with given headers are not read.
+        """
+        # A table with a last row above its first row of data has no rows,
+        # and is done before we start
+
+        tables  = [{**spec,
+                    'rows': [],
+                    'done': not(spec['last_row'] is None) and spec['last_row'] <= spec['header_row'],
+                    }
+                   for spec in specs]
+        reading = sum(not(table['done']) for table in tables)
+        if reading == 0:
+            return [table['rows'] for table in tables]
+
+        first_row = min(table['header_row'] if table['headers'] is None else table['header_row'] + 1
+                        for table in tables if not(table['done']))
+
+        for row, fetch in self._row_fetchers(ws, first_row):
+            for table in tables:
+                if table['done'] or row < table['header_row']:
+                    continue
+
+                if row == table['header_row']:
+                    if table['headers'] is None:
+                        table['cols']    = table['cols'] or self._count_fetched_columns(fetch, table)
+                        table['headers'] = fetch(table['column'], table['cols'])
+                    continue
+
+                values = fetch(table['column'], table['cols'])
+                if table['last_row'] is None and all(val is None for val in values):
+                    table['done'] = True
+                else:
+                    table['rows'].append(dict(zip(table['headers'], values)))
+                    table['done'] = (row == table['last_row'])
+
+                if table['done']:
+                    reading -= 1
+
+            if reading == 0:
+                break
+
+        return [table['rows'] for table in tables]
+
+
+    def _row_fetchers(self,
+                      ws:  Worksheet,
+                      row: int,
+                      ) -> Iterator[tuple[int, Callable[[int, int | None], tuple]]]:
+        """
+        Yield each row number of the worksheet from the given one downwards,
+        without end, with a function that gets a number of values in that
+        row from a given column, or if the number is `None` all the values
+        to the end of the row. See `_rows_from()` for how we read normal and
+        read-only worksheets.
+        """
+        cells = getattr(ws, '_cells', None)
+
+        if cells is None:
+            rows = ws.iter_rows(min_row = row, values_only = True)
+            for values in itertools.chain(rows, itertools.repeat(())):
+                def fetch(column, cols, values = values):
+                    if cols is None:
+                        return tuple(values[column - 1:])
+                    part = values[column - 1 : column - 1 + cols]
+                    return tuple(part) + (None,) * (cols - len(part))
+                yield (row, fetch)
+                row += 1
+
+        while True:
+            def fetch(column, cols, row = row):
+                if cols is None:
+                    last = max((c for (r, c) in cells if r == row), default = column - 1)
+                    cols = last - column + 1
+                return tuple(None if cell is None else cell.value
+                             for cell in (cells.get((row, c)) for c in range(column, column + cols)))
+            yield (row, fetch)
+            row += 1
+
+
+    def _count_fetched_columns(self,
+                               fetch: Callable[[int, int | None], tuple],
+                               table: dict,
+                               ) -> int:
+        """
+        Count the columns of a table from its header row, as
+        `_count_columns()` does, so a table's last column label may come
+        after blank headers. If it isn't anywhere along the row, that's a
+        `LookupError`.
+        """
+        if table['label'] is None:
+            cols = 0
+            while not(fetch(table['column'] + cols, 1)[0] is None):
+                cols += 1
+            return cols
+
+        headers = fetch(table['column'], None)
+        if not(table['label'] in headers):
+            raise LookupError(f"No column labelled {table['label']} in table at {table['coord']}")
+        return headers.index(table['label']) + 1
+
+
+    def row_manifest(self,
+                     coordinate_or_cell: str | Cell,
+                     key_column:         str,
+                     last_column_label:  str        = None,
+                     ) -> dict[str, str]:
+        """
+        Given a starting cell, which is the first cell of a table header,
+        return a manifest of the table's rows: a dict from the value in each
+        row's `key_column` to the row's `row_fingerprint()`. The values in
+        the key column are made into strings, so the manifest is ready for
+        JSON, and must be different in each row.
+
+        Save the manifest, and compare it with a later one using
+        `diff_manifests()` to see which rows have changed.
+        """
+        manifest = {}
+        for fingerprint, row in self.iter_vertical_dicts(coordinate_or_cell, last_column_label, True):
+            if not(key_column in row):
+                raise LookupError(f'No column {key_column} in table at {coordinate_or_cell}')
+
+            key = str(row[key_column])
+            if key in manifest:
+                raise ValueError(f'Key {key} is in more than one row of table at {coordinate_or_cell}')
+            manifest[key] = fingerprint
+        return manifest
 
-        # Read the rows, stop when we have our first blank row
 
-        rows          = []
-        got_blank_row = False
-        start_cell    = self.down(cell)
+def _split_reference(reference: str) -> tuple[str, str]:
+    """
+    Split a reference to a range, such as "'My sheet'!$A$1:$D$10", into the
+    sheet's title and the range. Only a single range is allowed.
+    """
+    title, bang, ref = reference.rpartition('!')
+    if not(bang) or ',' in ref:
+        raise ValueError(f'Reference {reference} is not a single range on a sheet')
 
-        while not(got_blank_row):
-            found_cell_content = False
-            row = {}
-            for i in range(cols):
-                val             = self.right(start_cell, i).value
-                row[headers[i]] = val
+    if title.startswith("'") and title.endswith("'"):
+        title = title[1:-1].replace("''", "'")
+    return (title, ref.replace('$', ''))
 
-                if not(val is None):
-                    found_cell_content = True
 
-            rows.append(row)
-            start_cell    = self.down(start_cell)
-            got_blank_row = not(found_cell_content)
+def row_fingerprint(row: Sequence[str | float | int | datetime.datetime]
+                         | dict[str | float | int | datetime.datetime,
+                                str | float | int | datetime.datetime],
+                    ) -> str:
+    """
+    A hash of the values in a table row, or the labels and values of a row
+    as a dict, which is the same from one run to the next. Values of
+    different types are different, so `1` and `'1'` give different
+    fingerprints.
+    """
+    items = row.items() if isinstance(row, dict) else enumerate(row)
 
-        # We've appended a blank row, so fix that
+    row_hash = hashlib.new('md5', usedforsecurity = False)
+    for label, value in items:
+        row_hash.update(f'{label!r}={type(value).__name__}:{value!r}\x1f'.encode())
+    return row_hash.hexdigest()
 
-        rows = rows[:-1]
 
-        return rows
+def diff_manifests(old: dict[str, str],
+                   new: dict[str, str],
+                   ) -> dict[str, list[str]]:
+    """
+    Compare two manifests from `ExcelHelper.row_manifest()`, and return
+    the keys of the rows that have been added, removed, changed, or are
+    unchanged, as a dict with those four keys. Each list of keys is in
+    the order of the manifest it comes from, the new one except for
+    removed rows.
+    """
+    return {'added':     [key for key in new if not(key in old)],
+            'removed':   [key for key in old if not(key in new)],
+            'changed':   [key for key in new if key in old and old[key] != new[key]],
+            'unchanged': [key for key in new if key in old and old[key] == new[key]],
+            }
@@ -0,0 +1,238 @@
+import io
+import json
+import math
+import os
+from typing import BinaryIO
+
+from PIL import Image
+
+from .card_maker import CardMaker
+
+
+# How many sheet widths to try when finding the smallest atlas
+widths_to_try = 32
+
+
+class ImageAtlas:
+    """
+    Images of different sizes packed closely into one image, with a
+    manifest of where each one is. Good for tokens and mixed components,
+    where a uniform grid would waste space.
+    """
+
+    def __init__(self,
+                 padding:   int                       = 0,
+                 max_width: int | None                = None,
+                 colour:    tuple[int, int, int, int] = (0, 0, 0, 0),
+                 mode:      str                       = 'RGBA',
+                 ) -> None:
+        """
+        An empty atlas. The size of the sheet is chosen automatically to
+        keep its area small, but won't be wider than `max_width` if that's
+        given.
+
+        - `padding`: Pixels to leave between images.
+        - `colour`: The colour of the space around the images, transparent
+          by default.
+        - `mode`: As for `ImageSheet`. An RGB atlas needs an opaque colour.
+        """
+        if not(mode in ['RGBA', 'RGB']):
+            raise ValueError(f"Mode must be RGBA or RGB, but got '{mode}'")
+        if mode == 'RGB' and len(colour) == 4 and colour[3] != 255:
+            raise ValueError('An RGB atlas needs an opaque colour')
+
+        self._padding   = padding
+        self._max_width = max_width
+        self._colour    = colour
+        self._mode      = mode
+
+        # Images and their names, in the order added, and where they are
+        # placed, as (x, y) tuples. We only pack when we need to.
+        self._images    = []
+        self._names     = []
+        self._positions = None
+        self._size      = None
+
+    def add(self,
+            card: CardMaker | Image.Image | str,
+            name: str | None = None,
+            ) -> None:
+        """
+        Add an image to the atlas, at its own size.
+        `card` is a CardMaker, Image, or image filename.
+        The `name` is used in the manifest. By default it's the filename,
+        or else the image's number, counting from 0.
+        """
+        if isinstance(card, CardMaker):
+            im = card.image()
+        elif isinstance(card, Image.Image):
+            im = card.convert('RGBA')
+        elif isinstance(card, str):
+            im = Image.open(card).convert('RGBA')
+            if name is None:
+                name = card
+        else:
+            raise TypeError(f"Can only an Image or CardMaker or str but got a {type(card)}")
+
+        if not(self._max_width is None) and im.width > self._max_width:
+            raise ValueError(f'Image is {im.width} pixels wide, more than the maximum {self._max_width}')
+
+        self._images.append(im)
+        self._names.append(str(len(self._names)) if name is None else name)
+        self._positions = None
+
+    @property
+    def size(self) -> tuple[int, int]:
+        """The (width, height) of the packed atlas (read-only)."""
+        self._pack()
+        return self._size
+
+    def _pack(self) -> None:
+        """
+        Find where to put each image, trying a range of sheet widths and
+        keeping the one with the smallest area.
+        """
+        if not(self._positions is None):
+            return
+        if not(self._images):
+            raise ValueError('There are no images in the atlas')
+
+        padding = self._padding
+        sizes   = [(im.width + padding, im.height + padding) for im in self._images]
+
+        # The narrowest is the widest image. There's no point going wider
+        # than all the images side by side, or much wider than a square.
+        narrowest = max(width for width, _ in sizes)
+        widest    = sum(width for width, _ in sizes)
+        area      = sum(width * height for width, height in sizes)
+        widest    = min(widest, max(narrowest, 2 * math.ceil(math.sqrt(area))))
+        if not(self._max_width is None):
+            widest = min(widest, self._max_width + padding)
+        step = max(1, (widest - narrowest) // (widths_to_try - 1))
+
+        best     = None
+        best_key = None
+        for width in list(range(narrowest, widest, step)) + [widest]:
+            positions = _skyline_pack(sizes, width)
+            size      = (max(x + w for (x, _), (w, _) in zip(positions, sizes)) - padding,
+                         max(y + h for (_, y), (_, h) in zip(positions, sizes)) - padding,
+                         )
+            key       = (size[0] * size[1], abs(size[0] - size[1]))
+            if best_key is None or key < best_key:
+                best     = (positions, size)
+                best_key = key
+
+        self._positions, self._size = best
+
+    def manifest(self) -> dict:
+        """
+        The size of the atlas and the rectangle of each image, in the order
+        they were added, as a dict ready for JSON.
+        """
+        self._pack()
+        width, height = self._size
+        return {'width':  width,
+                'height': height,
+                'images': [{'name':   name,
+                            'x':      x,
+                            'y':      y,
+                            'width':  im.width,
+                            'height': im.height,
+                            }
+                           for name, im, (x, y) in zip(self._names, self._images, self._positions)
+                           ],
+                }
+
+    def save_manifest(self, filename: str | os.PathLike) -> None:
+        """
+        Write the manifest to the given file as JSON.
+        """
+        with open(filename, 'w') as f:
+            json.dump(self.manifest(), f, indent = 2)
+
+    def image(self) -> Image.Image:
+        """
+        The packed atlas as an image.
+        """
+        self._pack()
+        atlas = Image.new(mode = self._mode, size = self._size, color = self._colour)
+        for im, position in zip(self._images, self._positions):
+            atlas.paste(im = im, box = position, mask = im)
+        return atlas
+
+    def save(self,
+             filename: str | os.PathLike | BinaryIO | None = None,
+             format:   str | None                          = None,
+             ) -> memoryview | None:
+        """
+        Write the atlas image to the given file, or return its bytes if
+        there's no file, as for `ImageSheet.save()`.
+        """
+        is_path = isinstance(filename, (str, os.PathLike))
+        if format is None and not(is_path and os.path.splitext(filename)[1]):
+            format = 'PNG'
+
+        if filename is None:
+            buffer = io.BytesIO()
+            self.image().save(buffer, format = format)
+            return buffer.getbuffer()
+
+        self.image().save(filename, format = format)
+        return None
+
+
+def _skyline_pack(sizes: list[tuple[int, int]], width: int) -> list[tuple[int, int]]:
+    """
+    Pack rectangles of the given sizes into a strip of the given width,
+    tallest first, each as low and then as far left as it will go. The
+    skyline is the top edge of what's been placed so far, as a list of
+    (x, y, width) segments from left to right.
+    Returns the (x, y) of each rectangle, in the order given.
+    """
+    skyline   = [(0, 0, width)]
+    positions = [None] * len(sizes)
+    order     = sorted(range(len(sizes)), key = lambda i: (-sizes[i][1], -sizes[i][0]))
+
+    for i in order:
+        rect_width, rect_height = sizes[i]
+
+        # Find the lowest place, then the leftmost, starting at each segment
+        best = None
+        for start, (x, _, _) in enumerate(skyline):
+            if x + rect_width > width:
+                break
+            y     = 0
+            end   = start
+            right = x
+            while right < x + rect_width:
+                y      = max(y, skyline[end][1])
+                right += skyline[end][2]
+                end   += 1
+            if best is None or (y, x) < (best[1], best[0]):
+                best = (x, y)
+        positions[i] = best
+
+        # Raise the skyline where it went
+        x, y   = best
+        raised = []
+        for seg_x, seg_y, seg_width in skyline:
+            seg_right = seg_x + seg_width
+            if seg_right <= x or seg_x >= x + rect_width:
+                raised.append((seg_x, seg_y, seg_width))
+                continue
+            if seg_x < x:
+                raised.append((seg_x, seg_y, x - seg_x))
+            if not(raised) or raised[-1][0] + raised[-1][2] <= x:
+                raised.append((x, y + rect_height, rect_width))
+            if seg_right > x + rect_width:
+                raised.append((x + rect_width, seg_y, seg_right - x - rect_width))
+
+        # Merge neighbouring segments at the same height
+        skyline = []
+        for segment in raised:
+            if skyline and skyline[-1][1] == segment[1]:
+                skyline[-1] = (skyline[-1][0], segment[1], skyline[-1][2] + segment[2])
+            else:
+                skyline.append(segment)
+
+    return positions
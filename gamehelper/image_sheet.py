@@ -1,8 +1,24 @@
+import io
 import math
+import os
+import threading
+from collections        import deque
+from collections.abc    import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing             import BinaryIO
 
 from PIL import Image
 
 from .card_maker import CardMaker
+from .png_writer import PNGWriter
+from gamehelper  import utils
+
+
+# How many recently scaled cards to keep, to reuse for identical cards
+scaled_cache_size = 64
+
+# Roughly how many bytes of the image are in each strip when saving with workers
+strip_bytes = 1024 * 1024
 
 
 class ImageSheet:
@@ -13,19 +29,38 @@ class ImageSheet:
     def __init__(self,
                  card_width:  int,
                  card_height: int,
-                 columns:     int                       = 1,
-                 rows:        int | None                = None,
-                 cards:       int | None                = None,
-                 colour:      tuple[int, int, int, int] = (255, 255, 255, 255),
+                 columns:     int                                 = 1,
+                 rows:        int | None                          = None,
+                 cards:       int | None                          = None,
+                 colour:      tuple[int, int, int, int]           = (255, 255, 255, 255),
+                 mode:        str                                 = 'RGBA',
+                 stream:      str | os.PathLike | BinaryIO | None = None,
+                 resampling:  str                                 = 'fast',
                  ) -> None:
         """
         A sheet of cards, white by default.
 
         Specify either 'rows' or 'cards' to set the grid height.
         If 'cards' is specified, rows is calculated as ceil(cards / columns).
+
+        The sheet's `mode` may be "RGBA" (default) or "RGB", which takes a
+        quarter less memory but needs an opaque colour.
+
+        If `stream` is given, which is a filename or binary file object, the
+        sheet is written there as a PNG while it's built, a row of cards at
+        a time. Only the current row of cards is held in memory. Call
+        `save()` without a file to finish it.
+
+        Cards are scaled with the `resampling` policy, which is `'draft'`,
+        `'fast'` or `'final'`; see `utils.resize()`.
         """
         if rows is not None and cards is not None:
             raise ValueError("Cannot specify both 'rows' and 'cards'")
+        if not(mode in ['RGBA', 'RGB']):
+            raise ValueError(f"Mode must be RGBA or RGB, but got '{mode}'")
+        if mode == 'RGB' and len(colour) == 4 and colour[3] != 255:
+            raise ValueError('An RGB sheet needs an opaque colour')
+        utils.check_resampling(resampling)
 
         if cards is not None:
             rows = math.ceil(cards / columns)
@@ -40,8 +75,27 @@ class ImageSheet:
         self._rows           = rows
         self._current_column = 0
         self._current_row    = 0
-        self._base_im = Image.new(mode  = 'RGBA',
-                                  size  = (self._width, self._height),
+        self._colour         = colour
+        self._mode           = mode
+        self._resampling     = resampling
+        self._scaled_cache   = {}    # Scaled images by hash, oldest first
+        self._scaled_lock    = threading.Lock()
+
+        # When streaming, the base image is just the current row of cards
+
+        self._writer      = None
+        self._stream_file = None    # A file we opened to stream to
+        base_height       = self._height
+
+        if not(stream is None):
+            if isinstance(stream, (str, os.PathLike)):
+                self._stream_file = open(stream, 'wb')
+                stream            = self._stream_file
+            self._writer = PNGWriter(stream, self._width, self._height, mode)
+            base_height  = card_height
+
+        self._base_im = Image.new(mode  = mode,
+                                  size  = (self._width, base_height),
                                   color = colour,
                                   )
 
@@ -55,19 +109,55 @@ class ImageSheet:
         """The number of columns in the sheet (read-only)."""
         return self._columns
 
-    def add(self, card: CardMaker | Image.Image | str) -> None:
+    def add(self,
+            card:  CardMaker | Image.Image | str,
+            count: int                           = 1,
+            ) -> None:
         """
-        Add the next card onto the sheet.
+        Add the next card onto the sheet, `count` times over.
         `card` is a CardMaker, Image, or image filename.
         The image will exclude any gutters.
         In all cases the image will scale to fit the space.
+        The card is only rendered and scaled once, however many times it's
+        added, and a card that's identical to one added recently isn't
+        scaled again.
         """
+        scaled_im = self._scaled(card)
+        for _ in range(count):
+            self._paste(scaled_im)
 
-        slot_width  = int(self._width / self._columns)
-        slot_height = int(self._height / self._rows)
-        x_pos       = self._current_column * slot_width
-        y_pos       = self._current_row * slot_height
 
+    def add_many(self,
+                 cards:   Iterable[CardMaker | Image.Image | str],
+                 workers: int | None                              = None,
+                 ) -> None:
+        """
+        Add each card from an iterable, such as a generator, in order.
+        If `workers` is given, cards are converted and scaled in a pool of
+        that many threads, and pasted onto the sheet in the order they came.
+        No more than two cards per worker are in progress at once, so a
+        whole deck need never be in memory. The sheet is the same either way.
+        """
+        if workers is None:
+            for card in cards:
+                self.add(card)
+            return
+
+        with ThreadPoolExecutor(max_workers = workers) as pool:
+            in_flight = deque()
+            for card in cards:
+                in_flight.append(pool.submit(self._scaled, card))
+                if len(in_flight) >= 2 * workers:
+                    self._paste(in_flight.popleft().result())
+            while in_flight:
+                self._paste(in_flight.popleft().result())
+
+
+    def _scaled(self, card: CardMaker | Image.Image | str) -> Image.Image:
+        """
+        Get a card's image scaled to fit the space. Recently scaled images
+        are kept by their hash, up to `scaled_cache_size` of them.
+        """
         im = None
         if isinstance(card, CardMaker):
             im = card.image()
@@ -80,19 +170,173 @@ class ImageSheet:
         else:
             raise TypeError(f"Can only an Image or CardMaker or str but got a {type(card)}")
 
-        scaled_im   = im.resize(size = (self._card_width, self._card_height))
+        # The cache may be shared between threads, from add_many()
+
+        key = utils.image_hash(im)
+        with self._scaled_lock:
+            if key in self._scaled_cache:
+                return self._scaled_cache[key]
+
+        scaled_im = utils.resize(im, (self._card_width, self._card_height), self._resampling)
+        with self._scaled_lock:
+            self._scaled_cache[key] = scaled_im
+            if len(self._scaled_cache) > scaled_cache_size:
+                del self._scaled_cache[next(iter(self._scaled_cache))]
+        return scaled_im
+
+
+    def _paste(self, scaled_im: Image.Image) -> None:
+        """
+        Paste a scaled card image into the next space on the sheet.
+        """
+        slot_width  = int(self._width / self._columns)
+        slot_height = int(self._height / self._rows)
+        x_pos       = self._current_column * slot_width
+        y_pos       = self._current_row * slot_height
+
+        if not(self._writer is None):
+            if self._current_row >= self._rows:
+                raise ValueError(f'The sheet is full with {self._rows * self._columns} cards')
+            y_pos = 0
+
         self._base_im.paste(im   = scaled_im,
-                           box  = (x_pos, y_pos),
-                           mask = scaled_im,
-                           )
+                            box  = (x_pos, y_pos),
+                            mask = scaled_im,
+                            )
 
         self._current_column = (self._current_column + 1) % self._columns
         if self._current_column == 0:
             self._current_row = self._current_row + 1
+            if not(self._writer is None):
+                self._write_row()
+
+
+    def _write_row(self) -> None:
+        """
+        Write the current row of cards to the stream, and start a new one.
+        """
+        self._writer.write(self._base_im)
+        self._base_im = Image.new(mode  = self._mode,
+                                  size  = self._base_im.size,
+                                  color = self._colour,
+                                  )
+
+
+    def save(self,
+             filename:       str | os.PathLike | BinaryIO | None = None,
+             format:         str | None                          = None,
+             compress_level: int | None                          = None,
+             quality:        int | None                          = None,
+             colours:        int | None                          = None,
+             workers:        int | None                          = None,
+             ) -> memoryview | None:
+        """
+        Write the sheet to the given file, which may be a filename or a
+        binary file object. If there is no file, return the image's bytes.
+
+        ## Parameters
+
+        - `filename`: A filename, or any object with a `write()` method for
+          bytes, such as an open file or an upload stream, which Pillow
+          writes to as it encodes. If `None`, the image is returned as a
+          `memoryview` of its bytes, without copying them.
+        - `format`: The image format, such as `'PNG'`, `'WEBP'` or `'JPEG'`.
+          By default this comes from the filename's extension, or is PNG if
+          there isn't one. A JPEG loses any transparency.
+        - `compress_level`: For PNG, the zlib level from 0 (quickest) to 9
+          (smallest). Pillow's default is 6.
+        - `quality`: For JPEG and WebP, from 1 to 100. Pillow's default is
+          75 for JPEG and 80 for WebP.
+        - `colours`: If given, reduce the image to a palette of this many
+          colours, up to 256. Good for flat-colour art, where it can make a
+          PNG much smaller.
+        - `workers`: For PNG, compress horizontal strips of the image in a
+          pool of this many threads. Can't be used with `colours`.
+
+        If the sheet is being streamed, this finishes it off and there
+        should be no file given.
+        """
+        if not(self._writer is None):
+            self._finish_stream(filename, format)
+            return None
+
+        is_path   = isinstance(filename, (str, os.PathLike))
+        extension = os.path.splitext(filename)[1].lower() if is_path else ''
+        if format is None and extension:
+            format = Image.registered_extensions().get(extension)
+            if format is None:
+                raise ValueError(f"Unknown image file extension '{extension}'")
+        format = (format or 'PNG').upper()
+
+        if not(workers is None) and (format != 'PNG' or not(colours is None)):
+            raise ValueError('Only full-colour PNGs can be saved with workers')
+
+        im      = self._base_im
+        options = {}
+        if not(colours is None):
+            method = Image.Quantize.FASTOCTREE if im.mode == 'RGBA' else Image.Quantize.MEDIANCUT
+            im     = im.quantize(colors = colours, method = method)
+        if format == 'JPEG' and im.mode != 'RGB':
+            im = im.convert('RGB')
+        if not(compress_level is None):
+            options['compress_level'] = compress_level
+        if not(quality is None):
+            options['quality'] = quality
 
+        if filename is None:
+            buffer = io.BytesIO()
+            self._save_image(im, buffer, format, options, workers)
+            return buffer.getbuffer()
 
-    def save(self, filename: str) -> None:
+        if is_path and not(workers is None):
+            with open(filename, 'wb') as f:
+                self._save_image(im, f, format, options, workers)
+        else:
+            self._save_image(im, filename, format, options, workers)
+        return None
+
+
+    def _save_image(self,
+                    im:      Image.Image,
+                    f:       str | os.PathLike | BinaryIO,
+                    format:  str,
+                    options: dict,
+                    workers: int | None,
+                    ) -> None:
         """
-        Write the sheet to the named file.
+        Save an image with Pillow, or else as a PNG compressed in strips
+        by workers, in which case `f` must be a file object.
         """
-        self._base_im.save(filename)
+        if workers is None:
+            im.save(f, format = format, **options)
+            return
+
+        writer = PNGWriter(f,
+                           im.width,
+                           im.height,
+                           mode           = im.mode,
+                           compress_level = options.get('compress_level', 6),
+                           workers        = workers,
+                           )
+        rows = max(1, strip_bytes // (im.width * len(im.mode)))
+        for top in range(0, im.height, rows):
+            writer.write(im.crop((0, top, im.width, min(top + rows, im.height))))
+        writer.close()
+
+
+    def _finish_stream(self,
+                       filename: str | os.PathLike | BinaryIO | None,
+                       format:   str | None,
+                       ) -> None:
+        """
+        Write any remaining rows of the streamed sheet, and close it.
+        """
+        if not(filename is None) or not(format in [None, 'PNG']):
+            raise ValueError('This sheet is already being saved as a PNG to its stream')
+
+        while self._writer.rows < self._height:
+            self._write_row()
+        self._writer.close()
+
+        if not(self._stream_file is None):
+            self._stream_file.close()
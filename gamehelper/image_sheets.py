@@ -0,0 +1,227 @@
+import math
+from collections        import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from PIL import Image
+
+from .card_maker  import CardMaker
+from .image_sheet import ImageSheet
+from gamehelper   import utils
+
+
+class ImageSheets:
+    """
+    A series of image sheets of cards, split to keep within the limits of
+    wherever they're going, such as Screentop or Tabletop Simulator.
+    """
+
+    def __init__(self,
+                 card_width:  int,
+                 card_height: int,
+                 max_width:   int | None                = None,
+                 max_height:  int | None                = None,
+                 max_cards:   int | None                = None,
+                 max_bytes:   int | None                = None,
+                 colour:      tuple[int, int, int, int] = (255, 255, 255, 255),
+                 mode:        str                       = 'RGBA',
+                 format:      str                       = 'PNG',
+                 workers:     int | None                = 2,
+                 resampling:  str                       = 'fast',
+                 ) -> None:
+        """
+        Sheets of cards, each card being `card_width` by `card_height`
+        pixels. A new sheet is started whenever the last one is full.
+
+        ## Limits
+
+        - `max_width`, `max_height`: The most pixels across and down
+          any sheet.
+        - `max_cards`: The most cards on any sheet.
+        - `max_bytes`: The largest encoded file for any sheet. A sheet
+          that comes out bigger than this is split into two with half the
+          cards each, and so on until each part fits.
+
+        Each sheet has the grid with the fewest empty places that fits the
+        limits, and of those the squarest. The last sheet's grid is just
+        big enough for the cards left over.
+
+        ## Output
+
+        - `colour`, `mode`: As for `ImageSheet`.
+        - `format`: The image format of each sheet, such as `'PNG'`.
+        - `workers`: Finished sheets are encoded in a pool of this many
+          background threads while more cards are added. If `None` they
+          are encoded as soon as they're finished, before `add()` returns.
+          The output is the same either way.
+        - `resampling`: As for `ImageSheet`.
+        """
+        for name, limit in [('max_width', max_width),
+                            ('max_height', max_height),
+                            ('max_cards', max_cards),
+                            ('max_bytes', max_bytes),
+                            ]:
+            if not(limit is None) and limit < 1:
+                raise ValueError(f"'{name}' must be at least 1 but got {limit}")
+        utils.check_resampling(resampling)
+        if not(mode in ['RGBA', 'RGB']):
+            raise ValueError(f"Mode must be RGBA or RGB, but got '{mode}'")
+        if mode == 'RGB' and len(colour) == 4 and colour[3] != 255:
+            raise ValueError('An RGB sheet needs an opaque colour')
+        Image.init()
+        if not(format.upper() in Image.SAVE):
+            raise ValueError(f"Format must be one Pillow can save, such as 'PNG', but got '{format}'")
+
+        self._card_width  = card_width
+        self._card_height = card_height
+        self._max_columns = None if max_width is None else max_width // card_width
+        self._max_rows    = None if max_height is None else max_height // card_height
+        self._max_cards   = max_cards
+        self._max_bytes   = max_bytes
+        self._colour      = colour
+        self._mode        = mode
+        self._format      = format
+        self._resampling  = resampling
+
+        if self._max_columns == 0 or self._max_rows == 0:
+            raise ValueError(f'A card of {card_width}x{card_height} is bigger than the maximum sheet size')
+
+        # The most cards any sheet can take, or None if there's no limit
+        self._capacity = max_cards
+        if not(self._max_columns is None or self._max_rows is None):
+            self._capacity = min(self._max_columns * self._max_rows, max_cards or math.inf)
+
+        # Cards for the sheet in progress, scaled to size. Each finished
+        # sheet is a Future of a list of encoded sheets, as from sheets().
+        # With workers we keep up to two per worker in flight.
+        self._cards   = []
+        self._sheets  = []
+        self._pending = deque()
+        self._workers = workers
+        self._pool    = None
+
+    def grid(self, cards: int) -> tuple[int, int]:
+        """
+        The (columns, rows) of the best sheet for the given number of cards,
+        which must be no more than fit on a sheet.
+        """
+        if not(self._capacity is None) and cards > self._capacity:
+            raise ValueError(f'Only {self._capacity} cards fit on a sheet, not {cards}')
+
+        best     = None
+        best_key = None
+        for columns in range(1, min(cards, self._max_columns or cards) + 1):
+            rows = math.ceil(cards / columns)
+            if not(self._max_rows is None) and rows > self._max_rows:
+                continue
+            key = (columns * rows,
+                   abs(columns * self._card_width - rows * self._card_height),
+                   rows,
+                   )
+            if best_key is None or key < best_key:
+                best     = (columns, rows)
+                best_key = key
+        return best
+
+    def add(self,
+            card:  CardMaker | Image.Image | str,
+            count: int                           = 1,
+            ) -> None:
+        """
+        Add the next card `count` times over, starting a new sheet whenever
+        one is full. `card` is a CardMaker, Image, or image filename, as for
+        `ImageSheet`. It's only rendered and scaled once.
+        """
+        if isinstance(card, CardMaker):
+            im = card.image()
+        elif isinstance(card, Image.Image):
+            im = card.convert('RGBA')
+        elif isinstance(card, str):
+            im = Image.open(card).convert('RGBA')
+        else:
+            raise TypeError(f"Can only an Image or CardMaker or str but got a {type(card)}")
+
+        scaled_im = utils.resize(im, (self._card_width, self._card_height), self._resampling)
+        for _ in range(count):
+            self._cards.append(scaled_im)
+            if len(self._cards) == self._capacity:
+                self._finish_sheet()
+
+    def _finish_sheet(self) -> None:
+        """
+        Send the cards of the sheet in progress off to be encoded, and start
+        a new sheet.
+        """
+        cards       = self._cards
+        self._cards = []
+
+        if self._workers is None:
+            future = Future()
+            future.set_result(self._encode(cards))
+        else:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers = self._workers)
+            future = self._pool.submit(self._encode, cards)
+            self._pending.append(future)
+            while len(self._pending) > 2 * self._workers:
+                self._pending.popleft().result()
+        self._sheets.append(future)
+
+    def _encode(self, cards: list[Image.Image]) -> list[tuple[memoryview, int, int, int]]:
+        """
+        Make and encode a sheet of the given cards, splitting it up if it's
+        too many bytes. This may run in a background thread.
+        """
+        columns, rows = self.grid(len(cards))
+        sheet         = ImageSheet(card_width  = self._card_width,
+                                   card_height = self._card_height,
+                                   columns     = columns,
+                                   rows        = rows,
+                                   colour      = self._colour,
+                                   mode        = self._mode,
+                                   )
+        for card in cards:
+            sheet._paste(card)    # Already scaled
+        data = sheet.save(format = self._format)
+
+        if self._max_bytes is None or len(data) <= self._max_bytes:
+            return [(data, columns, rows, len(cards))]
+        if len(cards) == 1:
+            raise ValueError(f'A single card takes {len(data)} bytes, more than the maximum {self._max_bytes}')
+
+        half = math.ceil(len(cards) / 2)
+        return self._encode(cards[:half]) + self._encode(cards[half:])
+
+    def sheets(self) -> list[tuple[memoryview, int, int, int]]:
+        """
+        Finish the last sheet and return all of them, in order, as a list
+        of (image bytes, columns, rows, cards) tuples.
+        """
+        if self._cards:
+            self._finish_sheet()
+        self._pending.clear()
+        if not(self._pool is None):
+            self._pool.shutdown()
+            self._pool = None
+
+        results = []
+        for future in self._sheets:
+            results += future.result()
+        return results
+
+    def save(self, filename: str) -> list[str]:
+        """
+        Finish the last sheet and write each sheet to a file, returning
+        their filenames. The `filename` should include `{}`, which is
+        replaced by the sheet number, starting from 1. For example,
+        `'deck-{}.png'`. It may only leave that out if there's one sheet.
+        """
+        sheets = self.sheets()
+        if len(sheets) > 1 and filename.format(1) == filename.format(2):
+            raise ValueError(f"'{filename}' needs a {{}} for the sheet number, as there are {len(sheets)} sheets")
+
+        filenames = []
+        for number, (data, _, _, _) in enumerate(sheets, start = 1):
+            filenames.append(filename.format(number))
+            with open(filenames[-1], 'wb') as f:
+                f.write(data)
+        return filenames
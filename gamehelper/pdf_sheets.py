@@ -1,16 +1,31 @@
+import hashlib
+import io
 import math
-from datetime import datetime, timezone
-
-from fpdf import FPDF
-from PIL  import Image
+import os
+import struct
+from collections        import deque
+from collections.abc    import Iterable
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime           import datetime, timezone
+from typing             import BinaryIO
+
+from fpdf                      import FPDF
+from fpdf.image_datastructures import RasterImageInfo
+from fpdf.image_parsing        import get_img_info
+from PIL                       import Image
 
 from .card_maker import CardMaker
+from gamehelper  import utils
 
 
 left_margin_fronts_page = 7
 top_margin_fronts_page = 8
 a4_short_length = 210
 a4_long_length = 297
+mm_per_inch = 25.4
+output_chunk_size = 1024 * 1024
+
+encodings = ['lossless', 'jpeg', 'auto']
 
 
 class PDFSheets:
@@ -21,16 +36,37 @@ class PDFSheets:
     def __init__(self,
                  card_width:    float,
                  card_height:   float,
-                 gutter:        float = 4,
-                 shape:         str   = 'rectangle',
-                 include_backs: bool  = True,
+                 gutter:        float        = 4,
+                 shape:         str          = 'rectangle',
+                 include_backs: bool         = True,
+                 workers:       int | None   = None,
+                 dpi:           float | None = None,
+                 encoding:      str          = 'lossless',
+                 quality:       int          = 85,
                  ) -> None:
         """
         Create a new series of A4 sheets with cards, for printing.
         Card width and height exclude gutters.
         Shape may be "rectangle" (default) or "circle".
         By default card backs will be included on alternate sheets.
+        If `workers` is given, images are encoded in a pool of that many
+        processes. The output is the same either way.
+
+        ## Image size and encoding
+
+        - `dpi`: If given, any image with more pixels than this needs at the
+          size it's placed is downsampled before it goes in the PDF.
+        - `encoding`: How images are stored. One of `'lossless'` (default),
+          `'jpeg'`, or `'auto'`, which uses JPEG for photographic images
+          and lossless for the rest. Images with transparency are always
+          lossless.
+        - `quality`: The JPEG quality, from 1 to 95.
+
+        The encoding and quality can also be set for individual cards.
         """
+        if not(encoding in encodings):
+            raise ValueError(f'Encoding must be one of {encodings} but got "{encoding}"')
+
         self.pdf = FPDF(orientation = 'landscape', unit = 'mm', format = 'A4')
         self.pdf.set_margin(0)
 
@@ -39,13 +75,28 @@ class PDFSheets:
         self.gutter        = gutter
         self.shape         = shape
         self.include_backs = include_backs
+        self.dpi           = dpi
+        self.encoding      = encoding
+        self.quality       = quality
 
         self.x = None
         self.y = None
 
-        # Track card backs, a list of (image, x, y) tuples
+        # Track card backs, a list of (image name, x, y) tuples. The images
+        # themselves are already loaded into the PDF's image cache.
         self.backs = []
 
+        # Prepared images, by their encoding job, so they're only encoded
+        # once. See _job_key().
+        self._prepared_jobs = {}
+
+        # Cards added but not yet placed on the page, as a queue of
+        # (prepared front, prepared back, x, y, x_offset, y_offset) tuples.
+        # With workers we keep up to two per worker in flight.
+        self._pending = deque()
+        self._workers = workers
+        self._pool    = None
+
 
     def _inc_xy(self) -> bool:
         """
@@ -207,21 +258,20 @@ class PDFSheets:
             raise ValueError(f'Shape defined as unknown "{self.shape}"')
 
 
-    def _reflect(self, image: Image.Image | str) -> Image.Image:
-        """
-        Reflect an image east-west.
-        `image` is an Image or image filename.
-        """
-        im = image
-        if isinstance(im, str):
-            im = Image.open(image)
+    @property
+    def cards_per_page(self) -> int:
+        """The number of cards that fit on a page (read-only)."""
+        full_width  = self.gutter + self.card_width + self.gutter
+        full_height = self.gutter + self.card_height + self.gutter
+
+        columns = 1
+        while left_margin_fronts_page + (columns + 1) * full_width < a4_long_length:
+            columns += 1
+        rows = 1
+        while top_margin_fronts_page + (rows + 1) * full_height < a4_short_length:
+            rows += 1
 
-        # Data drawn from
-        # https://pillow.readthedocs.io/en/stable/reference/ImageTransform.html#PIL.ImageTransform.AffineTransform
-        return im.transform(size = (im.width, im.height),
-                            method = Image.Transform.AFFINE,
-                            data = (-1, 0, im.width, 0, 1, 0),
-                            )
+        return columns * rows
 
 
     def add(self,
@@ -229,19 +279,120 @@ class PDFSheets:
             x_offset: float                         = 0,
             y_offset: float                         = 0,
             back:     Image.Image | str | None      = None,
+            encoding: str | None                    = None,
+            quality:  int | None                    = None,
+            count:    int                           = 1,
             ) -> None:
         """
-        Add a card image to the sheet.
+        Add a card image to the sheet, `count` times over.
         `card` is a CardMaker, Image, or image filename.
         Its top left may be offset from the origin, which includes the gutters.
         The image will be placed in the centre of the card space, so an offset
         will reduce its size.
         `back` is the back image (Image or filename), or None.
+        `encoding` and `quality` override the sheet's settings for this card's
+        front and back.
+        The card is only rendered and encoded once, however many times it's
+        added, and an image that's identical to one added before isn't
+        encoded again.
+        """
+        front_job, back_job = self._jobs(card, x_offset, y_offset, back, encoding, quality)
+        front               = self._prepare(front_job)
+        back                = None if back_job is None else self._prepare(back_job)
+        for _ in range(count):
+            self._add_prepared(front, back, x_offset, y_offset)
+
+
+    def _add_prepared(self,
+                      front:    Future | tuple[str, dict],
+                      back:     Future | tuple[str, dict] | None,
+                      x_offset: float,
+                      y_offset: float,
+                      ) -> None:
+        """
+        Add a card whose front and back images are prepared, or being
+        prepared, for the PDF.
         """
-        im_width  = self.card_width  + 2*self.gutter - 2*x_offset
-        im_height = self.card_height + 2*self.gutter - 2*y_offset
         self._inc_xy()
 
+        self._pending.append((front, back, self.x, self.y, x_offset, y_offset))
+        self._place_pending(2 * (self._workers or 0))
+
+        if self._last_xy():
+            self.add_backs_page()
+
+
+    def add_all(self,
+                cards:       Iterable[CardMaker | Image.Image | str | tuple],
+                back:        Image.Image | str | None = None,
+                shard_pages: int                      = 1,
+                ) -> None:
+        """
+        Add each card from an iterable, such as a generator.
+        Each card is taken only when it's needed and is not held after it's
+        been added, so a whole deck need never be in memory at once.
+        An item may be a card (as for `add()`) or a `(card, back)` tuple.
+        `back` is used for any card that doesn't come with its own.
+        As with `add()`, the user will need to call `add_backs_page()` after
+        the last card.
+
+        If we have workers, the cards are split into shards of `shard_pages`
+        pages each, and each shard's images are encoded in one worker. There
+        are as many shards in progress as workers. The shards are placed in
+        order, so the PDF is the same as if the cards were added one by one.
+        """
+        items = (item if isinstance(item, tuple) else (item, back) for item in cards)
+
+        if self._workers is None:
+            for card, card_back in items:
+                self.add(card, back = card_back)
+            return
+
+        # The first shard fills up the current page
+
+        shard_size = self.cards_per_page * shard_pages
+        size       = shard_size - len(self.backs) - len(self._pending)
+        shard      = []
+        in_flight  = deque()
+
+        for item in items:
+            shard.append(item)
+            if len(shard) < size:
+                continue
+
+            in_flight.append(self._prepare_shard(shard))
+            shard = []
+            size  = shard_size
+
+            if len(in_flight) >= self._workers:
+                for prepared in in_flight.popleft():
+                    self._add_prepared(*prepared, 0, 0)
+
+        if shard:
+            in_flight.append(self._prepare_shard(shard))
+        for prepared_shard in in_flight:
+            for prepared in prepared_shard:
+                self._add_prepared(*prepared, 0, 0)
+
+
+    def _jobs(self,
+              card:     CardMaker | Image.Image | str,
+              x_offset: float,
+              y_offset: float,
+              back:     Image.Image | str | None,
+              encoding: str | None,
+              quality:  int | None,
+              ) -> tuple[tuple, tuple | None]:
+        """
+        Work out the encoding jobs for a card's front and back images. Each
+        job is the arguments for `_encode_image()`. The back job is None if
+        no back is needed.
+        """
+        encoding = encoding or self.encoding
+        quality  = quality or self.quality
+        if not(encoding in encodings):
+            raise ValueError(f'Encoding must be one of {encodings} but got "{encoding}"')
+
         im = None
         if isinstance(card, CardMaker):
             im = card.image_with_gutters()
@@ -252,17 +403,155 @@ class PDFSheets:
         else:
             raise TypeError(f"Can only an Image or CardMaker or str but got a {type(card)}")
 
-        self.pdf.image(im,
-                       x = self.x + x_offset,
-                       y = self.y + y_offset,
-                       w = im_width,
-                       h = im_height,
-                       )
-        self._gutter_marks(self.x, self.y)
-        self.backs.append((back, self.x, self.y))
+        # For convenience
+        full_width   = self.gutter + self.card_width + self.gutter
+        full_height  = self.gutter + self.card_height + self.gutter
+        image_filter = self.pdf.image_cache.image_filter
+
+        def max_size(size_mm):
+            return None if self.dpi is None else _max_size_px(size_mm, self.dpi)
+
+        front_job = (im,
+                     image_filter,
+                     max_size((full_width - 2*x_offset, full_height - 2*y_offset)),
+                     encoding,
+                     quality,
+                     )
 
-        if self._last_xy():
-            self.add_backs_page()
+        if back is None or not(self.include_backs):
+            return (front_job, None)
+
+        back_job = (back,
+                    image_filter,
+                    max_size((full_width, full_height)),
+                    encoding,
+                    quality,
+                    )
+        return (front_job, back_job)
+
+
+    def _prepare(self, job: tuple) -> Future | tuple[str, dict]:
+        """
+        Start encoding an image for the PDF.
+        `job` is the arguments for `_encode_image()`.
+        Returns a future if we have workers, or else the `(name, info)` result.
+        An image with the same job as before isn't encoded again.
+        """
+        key = _job_key(job)
+        if key in self._prepared_jobs:
+            return self._prepared_jobs[key]
+
+        if self._workers is None:
+            prepared = _encode_image(*job)
+        else:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers = self._workers)
+            prepared = self._pool.submit(_encode_image, *job)
+
+        self._prepared_jobs[key] = prepared
+        return prepared
+
+
+    def _prepare_shard(self,
+                       shard: list[tuple[CardMaker | Image.Image | str, Image.Image | str | None]],
+                       ) -> list[tuple[Future, Future | None]]:
+        """
+        Start encoding all the images for a shard of `(card, back)` tuples in
+        one worker. Returns a `(front, back)` tuple of futures for each card.
+        """
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers = self._workers)
+
+        # Each card needs one or two images, unless we've prepared them before
+
+        jobs     = []
+        futures  = []
+        prepared = []
+
+        def prepare(job):
+            if job is None:
+                return None
+            key = _job_key(job)
+            if key in self._prepared_jobs:
+                return self._prepared_jobs[key]
+            future = Future()
+            jobs.append(job)
+            futures.append(future)
+            self._prepared_jobs[key] = future
+            return future
+
+        for card, back in shard:
+            front_job, back_job = self._jobs(card, 0, 0, back, None, None)
+            prepared.append((prepare(front_job), prepare(back_job)))
+
+        # Hand out the results when the worker's done
+
+        def share_results(shard_future):
+            if shard_future.exception() is None:
+                for future, result in zip(futures, shard_future.result()):
+                    future.set_result(result)
+            else:
+                for future in futures:
+                    future.set_exception(shard_future.exception())
+
+        self._pool.submit(_encode_shard, jobs).add_done_callback(share_results)
+
+        return prepared
+
+
+    def _load(self, prepared: Future | tuple[str, dict]) -> str:
+        """
+        Load a prepared image into the PDF's image cache, if it's not there
+        already, and return its name in the cache. This does the bookkeeping
+        of fpdf's own `preload_image()`, but it's not counted as used until
+        it's placed on a page.
+        An SVG file has no info, and is left for fpdf to draw from its name.
+        """
+        if isinstance(prepared, Future):
+            prepared = prepared.result()
+        name, info = prepared
+
+        images = self.pdf.image_cache.images
+        if info is None or name in images:
+            return name
+
+        info['i']      = len(images) + 1
+        info['usages'] = 0
+        info['iccp_i'] = None
+        iccp = info.get('iccp')
+        if iccp:
+            icc_profiles = self.pdf.image_cache.icc_profiles
+            if not(iccp in icc_profiles):
+                icc_profiles[iccp] = len(icc_profiles)
+            info['iccp_i'] = icc_profiles[iccp]
+            info['iccp']   = None
+        images[name] = info
+
+        return name
+
+
+    def _place_pending(self, limit: int = 0) -> None:
+        """
+        Place pending cards on the page, in the order they were added,
+        until no more than `limit` are left pending.
+        Their backs are loaded, ready for the backs page.
+        """
+        # For convenience
+        card_width  = self.card_width
+        card_height = self.card_height
+        gutter      = self.gutter
+
+        while len(self._pending) > limit:
+            front, back, x, y, x_offset, y_offset = self._pending.popleft()
+
+            self.pdf.image(self._load(front),
+                           x = x + x_offset,
+                           y = y + y_offset,
+                           w = card_width  + 2*gutter - 2*x_offset,
+                           h = card_height + 2*gutter - 2*y_offset,
+                           )
+            self._gutter_marks(x, y)
+            self.backs.append((None if back is None else self._load(back), x, y))
 
 
     def add_backs_page(self) -> None:
@@ -272,6 +561,8 @@ class PDFSheets:
         user will need to call it themselves at after adding the last card.
         """
 
+        self._place_pending()
+
         # This will trigger a new page
         self.x = None
         self.y = None
@@ -284,13 +575,13 @@ class PDFSheets:
 
 
     def _add_back(self,
-                  image: Image.Image | str | None,
-                  x:     float,
-                  y:     float,
+                  name: str | None,
+                  x:    float,
+                  y:    float,
                   ) -> None:
         """
         Add a card back to the PDF, which includes the gutters.
-        `image` is an Image, image filename, or None.
+        `name` is the name of the image in the PDF's image cache, or None.
         The x,y is the position of the card front, so we need to flip this page.
         """
 
@@ -303,34 +594,57 @@ class PDFSheets:
         x_origin = a4_long_length / 2
         y_origin = a4_short_length / 2
 
-        # We need to mirror the whole page, then mirror each card back again
-        with self.pdf.mirror(origin = (x_origin, y_origin), angle = 'EAST'):
-            if not(image is None):
-                reflected_im = self._reflect(image)
-                self.pdf.image(reflected_im,
-                               x = self.x,
-                               y = self.y, 
-                               w = gutter + card_width + gutter,
-                               h = gutter + card_height + gutter
+        # For the back image, mirroring the page north-south and then the
+        # image east-west is the same as turning the image around in the
+        # mirrored position. That way the image never needs decoding.
+        if not(name is None):
+            full_width  = gutter + card_width + gutter
+            full_height = gutter + card_height + gutter
+            x_back      = self.x
+            y_back      = 2 * y_origin - self.y - full_height
+            with self.pdf.rotation(angle = 180,
+                                   x     = x_back + full_width / 2,
+                                   y     = y_back + full_height / 2,
+                                   ):
+                self.pdf.image(name,
+                               x = x_back,
+                               y = y_back,
+                               w = full_width,
+                               h = full_height,
                                )
+
+        # We need to mirror the whole page for the gutter marks
+        with self.pdf.mirror(origin = (x_origin, y_origin), angle = 'EAST'):
             self._gutter_marks(self.x, self.y)
 
 
     def _add_page(self) -> None:
         """
         Add a next page to the PDF and reset our x, y position.
+        Any cards pending for the current page are placed first.
         """
+        self._place_pending()
         self.pdf.add_page()
         self.x = left_margin_fronts_page
         self.y = top_margin_fronts_page
 
 
-    def output(self, filename: str, date: datetime | int | None = 0) -> None:
+    def output(self,
+               filename: str | os.PathLike | BinaryIO | None = None,
+               date:     datetime | int | None              = 0,
+               ) -> memoryview | None:
         """
-        Write the PDF sheets to the given file.
+        Write the PDF sheets to the given file, which may be a filename or
+        a binary file object. If there is no file, return the PDF's bytes.
 
         ## Parameters
 
+        - `filename`: A filename, or any object with a `write()` method for
+          bytes, such as an open file or an upload stream. The PDF is
+          written in chunks of `output_chunk_size` bytes. If `None`, the
+          PDF is returned as a `memoryview` of its bytes, without copying
+          them.
+
         - `date`: Sets the PDF creation date, which determines the binary
           output. May be a `datetime` object, an `int` (seconds since the
           Unix Epoch), or `None` (which uses the current date and time).
@@ -341,5 +655,199 @@ class PDFSheets:
             date = datetime.now(tz = timezone.utc)
         elif isinstance(date, int):
             date = datetime.fromtimestamp(date, tz = timezone.utc)
+        self._place_pending()
+        if not(self._pool is None):
+            self._pool.shutdown()
+            self._pool = None
+
         self.pdf.set_creation_date(date = date)
-        self.pdf.output(filename)
+        pdf_bytes = memoryview(self.pdf.output())
+
+        if filename is None:
+            return pdf_bytes
+
+        if isinstance(filename, (str, os.PathLike)):
+            with open(filename, 'wb') as f:
+                _write_chunks(f, pdf_bytes)
+        else:
+            _write_chunks(filename, pdf_bytes)
+        return None
+
+
+def _write_chunks(f: BinaryIO, data: memoryview) -> None:
+    """
+    Write data to a binary file object in chunks, without copying it.
+    """
+    for start in range(0, len(data), output_chunk_size):
+        f.write(data[start : start + output_chunk_size])
+
+
+def _max_size_px(size_mm: tuple[float, float], dpi: float) -> tuple[int, int]:
+    """
+    The most pixels needed across and down for something of the given size
+    in mm, at the given dpi.
+    """
+    return (math.ceil(size_mm[0] / mm_per_inch * dpi),
+            math.ceil(size_mm[1] / mm_per_inch * dpi),
+            )
+
+
+def _is_transparent(im: Image.Image) -> bool:
+    """
+    True if the image has any pixels that aren't fully opaque.
+    """
+    if im.mode in ('RGBA', 'LA', 'PA') or 'transparency' in im.info:
+        return im.convert('RGBA').getchannel('A').getextrema()[0] < 255
+    return False
+
+
+def _is_photographic(im: Image.Image) -> bool:
+    """
+    A rough guess at whether an image is a photograph (or similar), rather
+    than flat-colour art. Photographs have many more distinct colours, even
+    when scaled down.
+    """
+    sample = im.convert('RGB')
+    sample.thumbnail((256, 256))
+    return sample.getcolors(maxcolors = 4096) is None
+
+
+def _png_info(filename: str) -> dict | None:
+    """
+    Get the fpdf image info for a PNG file whose compressed data can go
+    straight into the PDF, which is an 8-bit greyscale or RGB image that's
+    not interlaced and has no transparency or colour profile.
+    Only the PNG chunks are read, the pixels are never decoded.
+    Returns None if the file isn't suitable, or isn't what we expect, such
+    as being cut short, so fpdf can read it its own way.
+    """
+    with open(filename, 'rb') as f:
+        if f.read(8) != b'\x89PNG\r\n\x1a\n':
+            return None
+
+        idat        = bytearray()
+        colour_type = None
+        while True:
+            head = f.read(8)
+            if len(head) != 8:
+                return None
+            length, kind = struct.unpack('>I4s', head)
+            chunk        = f.read(length)
+            if len(chunk) != length or len(f.read(4)) != 4:    # CRC
+                return None
+
+            if kind == b'IHDR':
+                if length != 13:
+                    return None
+                w, h, depth, colour_type, _, _, interlace = struct.unpack('>IIBBBBB', chunk)
+                if depth != 8 or not(colour_type in (0, 2)) or interlace != 0:
+                    return None
+            elif kind in (b'tRNS', b'iCCP'):
+                return None
+            elif kind == b'IDAT':
+                idat += chunk
+            elif kind == b'IEND':
+                break
+
+    if colour_type is None or not(idat):
+        return None
+
+    dpn = 3 if colour_type == 2 else 1
+    return RasterImageInfo(data     = bytes(idat),
+                           w        = w,
+                           h        = h,
+                           cs       = 'DeviceRGB' if colour_type == 2 else 'DeviceGray',
+                           iccp     = None,
+                           bpc      = 8,
+                           dpn      = dpn,
+                           f        = 'FlateDecode',
+                           inverted = False,
+                           dp       = f'/Predictor 15 /Colors {dpn} /Columns {w}',
+                           )
+
+
+def _job_key(job: tuple) -> tuple:
+    """
+    A key for an encoding job, which is the arguments for `_encode_image()`.
+    An image file is known by its name, and an image by a hash of its
+    pixels, so identical cards share a key however they were made, and an
+    image that's been drawn on since it was last added gets a new one.
+    Hashing is much quicker than encoding, so it's done here rather than
+    in a worker.
+    """
+    image = job[0]
+    if isinstance(image, str):
+        return job
+    return (utils.image_hash(image),) + job[1:]
+
+
+def _encode_image(image:        Image.Image | str,
+                  image_filter: str,
+                  max_size:     tuple[int, int] | None = None,
+                  encoding:     str                    = 'lossless',
+                  quality:      int                    = 85,
+                  ) -> tuple[str, dict]:
+    """
+    Encode an image as fpdf would for `FPDF.image()`, returning the name it
+    would be cached under and its image info. Images are named by their
+    filename, or else a hash of their pixels, so duplicates can be spotted.
+
+    JPEG files, and PNG files where `_png_info()` allows, go into the PDF as
+    they are, without their pixels being decoded. SVG files aren't raster
+    images, so they're left for fpdf to draw, and their info is `None`.
+
+    If `max_size` is given then a bigger image is downsampled to fit.
+    If `encoding` is `'jpeg'`, or `'auto'` and the image looks photographic,
+    then an image without transparency is stored as a JPEG.
+
+    This is a function, not a method, so it can be run in a worker process.
+    """
+    def too_big(im):
+        return not(max_size is None) and (im.width > max_size[0] or im.height > max_size[1])
+
+    # Images from files are left for fpdf to read unless we need to change them
+
+    if isinstance(image, str) and image.endswith('.svg'):    # As fpdf tells
+        return (image, None)
+
+    if isinstance(image, str):
+        with Image.open(image) as im:    # Only reads the header
+            if not(too_big(im)) and (encoding == 'lossless' or im.format == 'JPEG'):
+                info = None
+                if im.format == 'PNG' and image_filter in ('AUTO', 'FlateDecode'):
+                    info = _png_info(image)
+                return (image, info or get_img_info(image, None, image_filter))
+            im.load()
+        image = im
+
+    if too_big(image):
+        image = image.resize(size         = (min(image.width, max_size[0]),
+                                             min(image.height, max_size[1])),
+                             resample     = Image.Resampling.LANCZOS,
+                             reducing_gap = 3.0,
+                             )
+
+    use_jpeg = (encoding != 'lossless'
+                and not(_is_transparent(image))
+                and (encoding == 'jpeg' or _is_photographic(image)))
+
+    img_hash = hashlib.new('md5', usedforsecurity = False)
+    img_hash.update(image.tobytes())
+    name = img_hash.hexdigest()
+
+    if use_jpeg:
+        jpeg = io.BytesIO()
+        image.convert('RGB').save(jpeg, format = 'JPEG', quality = quality)
+        name = f'{name}-jpeg-{quality}'
+        return (name, get_img_info(name, jpeg, 'DCTDecode'))
+
+    return (name, get_img_info(name, image, image_filter))
+
+
+def _encode_shard(jobs: list[tuple]) -> list[tuple[str, dict]]:
+    """
+    Encode a list of images, where each job is the arguments for
+    `_encode_image()`. The jobs have already had duplicates taken out.
+    This is a function, not a method, so it can be run in a worker process.
+    """
+    return [_encode_image(*job) for job in jobs]
@@ -0,0 +1,172 @@
+import struct
+import zlib
+from collections        import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing             import BinaryIO
+
+from PIL import Image
+from PIL import ImageChops
+
+
+png_signature = b'\x89PNG\r\n\x1a\n'
+png_colour_types = {'RGB': 2, 'RGBA': 6}
+png_filter_up = b'\x02'
+zlib_header = b'\x78\x9c'
+deflate_window = 32 * 1024
+
+
+class PNGWriter:
+    """
+    Write a PNG image to a binary file a band of rows at a time, so the
+    whole image never needs to be in memory.
+    """
+
+    def __init__(self,
+                 f:              BinaryIO,
+                 width:          int,
+                 height:         int,
+                 mode:           str        = 'RGBA',
+                 compress_level: int        = 6,
+                 workers:        int | None = None,
+                 ) -> None:
+        """
+        Start writing a PNG of the given size to the file object `f`.
+        `mode` may be "RGBA" (default) or "RGB".
+        The `compress_level` is for zlib, from 0 (none) to 9 (most).
+
+        If `workers` is given, each band is compressed separately in a pool
+        of that many threads, as zlib runs outside the GIL. Each band starts
+        with the end of the band before as its dictionary, so the PNG is
+        barely bigger than if it were compressed in one go.
+        """
+        if not(mode in png_colour_types):
+            raise ValueError(f'Mode must be one of {list(png_colour_types)} but got "{mode}"')
+
+        self._f      = f
+        self._width  = width
+        self._height = height
+        self._mode   = mode
+        self._rows   = 0    # Rows written so far
+        self._closed = False
+
+        self._compressor   = zlib.compressobj(compress_level)
+        self._previous_row = Image.new(mode = mode, size = (width, 1), color = 0)
+
+        # With workers, bands are compressed as raw deflate data, and we
+        # write the zlib header and checksum ourselves. Compressed bands
+        # are written in order, with up to two per worker in flight.
+        self._compress_level = compress_level
+        self._workers        = workers
+        self._pool           = None
+        self._in_flight      = deque()
+        self._adler          = zlib.adler32(b'')
+        self._window         = b''    # The end of the last band
+        if not(workers is None):
+            self._pool = ThreadPoolExecutor(max_workers = workers)
+
+        f.write(png_signature)
+        self._write_chunk(b'IHDR', struct.pack('>IIBBBBB',
+                                               width,
+                                               height,
+                                               8,    # Bits per sample
+                                               png_colour_types[mode],
+                                               0,    # Compression method
+                                               0,    # Filter method
+                                               0,    # No interlacing
+                                               ))
+        if not(workers is None):
+            self._write_chunk(b'IDAT', zlib_header)
+
+    @property
+    def rows(self) -> int:
+        """The number of rows written so far (read-only)."""
+        return self._rows
+
+    def _write_chunk(self, kind: bytes, data: bytes) -> None:
+        """
+        Write a PNG chunk of the given kind.
+        """
+        self._f.write(struct.pack('>I', len(data)))
+        self._f.write(kind)
+        self._f.write(data)
+        self._f.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(kind))))
+
+    def _filter(self, band: Image.Image) -> bytes:
+        """
+        Get the image data for a band of rows, with each row filtered by
+        its difference from the row above, as PNG's "Up" filter.
+        """
+        width, height = band.size
+
+        above = Image.new(mode = self._mode, size = band.size)
+        above.paste(self._previous_row, (0, 0))
+        above.paste(band.crop((0, 0, width, height - 1)), (0, 1))
+        self._previous_row = band.crop((0, height - 1, width, height))
+
+        data      = ImageChops.subtract_modulo(band, above).tobytes()
+        row_bytes = len(data) // height
+        rows      = [data[i : i + row_bytes] for i in range(0, len(data), row_bytes)]
+
+        return png_filter_up + png_filter_up.join(rows)
+
+    def write(self, band: Image.Image) -> None:
+        """
+        Write the next band of rows, which is an image the full width of
+        the PNG. It will be converted to the PNG's mode if need be.
+        """
+        if band.width != self._width:
+            raise ValueError(f'Band is {band.width} pixels wide but the image is {self._width}')
+        if self._rows + band.height > self._height:
+            raise ValueError(f'Band of {band.height} rows would go beyond the image height of {self._height}')
+
+        if band.mode != self._mode:
+            band = band.convert(self._mode)
+
+        data = self._filter(band)
+        self._rows += band.height
+
+        if self._pool is None:
+            compressed = self._compressor.compress(data)
+            if compressed:
+                self._write_chunk(b'IDAT', compressed)
+            return
+
+        self._in_flight.append(self._pool.submit(_deflate, data, self._compress_level, self._window))
+        self._adler  = zlib.adler32(data, self._adler)
+        self._window = data[-deflate_window:]
+        while len(self._in_flight) > 2 * self._workers:
+            self._write_chunk(b'IDAT', self._in_flight.popleft().result())
+
+    def close(self) -> None:
+        """
+        Finish the PNG. All its rows must have been written.
+        """
+        if self._closed:
+            raise ValueError('The PNG has already been finished')
+        if self._rows != self._height:
+            raise ValueError(f'Only {self._rows} of {self._height} rows have been written')
+
+        if self._pool is None:
+            self._write_chunk(b'IDAT', self._compressor.flush())
+        else:
+            while self._in_flight:
+                self._write_chunk(b'IDAT', self._in_flight.popleft().result())
+            self._pool.shutdown()
+            final_block = zlib.compressobj(self._compress_level, zlib.DEFLATED, -15).flush()
+            self._write_chunk(b'IDAT', final_block + struct.pack('>I', self._adler))
+
+        self._write_chunk(b'IEND', b'')
+        self._closed = True
+
+
+def _deflate(data: bytes, compress_level: int, window: bytes) -> bytes:
+    """
+    Compress data as raw deflate blocks that end on a byte boundary, but
+    don't end the stream, so they can be joined to others. The `window`
+    is the data just before, which it may refer back to.
+    """
+    if window:
+        compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -15, zdict = window)
+    else:
+        compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
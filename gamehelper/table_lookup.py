@@ -0,0 +1,80 @@
+import datetime
+from collections.abc import Sequence
+
+
+class TableLookup(object):
+    """
+    A two-way table, such as a matrix of costs, for looking up values by
+    the name of their row and the name of their column. The names are
+    held in dicts, so each lookup takes the same short time however big
+    the table is.
+
+    Get one from `ExcelHelper.table_lookup()`. It holds the values as
+    they were when it was made.
+    """
+
+    def __init__(self,
+                 row_names:    Sequence[str | float | int | datetime.datetime | None],
+                 column_names: Sequence[str | float | int | datetime.datetime | None],
+                 rows:         Sequence[Sequence[str | float | int | datetime.datetime]],
+                 ) -> None:
+        """
+        Make a lookup from the names down the first column, the names
+        across the first row, and the values in each row. As when searching
+        a sheet, if a name is repeated the first one is used, and blank
+        names are ignored.
+        """
+        if len(rows) != len(row_names):
+            raise ValueError(f'{len(row_names)} row names but {len(rows)} rows')
+        for values in rows:
+            if len(values) != len(column_names):
+                raise ValueError(f'{len(column_names)} column names but a row of {len(values)} values')
+
+        self.row_names    = list(row_names)
+        self.column_names = list(column_names)
+        self._rows        = [tuple(values) for values in rows]
+        self._row_positions    = _positions(self.row_names)
+        self._column_positions = _positions(self.column_names)
+
+
+    def __repr__(self) -> str:
+        return f'<TableLookup of {len(self._row_positions)} rows by {len(self._column_positions)} columns>'
+
+
+    def __getitem__(self, names: tuple[str, str]) -> str | float | int | datetime.datetime:
+        """
+        The value for a (row name, column name), so that
+        `costs['Fire', 'Ice']` is the same as `costs.value('Fire', 'Ice')`.
+        """
+        return self.value(*names)
+
+
+    def __contains__(self, names: tuple[str, str]) -> bool:
+        row_name, column_name = names
+        return row_name in self._row_positions and column_name in self._column_positions
+
+
+    def value(self,
+              row_name:    str,
+              column_name: str,
+              ) -> str | float | int | datetime.datetime:
+        """
+        The value in the row with the given name and the column with the
+        given name.
+        """
+        row    = self._row_positions.get(row_name)
+        column = self._column_positions.get(column_name)
+        if row is None or column is None:
+            raise LookupError(f'Cannot find cell for ({row_name},{column_name}) in table')
+        return self._rows[row][column]
+
+
+def _positions(names: Sequence[str | float | int | datetime.datetime | None]) -> dict:
+    """
+    A dict from each name that isn't blank to where it first appears.
+    """
+    positions = {}
+    for i, name in enumerate(names):
+        if not(name is None):
+            positions.setdefault(name, i)
+    return positions
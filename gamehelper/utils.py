@@ -1,5 +1,19 @@
+import hashlib
 from collections.abc import Callable
 
+from PIL import Image
+
+
+# Resampling policies, each a (filter, reducing gap) pair. A reducing gap
+# lets Pillow first shrink a large image by a whole factor with
+# Image.reduce(), which is quick, and then resample the rest of the way.
+# The smaller the gap the quicker, and the rougher. 'fast' is Pillow's own
+# default, with no gap, so it gives the same pixels as a plain resize().
+resampling_policies = {'draft': (Image.Resampling.BILINEAR, 1.0),
+                       'fast':  (Image.Resampling.BICUBIC, None),
+                       'final': (Image.Resampling.LANCZOS, 3.0),
+                       }
+
 
 def insert_new_lines(text: str, length: int) -> str:
     """
@@ -177,3 +191,40 @@ def box(left:           float | None = None,
         bottom = top + height
 
     return (left, top, right, bottom, width, height)
+
+
+def image_hash(im: Image.Image) -> str:
+    """
+    A hash of an image's mode, size and pixels, so identical images can be
+    spotted cheaply, whatever objects they are.
+    """
+    img_hash = hashlib.new('md5', usedforsecurity = False)
+    img_hash.update(f'{im.mode} {im.width}x{im.height} '.encode())
+    img_hash.update(im.tobytes())
+    return img_hash.hexdigest()
+
+
+def check_resampling(resampling: str) -> None:
+    """
+    Raise a ValueError if `resampling` isn't one of the `resampling_policies`.
+    """
+    if not(resampling in resampling_policies):
+        raise ValueError(f"Resampling must be one of {list(resampling_policies)}, but got '{resampling}'")
+
+
+def resize(im:         Image.Image,
+           size:       tuple[int, int],
+           resampling: str             = 'fast',
+           ) -> Image.Image:
+    """
+    Resize an image under one of the `resampling_policies`:
+    `'draft'` for quick previews, `'fast'` (default), or `'final'` for the
+    best quality. Enlarging doesn't use the reducing gap.
+    """
+    check_resampling(resampling)
+
+    resample, reducing_gap = resampling_policies[resampling]
+    return im.resize(size         = size,
+                     resample     = resample,
+                     reducing_gap = reducing_gap,
+                     )
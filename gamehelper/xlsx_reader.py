@@ -0,0 +1,906 @@
+import datetime
+import hashlib
+import json
+import mmap
+import os
+import posixpath
+import re
+import struct
+import sys
+import zipfile
+from array           import array
+from collections.abc import Iterator
+from typing          import BinaryIO
+from xml.etree       import ElementTree
+
+
+main_ns = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+rels_ns = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+doc_ns  = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+
+office_document_type = doc_ns[1:-1] + '/officeDocument'
+shared_strings_type  = doc_ns[1:-1] + '/sharedStrings'
+styles_type          = doc_ns[1:-1] + '/styles'
+table_type           = doc_ns[1:-1] + '/table'
+
+windows_epoch = datetime.datetime(1899, 12, 30)
+mac_epoch     = datetime.datetime(1904, 1, 1)
+
+# Built-in number formats that are dates or times, and the one that's a
+# duration. Others are given in the styles part.
+builtin_date_formats      = {14, 15, 16, 17, 18, 19, 20, 21, 22, 45, 46, 47}
+builtin_timedelta_formats = {46}
+
+# As OpenPyXL decides which number formats are dates and durations
+format_strip_re = re.compile(r'".*?"|\[(?!hh?\]|mm?\]|ss?\])[^\]]*\]')
+format_date_re  = re.compile(r'(?<![_\\])[dmhysDMHYS]')
+timedelta_re    = re.compile(r'\[hh?\](:mm(:ss(\.0*)?)?)?|\[mm?\](:ss(\.0*)?)?|\[ss?\](\.0*)?', re.I)
+coordinate_re   = re.compile(r'^\$?([A-Za-z]{1,3})\$?(\d+)$')
+
+# Change this if the layout of snapshots changes, so old ones are ignored
+snapshot_version = 3
+
+# The kinds of value in a snapshot. Each is held in the snapshot's array of
+# ints, except floats which have their own array. Strings, and ints too big
+# for the array, are indexes into the table of strings.
+str_kind, int_kind, float_kind, bool_kind, datetime_kind, time_kind, timedelta_kind, big_int_kind = range(8)
+
+value_kinds = {str:                str_kind,
+               int:                int_kind,
+               float:              float_kind,
+               bool:               bool_kind,
+               datetime.datetime:  datetime_kind,
+               datetime.time:      time_kind,
+               datetime.timedelta: timedelta_kind,
+               }
+
+unix_epoch  = datetime.datetime(1970, 1, 1)
+microsecond = datetime.timedelta(microseconds = 1)
+
+
+class XLSXCell(object):
+    """
+    A cell of an `XLSXWorksheet`, with its `row`, `column` and `value`.
+    """
+
+    __slots__ = ('row', 'column', 'value')
+
+    def __init__(self,
+                 row:    int,
+                 column: int,
+                 value:  str | float | int | bool | datetime.datetime | None = None,
+                 ) -> None:
+        self.row    = row
+        self.column = column
+        self.value  = value
+
+
+    @property
+    def coordinate(self) -> str:
+        """
+        The cell's coordinate, such as "B3".
+        """
+        return f'{column_letter(self.column)}{self.row}'
+
+
+    def __repr__(self) -> str:
+        return f'<XLSXCell {self.coordinate}>'
+
+
+class XLSXTable(object):
+    """
+    The definition of an Excel Table on an `XLSXWorksheet`, with the same
+    attributes as an OpenPyXL `Table` that `ExcelHelper` needs.
+    """
+
+    def __init__(self,
+                 name:           str,
+                 displayName:    str,
+                 ref:            str,
+                 headerRowCount: int,
+                 totalsRowCount: int,
+                 column_names:   list[str],
+                 ) -> None:
+        self.name           = name
+        self.displayName    = displayName
+        self.ref            = ref
+        self.headerRowCount = headerRowCount
+        self.totalsRowCount = totalsRowCount
+        self.column_names   = column_names
+
+
+    def __repr__(self) -> str:
+        return f'<XLSXTable {self.displayName} {self.ref}>'
+
+
+class XLSXDefinedName(object):
+    """
+    A defined name in an `XLSXWorkbook`, such as a named range. Its
+    `attr_text` is what it refers to, such as "Sheet1!$A$1:$D$10", as with
+    an OpenPyXL `DefinedName`.
+    """
+
+    def __init__(self, name: str, attr_text: str) -> None:
+        self.name      = name
+        self.attr_text = attr_text
+
+
+    def __repr__(self) -> str:
+        return f'<XLSXDefinedName {self.name} = {self.attr_text}>'
+
+
+class XLSXWorksheet(object):
+    """
+    A worksheet of an `XLSXWorkbook`. Its cells are read from the file, or
+    from a snapshot, the first time they're needed.
+
+    This has as much of the interface of an OpenPyXL worksheet as
+    `ExcelHelper` needs. In particular its cells are in a dict called
+    `_cells`, keyed by (row, column), just as OpenPyXL's are. Its Excel
+    Tables are in `tables` and the names defined just for it are in
+    `defined_names`, each a dict by name.
+    """
+
+    def __init__(self,
+                 parent: 'XLSXWorkbook',
+                 title:  str,
+                 source: str | tuple[int, int],
+                 ) -> None:
+        """
+        The `source` is where the parent reads the cells from: the path of
+        the worksheet in the file, or the place of its cells in a snapshot.
+        """
+        self.parent        = parent
+        self.title         = title
+        self.defined_names = {}
+        self._source       = source
+        self._parsed       = None
+        self._tables       = None
+
+
+    def __repr__(self) -> str:
+        return f'<XLSXWorksheet "{self.title}">'
+
+
+    @property
+    def tables(self) -> dict[str, XLSXTable]:
+        """
+        The Excel Tables on this worksheet, by name.
+        """
+        if self._tables is None:
+            self._tables = self.parent._read_tables(self._source)
+        return self._tables
+
+
+    @property
+    def _cells(self) -> dict[tuple[int, int], XLSXCell]:
+        if self._parsed is None:
+            self._parsed = self.parent._read_cells(self._source)
+        return self._parsed
+
+
+    def cell(self,
+             row:    int,
+             column: int,
+             value:  str | float | int | bool | datetime.datetime | None = None,
+             ) -> XLSXCell:
+        """
+        Get the cell at the given row and column, creating it if need be.
+        If a value is given, the cell's value is set to it.
+        """
+        if row < 1 or column < 1:
+            raise ValueError('Row or column values must be at least 1')
+
+        cells = self._cells
+        cell  = cells.get((row, column))
+        if cell is None:
+            cell = XLSXCell(row, column)
+            cells[(row, column)] = cell
+        if not(value is None):
+            cell.value = value
+        return cell
+
+
+    def __getitem__(self, coordinate: str) -> XLSXCell:
+        """
+        Get the cell at a coordinate such as "B3".
+        """
+        row, column = coordinate_to_tuple(coordinate)
+        return self.cell(row = row, column = column)
+
+
+    def __setitem__(self,
+                    coordinate: str,
+                    value:      str | float | int | bool | datetime.datetime | None,
+                    ) -> None:
+        self[coordinate].value = value
+
+
+    @property
+    def min_row(self) -> int:
+        return min((r for r, c in self._cells), default = 1)
+
+
+    @property
+    def max_row(self) -> int:
+        return max((r for r, c in self._cells), default = 1)
+
+
+    @property
+    def min_column(self) -> int:
+        return min((c for r, c in self._cells), default = 1)
+
+
+    @property
+    def max_column(self) -> int:
+        return max((c for r, c in self._cells), default = 1)
+
+
+    def iter_rows(self,
+                  min_row:     int | None = None,
+                  max_row:     int | None = None,
+                  min_col:     int | None = None,
+                  max_col:     int | None = None,
+                  values_only: bool       = False,
+                  ) -> Iterator[tuple]:
+        """
+        Yield rows of cells, or of values if `values_only`, as OpenPyXL's
+        `iter_rows()` does. Unlike that, cells that don't exist aren't
+        created; their places are `None`.
+        """
+        cells   = self._cells
+        min_row = min_row or 1
+        min_col = min_col or 1
+        max_row = max_row or self.max_row
+        max_col = max_col or self.max_column
+        columns = range(min_col, max_col + 1)
+
+        for r in range(min_row, max_row + 1):
+            row = (cells.get((r, c)) for c in columns)
+            if values_only:
+                yield tuple(None if cell is None else cell.value for cell in row)
+            else:
+                yield tuple(row)
+
+
+class XLSXWorkbook(object):
+    """
+    A minimal reader of cell values from an `.xlsx` file, which is much
+    quicker to import and to load than OpenPyXL. It reads only values,
+    not formulas or formatting, so a formula cell has the value Excel last
+    calculated for it, as with OpenPyXL's `load_workbook(..., data_only = True)`.
+    Numbers formatted as dates are read as dates.
+
+    Each worksheet is read from the file the first time its cells are
+    needed, so sheets that aren't used cost almost nothing. Values may be
+    changed in memory, but the workbook can't be saved.
+
+    This has as much of the interface of an OpenPyXL workbook as
+    `ExcelHelper` needs, so it's usually best used through that:
+    ```
+    xh = ExcelHelper('cards.xlsx', values_only = True)
+    ```
+    """
+
+    def __init__(self, filename: str | BinaryIO) -> None:
+        """
+        Open the workbook in the given file, or file object.
+        """
+        self._zip = zipfile.ZipFile(filename)
+
+        # Find the workbook part, and the parts it refers to
+
+        root_rels = self._relationships('')
+        wb_path   = next((target for target, type_ in root_rels.values()
+                          if type_ == office_document_type),
+                         'xl/workbook.xml')
+        wb_rels   = self._relationships(wb_path)
+
+        wb_root   = self._read_xml(wb_path)
+        wb_pr     = wb_root.find(f'{main_ns}workbookPr')
+        view      = wb_root.find(f'{main_ns}bookViews/{main_ns}workbookView')
+
+        date1904  = not(wb_pr is None) and wb_pr.get('date1904') in ('1', 'true')
+        self.epoch = mac_epoch if date1904 else windows_epoch
+
+        self.worksheets = []
+        sheets          = []
+        for sheet in wb_root.iterfind(f'{main_ns}sheets/{main_ns}sheet'):
+            target, type_ = wb_rels[sheet.get(f'{doc_ns}id')]
+            if type_.endswith('/worksheet'):
+                self.worksheets.append(XLSXWorksheet(self, sheet.get('name'), target))
+                sheets.append(self.worksheets[-1])
+            else:
+                sheets.append(None)
+
+        # Defined names are for the whole workbook, or else for one sheet,
+        # counting chart sheets and the like
+
+        self.defined_names = {}
+        for defined in wb_root.iterfind(f'{main_ns}definedNames/{main_ns}definedName'):
+            name     = XLSXDefinedName(defined.get('name'), defined.text or '')
+            local_id = defined.get('localSheetId')
+            if local_id is None:
+                self.defined_names[name.name] = name
+            elif int(local_id) < len(sheets) and not(sheets[int(local_id)] is None):
+                sheets[int(local_id)].defined_names[name.name] = name
+
+        self._active = 0 if view is None else int(view.get('activeTab', 0))
+        self._active = min(self._active, len(self.worksheets) - 1)
+
+        self._shared_strings_path = next((target for target, type_ in wb_rels.values()
+                                          if type_ == shared_strings_type),
+                                         None)
+        self._styles_path         = next((target for target, type_ in wb_rels.values()
+                                          if type_ == styles_type),
+                                         None)
+        self._shared_strings      = None
+        self._date_styles         = None
+        self._snapshot            = None
+
+
+    @property
+    def active(self) -> XLSXWorksheet:
+        """
+        The active worksheet. It may be set to a worksheet or its index.
+        """
+        return self.worksheets[self._active]
+
+
+    @active.setter
+    def active(self, value: XLSXWorksheet | int) -> None:
+        if isinstance(value, XLSXWorksheet):
+            self._active = self.worksheets.index(value)
+        else:
+            self.worksheets[value]
+            self._active = value
+
+
+    @property
+    def sheetnames(self) -> list[str]:
+        return [ws.title for ws in self.worksheets]
+
+
+    def __getitem__(self, name: str) -> XLSXWorksheet:
+        for ws in self.worksheets:
+            if ws.title == name:
+                return ws
+        raise KeyError(f'Worksheet {name} does not exist.')
+
+
+    def __iter__(self) -> Iterator[XLSXWorksheet]:
+        return iter(self.worksheets)
+
+
+    def close(self) -> None:
+        """
+        Close the file. Worksheets that have been read can still be used.
+        """
+        if not(self._zip is None):
+            self._zip.close()
+        if not(self._snapshot is None):
+            self._snapshot.close()
+
+
+    def _read_xml(self, path: str) -> ElementTree.Element:
+        with self._zip.open(path) as f:
+            return ElementTree.parse(f).getroot()
+
+
+    def _relationships(self, path: str) -> dict[str, tuple[str, str]]:
+        """
+        Read the relationships of the part at `path`, as a dict from each
+        relationship's id to its target part and type.
+        """
+        folder, name = posixpath.split(path)
+        rels_path    = posixpath.join(folder, '_rels', name + '.rels')
+        if not(rels_path in self._zip.NameToInfo):
+            return {}
+
+        rels = {}
+        for rel in self._read_xml(rels_path).iterfind(f'{rels_ns}Relationship'):
+            target = rel.get('Target')
+            if target.startswith('/'):
+                target = target[1:]
+            else:
+                target = posixpath.normpath(posixpath.join(folder, target))
+            rels[rel.get('Id')] = (target, rel.get('Type'))
+        return rels
+
+
+    def _read_shared_strings(self) -> list[str]:
+        strings = []
+        if self._shared_strings_path is None:
+            return strings
+
+        with self._zip.open(self._shared_strings_path) as f:
+            for event, element in ElementTree.iterparse(f):
+                if element.tag == f'{main_ns}si':
+                    strings.append(rich_text(element))
+                    element.clear()
+        return strings
+
+
+    def _read_date_styles(self) -> dict[int, bool]:
+        """
+        Find which cell styles are dates or durations. The result maps the
+        index of each such style to `True` if it's a duration and `False`
+        if it's a date.
+        """
+        styles = {}
+        if self._styles_path is None:
+            return styles
+
+        root    = self._read_xml(self._styles_path)
+        formats = {int(fmt.get('numFmtId')): fmt.get('formatCode')
+                   for fmt in root.iterfind(f'{main_ns}numFmts/{main_ns}numFmt')}
+
+        for index, xf in enumerate(root.iterfind(f'{main_ns}cellXfs/{main_ns}xf')):
+            fmt_id = int(xf.get('numFmtId', 0))
+            if fmt_id in formats:
+                fmt = formats[fmt_id].split(';')[0]
+                if format_date_re.search(format_strip_re.sub('', fmt)):
+                    styles[index] = not(timedelta_re.search(fmt) is None)
+            elif fmt_id in builtin_date_formats:
+                styles[index] = fmt_id in builtin_timedelta_formats
+        return styles
+
+
+    def _read_tables(self, path: str) -> dict[str, XLSXTable]:
+        """
+        Read the definitions of the Excel Tables on the worksheet part at
+        `path`.
+        """
+        tables = {}
+        for target, type_ in self._relationships(path).values():
+            if type_ != table_type:
+                continue
+
+            root    = self._read_xml(target)
+            columns = [column.get('name')
+                       for column in root.iterfind(f'{main_ns}tableColumns/{main_ns}tableColumn')]
+            table   = XLSXTable(name           = root.get('name'),
+                                displayName    = root.get('displayName', root.get('name')),
+                                ref            = root.get('ref'),
+                                headerRowCount = int(root.get('headerRowCount', 1)),
+                                totalsRowCount = int(root.get('totalsRowCount', 0)),
+                                column_names   = columns,
+                                )
+            tables[table.name] = table
+        return tables
+
+
+    def _read_cells(self, source: str | dict) -> dict[tuple[int, int], XLSXCell]:
+        """
+        Read the cells of a worksheet from wherever they are: the path of
+        its part in the file, or its layout in the snapshot.
+        """
+        if self._snapshot is None:
+            return self._parse_sheet(source)
+
+        start = source['offset']
+        with memoryview(self._snapshot)[start : start + source['length']] as data:
+            return unpack_cells(data, source)
+
+
+    def _parse_sheet(self, path: str) -> dict[tuple[int, int], XLSXCell]:
+        """
+        Read the cells of the worksheet part at `path`. The XML is parsed
+        incrementally, and each row is thrown away once it's been read.
+        """
+        if self._shared_strings is None:
+            self._shared_strings = self._read_shared_strings()
+            self._date_styles    = self._read_date_styles()
+
+        strings        = self._shared_strings
+        date_styles    = self._date_styles
+        cells          = {}
+        column_numbers = {}
+        row_tag        = f'{main_ns}row'
+        value_tag      = f'{main_ns}v'
+        inline_tag     = f'{main_ns}is'
+        row            = 0
+
+        with self._zip.open(path) as f:
+            for event, row_element in ElementTree.iterparse(f):
+                if row_element.tag != row_tag:
+                    continue
+
+                row    = int(row_element.get('r', row + 1))
+                column = 0
+
+                for c in row_element:
+                    ref = c.get('r')
+                    if ref is None:
+                        column += 1
+                    else:
+                        letters = ref.rstrip('0123456789')
+                        column  = column_numbers.get(letters)
+                        if column is None:
+                            column = coordinate_to_tuple(ref)[1]
+                            column_numbers[letters] = column
+
+                    type_ = c.get('t', 'n')
+                    if type_ == 'inlineStr':
+                        element = c.find(inline_tag)
+                        value   = None if element is None else rich_text(element)
+                    else:
+                        value = c.findtext(value_tag) or None
+
+                    if value is None:
+                        pass
+                    elif type_ == 'n':
+                        value = to_number(value)
+                        style = int(c.get('s', 0))
+                        if style in date_styles:
+                            try:
+                                value = from_excel(value, self.epoch, date_styles[style])
+                            except (OverflowError, ValueError):
+                                value = '#VALUE!'
+                    elif type_ == 's':
+                        value = strings[int(value)]
+                    elif type_ == 'b':
+                        value = bool(int(value))
+                    elif type_ == 'd':
+                        value = datetime.datetime.fromisoformat(value.rstrip('Z'))
+
+                    if not(value is None):
+                        cells[(row, column)] = XLSXCell(row, column, value)
+
+                row_element.clear()
+
+        return cells
+
+
+    def _write_snapshot(self, path: str, key: dict) -> None:
+        """
+        Write a snapshot of the values of all the worksheets to `path`. See
+        `pack_cells()` for how each worksheet's cells are kept, so one
+        worksheet can be read back without reading the others. The `key`
+        identifies the file the values came from.
+
+        The snapshot is a JSON header, which says where each worksheet is,
+        and then the worksheets. Nothing in it is code, so a snapshot that's
+        been tampered with can give wrong values but can't do any harm.
+        """
+        sheets = []
+        blobs  = []
+        offset = 0
+        for ws in self.worksheets:
+            blob, layout = pack_cells(ws._cells)
+            tables       = [{'name':           table.name,
+                             'displayName':    table.displayName,
+                             'ref':            table.ref,
+                             'headerRowCount': table.headerRowCount,
+                             'totalsRowCount': table.totalsRowCount,
+                             'column_names':   table.column_names,
+                             }
+                            for table in ws.tables.values()]
+            sheets.append({'title':         ws.title,
+                           'layout':        {**layout, 'offset': offset},
+                           'tables':        tables,
+                           'defined_names': {name: defined.attr_text for name, defined in ws.defined_names.items()},
+                           })
+            blobs.append(blob)
+            offset += len(blob)
+
+        header = {**key,
+                  'version':       snapshot_version,
+                  'byteorder':     sys.byteorder,
+                  'length':        offset,
+                  'sheets':        sheets,
+                  'active':        self._active,
+                  'epoch':         self.epoch.isoformat(),
+                  'defined_names': {name: defined.attr_text for name, defined in self.defined_names.items()},
+                  }
+        write_snapshot(path, header, blobs)
+
+
+    @classmethod
+    def _from_snapshot(cls,
+                       snapshot: mmap.mmap,
+                       header:   dict,
+                       start:    int,
+                       ) -> 'XLSXWorkbook':
+        """
+        Make a workbook whose worksheets are read from a snapshot. Their
+        places in the header are relative to `start`, the end of the header.
+        """
+        wb = cls.__new__(cls)
+        wb._zip            = None
+        wb._snapshot       = snapshot
+        wb._active         = header['active']
+        wb.epoch           = datetime.datetime.fromisoformat(header['epoch'])
+        wb._shared_strings = None
+        wb._date_styles    = None
+        wb.defined_names   = {name: XLSXDefinedName(name, attr_text)
+                              for name, attr_text in header['defined_names'].items()}
+        wb.worksheets      = []
+
+        for sheet in header['sheets']:
+            layout = {**sheet['layout'], 'offset': start + sheet['layout']['offset']}
+            ws = XLSXWorksheet(wb, sheet['title'], layout)
+            ws._tables       = {table['name']: XLSXTable(**table) for table in sheet['tables']}
+            ws.defined_names = {name: XLSXDefinedName(name, attr_text)
+                                for name, attr_text in sheet['defined_names'].items()}
+            wb.worksheets.append(ws)
+        return wb
+
+
+def open_workbook(filename:  str,
+                  cache_dir: str | None = None,
+                  ) -> XLSXWorkbook:
+    """
+    Open the workbook in the given file as an `XLSXWorkbook`.
+
+    If `cache_dir` is given, a snapshot of the workbook's values is kept
+    in that directory. When the same file is opened again, and it hasn't
+    changed, its values are read from the snapshot rather than parsed
+    again. A file hasn't changed if it's the same size and has the same
+    modification time, or failing that the same SHA-256 hash.
+    The snapshot is memory-mapped, and each worksheet is read from it only
+    when it's needed. If the snapshot can't be written, the workbook is
+    still opened.
+    """
+    if cache_dir is None:
+        return XLSXWorkbook(filename)
+
+    path  = os.path.abspath(filename)
+    stat  = os.stat(path)
+    name  = hashlib.sha1(path.encode('utf-8')).hexdigest() + '.snapshot'
+    cache = os.path.join(cache_dir, name)
+
+    # Use the snapshot if it's for the same file. Anything wrong with it
+    # just means we read the file again
+
+    snapshot = None
+    try:
+        with open(cache, 'rb') as f:
+            snapshot = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        length, = struct.unpack_from('<Q', snapshot)
+        header  = json.loads(snapshot[8 : 8 + length])
+
+        if (header['version'] == snapshot_version
+            and header['byteorder'] == sys.byteorder
+            and header['path'] == path
+            and header['size'] == stat.st_size
+            and len(snapshot) == 8 + length + header['length']
+            and (header['mtime'] == stat.st_mtime_ns
+                 or header['sha256'] == file_hash(path))):
+            wb = XLSXWorkbook._from_snapshot(snapshot, header, 8 + length)
+
+            # The file was touched but not changed, so note its new time,
+            # so it needn't be hashed again next time
+
+            if header['mtime'] != stat.st_mtime_ns:
+                try:
+                    write_snapshot(cache, {**header, 'mtime': stat.st_mtime_ns}, [snapshot[8 + length:]])
+                except OSError:
+                    pass
+            return wb
+    except (OSError, ValueError, KeyError, TypeError, struct.error):
+        pass
+
+    if not(snapshot is None):
+        snapshot.close()
+
+    # A snapshot we can't write just means reading the file again next time
+
+    wb = XLSXWorkbook(path)
+    try:
+        os.makedirs(cache_dir, exist_ok = True)
+        wb._write_snapshot(cache, {'path':   path,
+                                   'size':   stat.st_size,
+                                   'mtime':  stat.st_mtime_ns,
+                                   'sha256': file_hash(path),
+                                   })
+    except OSError:
+        pass
+    return wb
+
+
+def write_snapshot(path: str, header: dict, blobs: list[bytes]) -> None:
+    """
+    Write a snapshot file: the length of the header, the header as JSON,
+    and then the blobs of the worksheets.
+    """
+    data = json.dumps(header).encode('utf-8')
+
+    # Write to a separate file and then swap it in, so a snapshot is
+    # never half-written
+
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(struct.pack('<Q', len(data)))
+        f.write(data)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(temp_path, path)
+
+
+def pack_cells(cells: dict[tuple[int, int], XLSXCell]) -> tuple[bytes, dict]:
+    """
+    Pack the cells of a worksheet into a blob for a snapshot. Returns the
+    blob and its layout, which says how many of each thing are in it.
+
+    The blob is arrays of the cells' rows, columns and kinds of value, then
+    an array of ints and an array of floats which hold their values in
+    turn, then the strings as a JSON list. Dates and times are held as
+    ints of microseconds.
+    """
+    rows    = array('I')
+    columns = array('I')
+    kinds   = array('B')
+    ints    = array('q')
+    floats  = array('d')
+    strings = {}
+
+    for (r, c), cell in cells.items():
+        value = cell.value
+        kind  = value_kinds.get(type(value))
+        if kind is None:
+            raise ValueError(f'Cannot put a {type(value).__name__} in a snapshot')
+
+        if kind == float_kind:
+            floats.append(value)
+        elif kind == str_kind:
+            ints.append(strings.setdefault(value, len(strings)))
+        elif kind == datetime_kind:
+            ints.append((value - unix_epoch) // microsecond)
+        elif kind == time_kind:
+            ints.append(((value.hour * 60 + value.minute) * 60 + value.second) * 1000000 + value.microsecond)
+        elif kind == timedelta_kind:
+            ints.append(value // microsecond)
+        else:
+            try:
+                ints.append(value)
+            except OverflowError:
+                kind = big_int_kind
+                ints.append(strings.setdefault(str(value), len(strings)))
+
+        rows.append(r)
+        columns.append(c)
+        kinds.append(kind)
+
+    text   = json.dumps(list(strings)).encode('utf-8')
+    blob   = b''.join([rows.tobytes(), columns.tobytes(), kinds.tobytes(), ints.tobytes(), floats.tobytes(), text])
+    layout = {'cells':   len(rows),
+              'ints':    len(ints),
+              'floats':  len(floats),
+              'strings': len(text),
+              'length':  len(blob),
+              }
+    return (blob, layout)
+
+
+def unpack_cells(data: bytes | memoryview, layout: dict) -> dict[tuple[int, int], XLSXCell]:
+    """
+    Read back the cells packed by `pack_cells()`. A blob that doesn't
+    match its layout raises a `ValueError`.
+    """
+    arrays = [array('I'), array('I'), array('B'), array('q'), array('d')]
+    counts = [layout['cells'], layout['cells'], layout['cells'], layout['ints'], layout['floats']]
+    if len(data) != sum(a.itemsize * count for a, count in zip(arrays, counts)) + layout['strings']:
+        raise ValueError('Snapshot worksheet is the wrong length')
+
+    offset = 0
+    for a, count in zip(arrays, counts):
+        a.frombytes(data[offset : offset + a.itemsize * count])
+        offset += a.itemsize * count
+    rows, columns, kinds, ints, floats = arrays
+    strings = json.loads(bytes(data[offset:]))
+
+    # Turn each kind of int back into its value
+
+    from_int = {str_kind:       strings.__getitem__,
+                int_kind:       int,
+                bool_kind:      bool,
+                datetime_kind:  lambda n: unix_epoch + n * microsecond,
+                time_kind:      lambda n: (datetime.datetime.min + n * microsecond).time(),
+                timedelta_kind: lambda n: n * microsecond,
+                big_int_kind:   lambda n: int(strings[n]),
+                }
+
+    cells       = {}
+    next_int    = iter(ints).__next__
+    next_float  = iter(floats).__next__
+    try:
+        for r, c, kind in zip(rows, columns, kinds):
+            value = next_float() if kind == float_kind else from_int[kind](next_int())
+            cells[(r, c)] = XLSXCell(r, c, value)
+    except (StopIteration, KeyError, IndexError, TypeError, OverflowError):
+        raise ValueError('Snapshot worksheet is damaged')
+    return cells
+
+
+def file_hash(filename: str) -> str:
+    """
+    Get the SHA-256 hash of a file's contents, in hex.
+    """
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def range_boundaries(ref: str) -> tuple[int, int, int, int]:
+    """
+    Convert a range such as "B3:D10" to its (min row, min column, max row,
+    max column), such as (3, 2, 10, 4). A single cell is a range too.
+    """
+    first, _, last = ref.partition(':')
+    min_row, min_col = coordinate_to_tuple(first)
+    max_row, max_col = coordinate_to_tuple(last or first)
+    return (min(min_row, max_row), min(min_col, max_col), max(min_row, max_row), max(min_col, max_col))
+
+
+def column_letter(column: int) -> str:
+    """
+    Convert a column number into letters, such as 1 to "A" and 28 to "AB".
+    """
+    letters = ''
+    while column > 0:
+        column, remainder = divmod(column - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def coordinate_to_tuple(coordinate: str) -> tuple[int, int]:
+    """
+    Convert a coordinate such as "B3" to its (row, column), such as (3, 2).
+    """
+    match = coordinate_re.match(coordinate)
+    if match is None:
+        raise ValueError(f'Invalid cell coordinate {coordinate}')
+
+    letters, row = match.groups()
+    column = 0
+    for letter in letters.upper():
+        column = column * 26 + ord(letter) - 64
+    return (int(row), column)
+
+
+def rich_text(element: ElementTree.Element) -> str:
+    """
+    Get the text of a string item, which is either plain text or runs of
+    rich text. Phonetic hints are left out.
+    """
+    text = element.find(f'{main_ns}t')
+    if not(text is None):
+        return text.text or ''
+    return ''.join(run.findtext(f'{main_ns}t', '') for run in element.iterfind(f'{main_ns}r'))
+
+
+def to_number(value: str) -> int | float:
+    """
+    Convert a number in the XML to an int or float, as OpenPyXL does.
+    """
+    if '.' in value or 'E' in value or 'e' in value:
+        return float(value)
+    return int(value)
+
+
+def from_excel(value:     int | float,
+               epoch:     datetime.datetime,
+               timedelta: bool,
+               ) -> datetime.datetime | datetime.time | datetime.timedelta:
+    """
+    Convert an Excel serial date to a datetime, as OpenPyXL does. A
+    value under one day is a time, and in a duration format it's a
+    timedelta.
+    """
+    if timedelta:
+        td = datetime.timedelta(days = value)
+        if td.microseconds:
+            td = datetime.timedelta(seconds      = td.total_seconds() // 1,
+                                    microseconds = round(td.microseconds, -3))
+        return td
+
+    day, fraction = divmod(value, 1)
+    diff = datetime.timedelta(milliseconds = round(fraction * 86400 * 1000))
+    if 0 <= value < 1 and diff.days == 0:
+        return (datetime.datetime.min + diff).time()
+    if 0 < value < 60 and epoch == windows_epoch:
+        day += 1
+    return epoch + datetime.timedelta(days = day) + diff
@@ -1259,3 +1259,38 @@ class TestHtml:
         assert top    == 10
         assert right  == 60
         assert bottom == 40
+
+
+class TestResampling:
+
+
+    def _maker(self, **kwargs):
+        return CardMaker(width    = 100,
+                         height   = 100,
+                         unit     = 'px',
+                         width_mm = 50,
+                         **kwargs,
+                         )
+
+
+    def test_unknown_resampling_raises_error(self):
+        with pytest.raises(ValueError, match = 'Resampling'):
+            self._maker(resampling = 'best')
+
+
+    def test_load_jpeg_at_each_policy(self, tmp_path):
+        """A big JPEG should load at the size asked for, whatever the policy."""
+        filename = str(tmp_path / 'big.jpg')
+        Image.new('RGB', (800, 600), 'navy').save(filename)
+        for resampling in ['draft', 'fast', 'final']:
+            im = self._maker(resampling = resampling).load_image(filename, size = (50, 40))
+            assert im.size == (50, 40)
+            assert im.mode == 'RGBA'
+            assert im.getpixel((25, 20))[2] > 100
+
+
+    def test_paste_resizes_with_policy(self):
+        maker = self._maker(resampling = 'draft')
+        maker.paste(Image.new('RGBA', (400, 400), 'red'), size = (20, 20), left = 0, top = 0)
+        assert maker.image().getpixel((10, 10)) == (255, 0, 0, 255)
+        assert maker.image().getpixel((30, 30)) == (0, 0, 0, 0)
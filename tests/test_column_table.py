@@ -0,0 +1,94 @@
+import datetime
+from array import array
+
+import pytest
+
+from gamehelper.column_table import ColumnTable, ColumnRow
+
+
+class TestColumnTable:
+
+
+    def make_table(self):
+        return ColumnTable(['Name', 'Type', 'Cost', 'Weight', 'Date'],
+                           [['Fire', 'Ice', 'Sword', 'Shield'],
+                            ['Spell', 'Spell', 'Item', 'Item'],
+                            [3, 2, 5, 4],
+                            [0.0, 0.0, 1.5, 3.0],
+                            [datetime.datetime(2024, 1, n) for n in range(1, 5)],
+                            ])
+
+
+    def test_columns_are_compact(self):
+        table = self.make_table()
+
+        assert len(table) == 4
+        assert table.headers == ['Name', 'Type', 'Cost', 'Weight', 'Date']
+        assert table.column('Cost') == array('q', [3, 2, 5, 4])
+        assert table.column('Weight') == array('d', [0.0, 0.0, 1.5, 3.0])
+        assert table.column('Type')[0] is table.column('Type')[1]
+
+        # Mixed types, bools and huge ints stay as they are
+
+        table = ColumnTable(['A', 'B', 'C'], [[1, 2.5, None], [True, False, True], [2**70, 1, 2]])
+        assert table.column('A') == [1, 2.5, None]
+        assert table.column('B') == [True, False, True]
+        assert table.column('C') == [2**70, 1, 2]
+
+        with pytest.raises(LookupError):
+            table.column('D')
+        with pytest.raises(ValueError):
+            ColumnTable(['A', 'B'], [[1, 2], [3]])
+
+
+    def test_rows(self):
+        table = self.make_table()
+
+        row = table[2]
+        assert isinstance(row, ColumnRow)
+        assert row == {'Name': 'Sword', 'Type': 'Item', 'Cost': 5, 'Weight': 1.5,
+                       'Date': datetime.datetime(2024, 1, 3)}
+        assert row['Cost'] == 5
+        assert list(row) == table.headers
+        assert table[-1]['Name'] == 'Shield'
+        assert [row['Name'] for row in table] == ['Fire', 'Ice', 'Sword', 'Shield']
+        assert table.to_dicts()[0] == dict(table[0])
+
+        with pytest.raises(IndexError):
+            table[4]
+        with pytest.raises(KeyError):
+            row['Colour']
+        assert row.get('Colour') is None
+        assert not('Colour' in row)
+
+
+    def test_select(self):
+        table = self.make_table().select('Cost', 'Name')
+
+        assert table.headers == ['Cost', 'Name']
+        assert table[0] == {'Cost': 3, 'Name': 'Fire'}
+
+
+    def test_filter(self):
+        table = self.make_table()
+
+        spells = table.filter(Type = 'Spell')
+        assert [row['Name'] for row in spells] == ['Fire', 'Ice']
+        assert spells.column('Cost') == array('q', [3, 2])
+
+        cheap = table.filter(lambda row: row['Cost'] < 5, Type = 'Item')
+        assert cheap.to_dicts() == [table.to_dicts()[3]]
+
+        assert [row['Name'] for row in table.filter(Cost = lambda cost: cost > 3)] == ['Sword', 'Shield']
+        assert [row['Name'] for row in spells.filter(Cost = lambda cost: cost > 2)] == ['Fire']
+        assert len(table.filter(Cost = '3')) == 0
+
+        assert len(table.filter(Type = 'Monster')) == 0
+
+
+    def test_group_by(self):
+        groups = self.make_table().group_by('Type')
+
+        assert list(groups) == ['Spell', 'Item']
+        assert [row['Name'] for row in groups['Item']] == ['Sword', 'Shield']
+        assert groups['Item'].column('Weight') == array('d', [1.5, 3.0])
@@ -1,9 +1,45 @@
 import pytest
 
 import openpyxl
-from   openpyxl import Workbook
-
-from gamehelper.excelhelper import ExcelHelper
+from   openpyxl                         import Workbook
+from   openpyxl.workbook.defined_name   import DefinedName
+from   openpyxl.worksheet.table         import Table
+
+from gamehelper.column_table import ColumnTable
+from gamehelper.excelhelper  import ExcelHelper, diff_manifests, row_fingerprint
+
+
+def make_named_tables():
+    """
+    A workbook with an Excel Table and some defined names, for tests here
+    and for the lightweight reader.
+    """
+    wb = Workbook()
+    ws = wb.active
+    ws.title = 'Front'
+    ws2 = wb.create_sheet("Bob's cards")
+
+    data = [['Name' , 'Cost'],
+            ['Fire' , 3     ],
+            [None   , None  ],
+            ['Ice'  , 2     ],
+            ['Total', 5     ],
+           ]
+    for r in range(len(data)):
+        for c in range(len(data[r])):
+            ws2.cell(row    = r+3,
+                     column = c+2,
+                     value  = data[r][c])
+    ws2['D3'] = 'Not in table'
+
+    table = Table(displayName = 'Cards', ref = 'B3:C7')
+    table.totalsRowCount = 1
+    ws2.add_table(table)
+
+    wb.defined_names['Prices'] = DefinedName('Prices', attr_text = "'Bob''s cards'!$B$3:$C$4")
+    ws.defined_names['Local']  = DefinedName('Local', attr_text = "'Bob''s cards'!$C$3:$C$6")
+    wb.defined_names['Sum']    = DefinedName('Sum', attr_text = 'SUM(1, 2)')
+    return wb
 
 
 class TestExcelHelper:
@@ -80,6 +116,90 @@ class TestExcelHelper:
             xh.find_value_beside('Here I am!', 3, 3)
 
 
+    def test_find_searches_whole_sheet_by_default(self):
+        wb = Workbook()
+        xh = ExcelHelper(wb)
+
+        ws = wb.active
+        ws['CW500'] = 'Far away'
+        ws['B2']    = 'Far away'
+        ws['A900']  = 'Further'
+
+        assert xh.find('Far away').coordinate == 'B2'
+        assert xh.find('Further').coordinate == 'A900'
+        assert xh.find('Far away', 101, 500).coordinate == 'B2'
+        assert xh.find('Further', 1, 900).coordinate == 'A900'
+
+        with pytest.raises(LookupError):
+            xh.find('Further', 1, 899)
+        with pytest.raises(LookupError):
+            xh.find('Nowhere')
+
+
+    def test_find_follows_puts_and_active_sheet(self):
+        wb = Workbook()
+        xh = ExcelHelper(wb)
+
+        ws = wb.active
+        ws['C4'] = 'Label'
+        assert xh.find('Label').coordinate == 'C4'
+
+        # Values put by the helper are found, and overwritten ones are not
+
+        xh.put_values_below('B1', ['Label', 'Other'])
+        assert xh.find('Label').coordinate == 'B2'
+        xh.put_values_below('B1', ['Changed'])
+        assert xh.find('Label').coordinate == 'C4'
+        assert xh.find('Changed').coordinate == 'B2'
+
+        xh.put_values_beside('A7', ['Across'])
+        assert xh.find_value_beside('Across') is None
+        assert xh.find('Across').coordinate == 'B7'
+
+        # New cells set directly are found too
+
+        ws['A1'] = 'Label'
+        assert xh.find('Label').coordinate == 'A1'
+
+        # Changing the active sheet changes where we search
+
+        ws2 = wb.create_sheet('Second')
+        ws2['E5'] = 'Label'
+        wb.active = ws2
+        assert xh.find('Label').coordinate == 'E5'
+        wb.active = ws
+        assert xh.find('Label').coordinate == 'A1'
+
+        # Existing cells changed directly are noticed without a reindex
+
+        ws['A1'] = 'Gone'
+        assert xh.find('Label').coordinate == 'C4'
+        assert xh.find('Gone').coordinate == 'A1'
+
+        xh.find('Across').value = 'Moved'
+        assert xh.find('Moved').coordinate == 'B7'
+        with pytest.raises(LookupError):
+            xh.find('Across')
+
+
+    def test_find_index_survives_empty_cells(self):
+        wb = Workbook()
+        xh = ExcelHelper(wb)
+        ws = wb.active
+
+        ws['B2'] = 'Label'
+        assert xh.find('Label').coordinate == 'B2'
+        index = xh._indexes[ws][1]
+
+        # Getting empty cells adds them to the sheet, but needn't rebuild
+
+        assert xh.down('B2', 5).value is None
+        assert xh.right('B2', 3).value is None
+        assert xh.find_value_beside('Label') is None
+        assert xh.find('Label').coordinate == 'B2'
+        assert xh._indexes[ws][1] is index
+
+
     def test_find_non_blank_below(self):
         wb = Workbook()
         xh = ExcelHelper(wb)
@@ -200,6 +320,96 @@ class TestExcelHelper:
         assert ws['D6'].value == 'Ccc'
 
 
+    def test_put_table(self):
+        wb = Workbook()
+        xh = ExcelHelper(wb)
+        ws = wb.active
+
+        ws['B2'] = 'Old'
+        assert xh.find('Old').coordinate == 'B2'
+
+        rows = [['Name' , 'Age' , 'Score'],
+                ['Alice', 11    , None   ],
+                ['Bob'  , 12    , 101    ]]
+        xh.put_table('B2', rows)
+
+        assert xh.vertical_table('B2') == rows[1:]
+        assert xh.find('Bob').coordinate == 'B4'
+        with pytest.raises(LookupError):
+            xh.find('Old')
+
+        # Blank values clear cells
+
+        xh.put_table(ws['C3'], [[None, 100]])
+        assert xh.vertical_table('B2') == [['Alice', None, 100], ['Bob', 12, 101]]
+
+
+    def test_put_table_below_sheet(self):
+        wb = Workbook()
+        xh = ExcelHelper(wb)
+        ws = wb.active
+
+        # Rows put from column A below everything else are appended
+
+        xh.put_table('A1', [['Name', 'Age'], ['Alice', 11]])
+        assert xh.find('Alice').coordinate == 'A2'
+        xh.put_table('A3', iter([('Bob', 12), ('Carol', None)]))
+        assert xh.vertical_table('A1') == [['Alice', 11], ['Bob', 12], ['Carol', None]]
+        assert xh.find('Carol').coordinate == 'A4'
+
+        # Others are put a value at a time, over what's there
+
+        xh.put_table('A2', [['Ann']])
+        xh.put_table('A6', [['Dan']])
+        assert xh.find_values_below('A1') == ['Ann', 'Bob', 'Carol']
+        assert ws['A6'].value == 'Dan'
+
+
+    def test_put_columns(self):
+        wb = Workbook()
+        xh = ExcelHelper(wb)
+
+        table = ColumnTable(['Name', 'Cost'], [['Fire', 'Ice'], [3, 2]])
+        xh.put_columns('D5', table)
+
+        assert xh.vertical_columns('D5').to_dicts() == table.to_dicts()
+        assert xh.vertical_dicts('D5') == [{'Name': 'Fire', 'Cost': 3}, {'Name': 'Ice', 'Cost': 2}]
+
+
+    def test_write_only(self, tmp_path):
+        filename = str(tmp_path / 'report.xlsx')
+        xh = ExcelHelper(filename, write_only = True)
+
+        xh.put_table('A1', [['Report']])
+        xh.put_values_beside('A1', ['Build 7'])
+        xh.put_table('B3', [['Card', 'Count'], ['Fire', 3], ['Ice', 2]])
+        xh.put_values_beside('C5', ['Overflow'])
+        xh.put_values_below('B5', ['Sword', 'Shield'])
+
+        with pytest.raises(ValueError):
+            xh.put_table('A2', [['Too late']])
+
+        xh.save()
+        with pytest.raises(ValueError) as excinfo:
+            xh.save(str(tmp_path / 'again.xlsx'))
+        assert 'only be saved once' in str(excinfo.value)
+
+        xh = ExcelHelper(filename)
+        assert xh.find_value_beside('Report') == 'Build 7'
+        assert xh.vertical_table('B3') == [['Fire', 3], ['Ice', 2], ['Sword', None], ['Shield', None]]
+        assert xh.value_from('C5', column = 1) == 'Overflow'
+
+        # Normal workbooks can be saved again
+
+        xh.save()
+        xh.save()
+
+        with pytest.raises(ValueError):
+            ExcelHelper(filename, write_only = True, read_only = True)
+        with pytest.raises(ValueError):
+            ExcelHelper(Workbook()).save()
+
+
     def test_find_values_beside(self):
         wb = Workbook()
         xh = ExcelHelper(wb)
@@ -342,6 +552,61 @@ class TestExcelHelper:
         assert xh.find_value_in_table(ws['D8'], 'Alice', 'Age') == 11
 
 
+    def test_table_lookup(self):
+        wb = Workbook()
+        xh = ExcelHelper(wb)
+        ws = wb.active
+
+        data = [['Name' , 'Age' , 'Score'],
+                ['Alice', 11    , 100],
+                ['Bob'  , 12    , 101],
+                ['Chris', 13    , 102]]
+        for r in range(len(data)):
+            for c in range(len(data[r])):
+                ws.cell(row = r+8,
+                        column = c+4,
+                        value = data[r][c])
+        cells = len(ws._cells)
+
+        table = xh.table_lookup('D8')
+        for name in ['Alice', 'Bob', 'Chris']:
+            for label in ['Age', 'Score']:
+                assert table.value(name, label) == xh.find_value_in_table('D8', name, label)
+        assert table['Bob', 'Score'] == 101
+
+        with pytest.raises(LookupError):
+            table.value('Noone', 'Age')
+
+        # Neither way of looking up creates cells
+
+        assert len(ws._cells) == cells
+
+
+    def test_table_lookup_names_at_limits(self):
+        wb = Workbook()
+        xh = ExcelHelper(wb)
+        ws = wb.active
+
+        ws['B2']   = 'Costs'
+        ws['B101'] = 'Last row'
+        ws['B102'] = 'Too far down'
+        ws['CW2']  = 'Last column'
+        ws['CX2']  = 'Too far across'
+        ws['CW101'] = 'Corner'
+
+        table = xh.table_lookup('B2')
+        assert table.value('Last row', 'Last column') == 'Corner'
+        assert xh.find_value_in_table('B2', 'Last row', 'Last column') == 'Corner'
+
+        for row_name, column_name in [('Too far down', 'Last column'), ('Last row', 'Too far across')]:
+            with pytest.raises(LookupError):
+                table.value(row_name, column_name)
+            with pytest.raises(LookupError):
+                xh.find_value_in_table('B2', row_name, column_name)
+
+        assert xh.table_lookup('B2', limit = 101).value('Too far down', 'Too far across') is None
+
+
     def test_value_from(self):
         wb = Workbook()
         xh = ExcelHelper(wb)
@@ -517,6 +782,312 @@ class TestExcelHelper:
         assert len(table) == 0
 
 
+    def test_reading_tables_leaves_sheet_alone(self):
+        """Reading a table shouldn't add cells to the sheet."""
+        wb = Workbook()
+        xh = ExcelHelper(wb)
+        ws = wb.active
+
+        data = [['Name' , 'Age' ],
+                ['Alice', 11    ],
+                ['Bob'  , 12    ],
+               ]
+        for r in range(len(data)):
+            for c in range(len(data[r])):
+                ws.cell(row    = r+10,
+                        column = c+5,
+                        value  = data[r][c])
+
+        assert xh.vertical_table('E10') == [['Alice', 11], ['Bob', 12]]
+        assert xh.vertical_dicts('E10')[1] == {'Name': 'Bob', 'Age': 12}
+        assert xh.find_values_below('E10') == ['Alice', 'Bob']
+        assert xh.find_values_beside('D10') == ['Name', 'Age']
+        assert ws.max_row == 12
+        assert ws.max_column == 6
+
+
+    def test_iter_vertical_table_and_dicts(self):
+        wb = Workbook()
+        xh = ExcelHelper(wb)
+        ws = wb.active
+
+        data = [['Name' , 'Age' ],
+                ['Alice', 11    ],
+                ['Bob'  , 12    ],
+               ]
+        for r in range(len(data)):
+            for c in range(len(data[r])):
+                ws.cell(row    = r+10,
+                        column = c+5,
+                        value  = data[r][c])
+
+        rows = xh.iter_vertical_table('E10')
+        assert next(rows) == ['Alice', 11]
+        assert list(rows) == [['Bob', 12]]
+
+        dicts = xh.iter_vertical_dicts('E10')
+        assert next(dicts) == {'Name': 'Alice', 'Age': 11}
+        assert list(dicts) == [{'Name': 'Bob', 'Age': 12}]
+
+
+    def test_read_only(self, tmp_path):
+        filename = str(tmp_path / 'cards.xlsx')
+        wb = Workbook()
+        ws = wb.active
+
+        ws['A1'] = 'Cards'
+        ws['B3'] = 'Name'
+        ws['C3'] = 'Count'
+        for r in range(1000):
+            ws.cell(row = r+4, column = 2, value = f'Card {r}')
+            ws.cell(row = r+4, column = 3, value = r)
+        ws['D3'] = 'Not in table'
+        ws['B1005'] = None
+        ws['C1006'] = 'After the table'
+        wb.save(filename)
+
+        xh = ExcelHelper(filename, read_only = True)
+
+        rows = xh.iter_vertical_dicts('B3', last_column_label = 'Count')
+        assert next(rows) == {'Name': 'Card 0', 'Count': 0}
+        assert len(list(rows)) == 999
+
+        table = xh.vertical_table(xh.wb.active['B3'], last_column_label = 'Count')
+        assert table[999] == ['Card 999', 999]
+        assert len(table) == 1000
+
+        assert xh.find_values_beside('B3') == ['Count', 'Not in table']
+        assert xh.find_value_beside('Card 500') == 500
+        assert xh.find('Cards').coordinate == 'A1'
+        assert xh.find_value_in_table('B3', 'Card 50', 'Count') == 50
+        assert xh.table_lookup('B3')['Card 50', 'Count'] == 50
+
+        xh.close()
+
+
+    def test_read_only_blank_anchor(self, tmp_path):
+        filename = str(tmp_path / 'cards.xlsx')
+        wb = Workbook()
+        ws = wb.active
+
+        ws['A3'] = 'Apple'
+        ws['A4'] = 'Banana'
+        ws['B1'] = 'Cherry'
+        ws['C1'] = 'Date'
+        ws['B2'] = 'Name'
+        ws['B3'] = 'Elderberry'
+        wb.save(filename)
+
+        xh = ExcelHelper(filename, read_only = True)
+
+        assert xh.find_values_below('A1') == ['Apple', 'Banana']
+        assert xh.find_non_blank_below('A1').value == 'Apple'
+        assert xh.find_values_beside('A1') == ['Cherry', 'Date']
+        assert xh.down('A1', 2).value == 'Apple'
+        assert xh.right('A1').value == 'Cherry'
+        assert xh.value_from('A1', 1, 1) == 'Name'
+        assert xh.vertical_table('A2') == []
+        assert xh.vertical_dicts('A2') == []
+        assert xh.vertical_dicts_many(['A2', 'B2']) == [[], [{'Name': 'Elderberry'}]]
+
+        xh.close()
+
+
+    def test_vertical_columns(self):
+        wb = Workbook()
+        xh = ExcelHelper(wb)
+        ws = wb.active
+
+        data = [['Name' , 'Age' , 'Score'],
+                [None   , 11    , None   , 'Not in table'],
+                ['Bob'  , None  , None   ],
+                ['Dave' , 13    , 104    , 'Still not'   ],
+                [None   , None  , 102    ],
+               ]
+        for r in range(len(data)):
+            for c in range(len(data[r])):
+                ws.cell(row    = r+10,
+                        column = c+5,
+                        value  = data[r][c])
+
+        table = xh.vertical_columns('E10')
+
+        assert table.headers == ['Name', 'Age', 'Score']
+        assert table.to_dicts() == xh.vertical_dicts('E10')
+        assert table.column('Age') == [11, None, 13, None]
+        assert table.filter(Name = 'Dave')[0]['Score'] == 104
+
+        assert len(xh.vertical_columns('E10', last_column_label = 'Age').headers) == 2
+
+
+    def test_named_tables(self):
+        wb = make_named_tables()
+        xh = ExcelHelper(wb)
+
+        assert xh.named_table('Cards') == [['Fire', 3], [None, None], ['Ice', 2]]
+        assert xh.named_dicts('Cards')[2] == {'Name': 'Ice', 'Cost': 2}
+        assert xh.named_columns('Cards').column('Name') == ['Fire', None, 'Ice']
+
+        assert xh.named_dicts('Prices') == [{'Name': 'Fire', 'Cost': 3}]
+        assert xh.named_table('Local') == [[3], [None], [2]]
+
+        # Names local to a sheet are only seen from there
+
+        wb.active = wb["Bob's cards"]
+        with pytest.raises(LookupError):
+            xh.named_table('Local')
+
+        with pytest.raises(LookupError):
+            xh.named_table('Missing')
+        with pytest.raises(ValueError):
+            xh.named_table('Sum')
+
+
+    def test_vertical_dicts_many(self, tmp_path):
+        filename = str(tmp_path / 'tables.xlsx')
+        wb = Workbook()
+        ws = wb.active
+
+        # Two tables side by side, and a third below the first
+
+        data = [['Name' , 'Age' , None, 'Deck', 'Size', None, 'Notes'],
+                ['Alice', 11    , None, 'Red' , 40    ],
+                ['Bob'  , None  , None, 'Blue', 60    ],
+                [None   , None  , None, 'Gold', 30    ],
+                [None   , None  ],
+                ['Card' , 'Cost'],
+                ['Fire' , 3     ],
+               ]
+        for r in range(len(data)):
+            for c in range(len(data[r])):
+                ws.cell(row    = r+2,
+                        column = c+2,
+                        value  = data[r][c])
+        wb.save(filename)
+
+        for xh in (ExcelHelper(wb), ExcelHelper(filename, read_only = True)):
+            anchors = ['B2', 'E2', 'B7']
+            tables  = xh.vertical_dicts_many(anchors, last_column_labels = [None, 'Size', None])
+            assert tables == [xh.vertical_dicts('B2'),
+                              xh.vertical_dicts('E2', last_column_label = 'Size'),
+                              xh.vertical_dicts('B7'),
+                              ]
+            assert tables[1][2] == {'Deck': 'Gold', 'Size': 30}
+
+            assert xh.vertical_dicts_many([]) == []
+            assert xh.vertical_dicts_many(['B2', 'E2'])[1][0] == {'Deck': 'Red', 'Size': 40}
+
+            with pytest.raises(LookupError):
+                xh.vertical_dicts_many(['B2', 'E2'], last_column_labels = [None, 'Missing'])
+
+            # Blank headers before the last column label are skipped over,
+            # as by vertical_dicts()
+
+            assert xh.vertical_dicts_many(['E2'], ['Notes']) == [xh.vertical_dicts('E2', 'Notes')]
+            assert list(xh.vertical_dicts_many(['E2'], ['Notes'])[0][0]) == ['Deck', 'Size', None, 'Notes']
+            with pytest.raises(ValueError):
+                xh.vertical_dicts_many(['B2', 'E2'], last_column_labels = ['Age'])
+            xh.close()
+
+
+    def test_sheet_tables(self):
+        wb = make_named_tables()
+        xh = ExcelHelper(wb)
+
+        assert xh.sheet_tables() == {}
+
+        wb.active = wb["Bob's cards"]
+        assert xh.sheet_tables() == {'Cards': xh.named_dicts('Cards')}
+
+
+    def test_sheet_tables_with_no_rows(self):
+        wb = make_named_tables()
+        xh = ExcelHelper(wb)
+        ws = wb["Bob's cards"]
+        wb.active = ws
+
+        # A table of just a header and a totals row has no rows of data
+
+        ws['F3'] = 'Name'
+        ws['G3'] = 'Cost'
+        ws['F4'] = 'Total'
+        table = Table(displayName = 'Empty', ref = 'F3:G4')
+        table.totalsRowCount = 1
+        ws.add_table(table)
+
+        assert xh.sheet_tables() == {'Cards': xh.named_dicts('Cards'), 'Empty': []}
+
+        del ws.tables['Cards']
+        assert xh.sheet_tables() == {'Empty': []}
+
+
+    def test_fingerprints(self):
+        wb = Workbook()
+        xh = ExcelHelper(wb)
+        ws = wb.active
+
+        data = [['Name' , 'Age' ],
+                ['Alice', 11    ],
+                ['Bob'  , 12    ],
+               ]
+        for r in range(len(data)):
+            for c in range(len(data[r])):
+                ws.cell(row    = r+10,
+                        column = c+5,
+                        value  = data[r][c])
+
+        table = xh.vertical_table('E10', fingerprints = True)
+        assert [row for _, row in table] == [['Alice', 11], ['Bob', 12]]
+        assert table[0][0] == row_fingerprint(['Alice', 11])
+        assert table[0][0] != table[1][0]
+
+        dicts = xh.vertical_dicts('E10', fingerprints = True)
+        assert dicts[1] == (row_fingerprint({'Name': 'Bob', 'Age': 12}), {'Name': 'Bob', 'Age': 12})
+
+        # Fingerprints are the same each run, and depend on types and labels
+
+        assert row_fingerprint(['Alice', 11]) == 'a5bd0a8eac80f2aabd989a09d5beb7c2'
+        assert row_fingerprint(['Alice', 11]) != row_fingerprint(['Alice', '11'])
+        assert row_fingerprint({'Name': 'Bob'}) != row_fingerprint({'Title': 'Bob'})
+
+
+    def test_row_manifest_and_diff(self):
+        wb = Workbook()
+        xh = ExcelHelper(wb)
+        ws = wb.active
+
+        data = [['Name' , 'Age' ],
+                ['Alice', 11    ],
+                ['Bob'  , 12    ],
+                ['Carol', 13    ],
+               ]
+        for r in range(len(data)):
+            for c in range(len(data[r])):
+                ws.cell(row    = r+10,
+                        column = c+5,
+                        value  = data[r][c])
+
+        old = xh.row_manifest('E10', 'Name')
+        assert list(old) == ['Alice', 'Bob', 'Carol']
+
+        ws['F12'] = 22      # Bob's age
+        ws['E13'] = 'Dave'  # Carol is replaced
+        new = xh.row_manifest('E10', 'Name')
+
+        assert diff_manifests(old, new) == {'added':     ['Dave'],
+                                            'removed':   ['Carol'],
+                                            'changed':   ['Bob'],
+                                            'unchanged': ['Alice'],
+                                            }
+
+        with pytest.raises(LookupError):
+            xh.row_manifest('E10', 'Score')
+
+        ws['E13'] = 'Alice'
+        with pytest.raises(ValueError):
+            xh.row_manifest('E10', 'Name')
+
+
     def test_workbook_property(self):
         wb = Workbook()
         xh = ExcelHelper(wb)
@@ -0,0 +1,99 @@
+import io
+import json
+import random
+import pytest
+
+from PIL import Image
+
+from gamehelper.image_atlas import ImageAtlas
+
+
+def _overlaps(a, b):
+    """Whether two manifest rectangles overlap."""
+    return not(a['x'] + a['width'] <= b['x'] or b['x'] + b['width'] <= a['x'] or
+               a['y'] + a['height'] <= b['y'] or b['y'] + b['height'] <= a['y'])
+
+
+class TestImageAtlas:
+
+    def _atlas(self, **kwargs):
+        """An atlas of images of random sizes, each its own colour."""
+        rand  = random.Random(1)
+        atlas = ImageAtlas(**kwargs)
+        for i in range(30):
+            size = (rand.randint(5, 40), rand.randint(5, 40))
+            atlas.add(Image.new('RGBA', size, (i * 8, 255, 0, 255)))
+        return atlas
+
+    def test_no_overlaps(self):
+        """No two images should overlap, or go off the atlas."""
+        atlas    = self._atlas()
+        manifest = atlas.manifest()
+        images   = manifest['images']
+        for i, a in enumerate(images):
+            assert a['x'] + a['width'] <= manifest['width']
+            assert a['y'] + a['height'] <= manifest['height']
+            for b in images[:i]:
+                assert not(_overlaps(a, b))
+
+    def test_padding(self):
+        """Images should be at least the padding apart."""
+        images = self._atlas(padding = 3).manifest()['images']
+        for i, a in enumerate(images):
+            padded = dict(a, width = a['width'] + 3, height = a['height'] + 3)
+            for b in images[:i]:
+                assert not(_overlaps(padded, dict(b, width = b['width'] + 3, height = b['height'] + 3)))
+
+    def test_packs_closely(self):
+        """The atlas should be mostly images, not space."""
+        atlas = self._atlas()
+        area  = sum(im['width'] * im['height'] for im in atlas.manifest()['images'])
+        assert area / (atlas.size[0] * atlas.size[1]) > 0.75
+
+    def test_max_width(self):
+        """The atlas should be no wider than the maximum."""
+        assert self._atlas(max_width = 60).size[0] <= 60
+
+    def test_image_wider_than_max_raises_error(self):
+        """An image can't be wider than the maximum width."""
+        atlas = ImageAtlas(max_width = 10)
+        with pytest.raises(ValueError):
+            atlas.add(Image.new('RGBA', (11, 5)))
+
+    def test_bad_mode_or_colour_raises_error(self):
+        """The mode must be RGBA or RGB, and an RGB atlas must be opaque."""
+        with pytest.raises(ValueError):
+            ImageAtlas(mode = 'CMYK')
+        with pytest.raises(ValueError):
+            ImageAtlas(mode = 'RGB')
+        assert ImageAtlas(mode = 'RGB', colour = (0, 0, 0, 255))._mode == 'RGB'
+
+    def test_empty_atlas_raises_error(self):
+        """There's nothing to pack in an empty atlas."""
+        with pytest.raises(ValueError):
+            ImageAtlas().size
+
+    def test_image_matches_manifest(self):
+        """Each image should be where the manifest says."""
+        atlas = self._atlas()
+        im    = Image.open(io.BytesIO(atlas.save()))
+        assert im.size == atlas.size
+        for i, rect in enumerate(atlas.manifest()['images']):
+            assert im.getpixel((rect['x'], rect['y'])) == (i * 8, 255, 0, 255)
+            assert im.getpixel((rect['x'] + rect['width'] - 1, rect['y'] + rect['height'] - 1)) == (i * 8, 255, 0, 255)
+
+    def test_names(self):
+        """Images should be named by filename, or given name, or number."""
+        atlas = ImageAtlas()
+        atlas.add('tests/100x150.png')
+        atlas.add(Image.new('RGBA', (10, 10)), name = 'blank')
+        atlas.add(Image.new('RGBA', (10, 10)))
+        names = [im['name'] for im in atlas.manifest()['images']]
+        assert names == ['tests/100x150.png', 'blank', '2']
+
+    def test_save_manifest(self, tmp_path):
+        """The manifest should be saved as JSON."""
+        atlas = self._atlas()
+        atlas.save_manifest(tmp_path / 'atlas.json')
+        with open(tmp_path / 'atlas.json') as f:
+            assert json.load(f) == atlas.manifest()
@@ -1,5 +1,8 @@
+import io
 import pytest
 
+from PIL import Image
+
 from gamehelper.image_sheet import ImageSheet
 
 
@@ -84,3 +87,270 @@ class TestImageSheetProperties:
                            )
         with pytest.raises(AttributeError):
             sheet.columns = 5
+
+
+class TestImageSheetSave:
+    """Tests for saving to files, file objects and bytes."""
+
+
+    def _sheet(self):
+        sheet = ImageSheet(card_width = 10, card_height = 20, columns = 2)
+        sheet.add(Image.new('RGB', (10, 20), (255, 0, 0)))
+        return sheet
+
+
+    def test_save_returns_bytes(self):
+        """With no file, save() should return PNG bytes."""
+        png = self._sheet().save()
+        assert isinstance(png, memoryview)
+        assert Image.open(io.BytesIO(png)).size == (20, 20)
+
+
+    def test_save_to_file_object(self):
+        """save() should write to a binary file object."""
+        buffer = io.BytesIO()
+        assert self._sheet().save(buffer, format = 'WEBP') is None
+        assert Image.open(buffer).format == 'WEBP'
+
+
+    def test_save_to_filename(self, tmp_path):
+        """save() should still write to a named file, by its extension."""
+        self._sheet().save(str(tmp_path / 'sheet.webp'))
+        assert Image.open(tmp_path / 'sheet.webp').format == 'WEBP'
+
+
+    def test_save_to_filename_without_extension(self, tmp_path):
+        """A filename without an extension should get a PNG."""
+        self._sheet().save(str(tmp_path / 'sheet'))
+        assert Image.open(tmp_path / 'sheet').format == 'PNG'
+
+
+class TestImageSheetStream:
+    """Tests for streaming a sheet as it's built, and RGB sheets."""
+
+
+    def _cards(self):
+        for i in range(5):
+            yield Image.new('RGBA', (20, 30), (i * 50, 0, 0, 255 - i * 40))
+
+
+    def _sheet(self, **kwargs):
+        sheet = ImageSheet(card_width = 10, card_height = 15, columns = 2, rows = 4, **kwargs)
+        for card in self._cards():
+            sheet.add(card)
+        return sheet
+
+
+    def test_stream_matches_save(self):
+        """A streamed sheet should have the same pixels as a saved one."""
+        buffer = io.BytesIO()
+        self._sheet(stream = buffer).save()
+        buffer.seek(0)
+        streamed = Image.open(buffer)
+        saved    = Image.open(io.BytesIO(self._sheet().save()))
+        assert streamed.size == (20, 60)
+        assert streamed.tobytes() == saved.tobytes()
+
+
+    def test_stream_to_filename(self, tmp_path):
+        """A sheet should stream to a named file."""
+        self._sheet(stream = str(tmp_path / 'sheet.png')).save()
+        assert Image.open(tmp_path / 'sheet.png').size == (20, 60)
+
+
+    def test_stream_holds_one_row(self):
+        """A streamed sheet should only hold one row of cards."""
+        sheet = self._sheet(stream = io.BytesIO())
+        assert sheet._base_im.size == (20, 15)
+
+
+    def test_stream_full_sheet_raises_error(self):
+        """Adding too many cards to a streamed sheet should be an error."""
+        sheet = self._sheet(stream = io.BytesIO())
+        for card in list(self._cards())[:3]:
+            sheet.add(card)
+        with pytest.raises(ValueError):
+            sheet.add(Image.new('RGBA', (20, 30)))
+
+
+    def test_stream_save_to_file_raises_error(self):
+        """A streamed sheet can't be saved somewhere else."""
+        sheet = self._sheet(stream = io.BytesIO())
+        with pytest.raises(ValueError):
+            sheet.save(io.BytesIO())
+
+
+    def test_rgb_sheet(self):
+        """An RGB sheet should save as RGB, with the cards on the colour."""
+        png = self._sheet(mode = 'RGB', colour = (0, 0, 255)).save()
+        im  = Image.open(io.BytesIO(png))
+        assert im.mode == 'RGB'
+        assert im.getpixel((0, 0)) == (0, 0, 0)
+        assert im.getpixel((0, 59)) == (0, 0, 255)
+
+
+    def test_rgb_sheet_needs_opaque_colour(self):
+        """An RGB sheet can't have a transparent colour."""
+        with pytest.raises(ValueError):
+            ImageSheet(card_width = 10, card_height = 15, mode = 'RGB', colour = (0, 0, 0, 0))
+
+
+class TestImageSheetDedup:
+    """Tests for reusing identical cards."""
+
+
+    def test_identical_cards_scaled_once(self, monkeypatch):
+        """Separate but identical cards should only be scaled once."""
+        sheet  = ImageSheet(card_width = 10, card_height = 15, columns = 3, rows = 2)
+        resize = Image.Image.resize
+        calls  = []
+
+        def spy(im, *args, **kwargs):
+            if im.mode == 'RGBA':    # Pillow resizes again internally as RGBa
+                calls.append(im.size)
+            return resize(im, *args, **kwargs)
+
+        monkeypatch.setattr(Image.Image, 'resize', spy)
+        for _ in range(4):
+            sheet.add(Image.new('RGBA', (20, 30), 'gold'))
+        sheet.add(Image.new('RGBA', (20, 30), 'silver'))
+        assert len(calls) == 2
+
+
+    def test_count_matches_repeated_adds(self):
+        """Adding a card with a count should be the same as adding it repeatedly."""
+        card     = Image.new('RGBA', (20, 30), 'gold')
+        counted  = ImageSheet(card_width = 10, card_height = 15, columns = 3, rows = 2)
+        repeated = ImageSheet(card_width = 10, card_height = 15, columns = 3, rows = 2)
+        counted.add(card, count = 5)
+        for _ in range(5):
+            repeated.add(card)
+        assert counted.save() == repeated.save()
+        assert Image.open(io.BytesIO(counted.save())).getpixel((15, 20)) == (255, 215, 0, 255)
+
+
+    def test_count_streams_rows(self):
+        """A count that spans several rows should stream each row."""
+        buffer = io.BytesIO()
+        sheet  = ImageSheet(card_width = 10, card_height = 15, columns = 2, rows = 3, stream = buffer)
+        sheet.add(Image.new('RGBA', (20, 30), 'gold'), count = 6)
+        sheet.save()
+        buffer.seek(0)
+        assert Image.open(buffer).getpixel((15, 40)) == (255, 215, 0, 255)
+
+
+class TestImageSheetAddMany:
+    """Tests for adding cards from an iterable, maybe in threads."""
+
+
+    def _cards(self):
+        for i in range(12):
+            yield Image.new('RGBA', (20, 30), (i * 20, 100, 0, 255))
+
+
+    def test_workers_match_serial(self):
+        """Cards scaled in threads should be placed just as if added in order."""
+        serial   = ImageSheet(card_width = 10, card_height = 15, columns = 4, rows = 3)
+        threaded = ImageSheet(card_width = 10, card_height = 15, columns = 4, rows = 3)
+        serial.add_many(self._cards())
+        threaded.add_many(self._cards(), workers = 3)
+        assert serial.save() == threaded.save()
+
+
+    def test_cards_taken_as_needed(self):
+        """Only a few cards should be in progress at once."""
+        sheet   = ImageSheet(card_width = 10, card_height = 15, columns = 4, rows = 3)
+        taken   = 0
+        pasted  = 0
+        paste   = sheet._paste
+        backlog = []
+
+        def cards():
+            nonlocal taken
+            for card in self._cards():
+                taken += 1
+                backlog.append(taken - pasted)
+                yield card
+
+        def counting_paste(scaled_im):
+            nonlocal pasted
+            pasted += 1
+            paste(scaled_im)
+
+        sheet._paste = counting_paste
+        sheet.add_many(cards(), workers = 2)
+        assert pasted == 12
+        assert max(backlog) <= 4
+
+
+class TestImageSheetSaveOptions:
+    """Tests for the format and compression options when saving."""
+
+
+    def _sheet(self):
+        sheet = ImageSheet(card_width = 40, card_height = 60, columns = 5, rows = 4)
+        for i in range(20):
+            card = Image.effect_noise((40, 60), 10).convert('RGBA') if i % 4 == 0 else \
+                   Image.new('RGBA', (40, 60), (i * 12, 50, 100, 255))
+            sheet.add(card)
+        return sheet
+
+
+    def test_format_from_extension(self, tmp_path):
+        """The format should come from the filename's extension."""
+        self._sheet().save(tmp_path / 'sheet.webp')
+        assert Image.open(tmp_path / 'sheet.webp').format == 'WEBP'
+
+
+    def test_unknown_extension_raises_error(self, tmp_path):
+        with pytest.raises(ValueError):
+            self._sheet().save(tmp_path / 'sheet.nothing')
+
+
+    def test_jpeg_from_rgba(self):
+        """An RGBA sheet should save as a JPEG, losing its transparency."""
+        data = self._sheet().save(format = 'JPEG', quality = 90)
+        assert Image.open(io.BytesIO(data)).format == 'JPEG'
+
+
+    def test_jpeg_with_colours(self):
+        """A sheet reduced to a palette should still save as a JPEG."""
+        data = self._sheet().save(format = 'JPEG', colours = 16)
+        im   = Image.open(io.BytesIO(data))
+        assert (im.format, im.mode) == ('JPEG', 'RGB')
+
+
+    def test_compress_level(self):
+        """Compression should give a smaller PNG than none."""
+        sheet = self._sheet()
+        assert len(sheet.save(compress_level = 9)) < len(sheet.save(compress_level = 0))
+
+
+    def test_colours(self):
+        """Palette quantisation should give a palette PNG with few colours."""
+        im = Image.open(io.BytesIO(self._sheet().save(colours = 16)))
+        assert im.mode == 'P'
+        assert len(im.convert('RGBA').getcolors()) <= 16
+
+
+    def test_workers_same_pixels(self, monkeypatch):
+        """Saving in strips with workers should give the same image."""
+        monkeypatch.setattr('gamehelper.image_sheet.strip_bytes', 5000)
+        sheet    = self._sheet()
+        expected = Image.open(io.BytesIO(sheet.save()))
+        got      = Image.open(io.BytesIO(sheet.save(workers = 3, compress_level = 1)))
+        assert got.tobytes() == expected.tobytes()
+
+
+    def test_workers_to_filename(self, tmp_path):
+        """Saving with workers should work to a named file."""
+        sheet = self._sheet()
+        sheet.save(tmp_path / 'sheet.png', workers = 2)
+        assert Image.open(tmp_path / 'sheet.png').tobytes() == sheet._base_im.tobytes()
+
+
+    def test_workers_need_full_colour_png(self):
+        with pytest.raises(ValueError):
+            self._sheet().save(format = 'WEBP', workers = 2)
+        with pytest.raises(ValueError):
+            self._sheet().save(colours = 16, workers = 2)
@@ -0,0 +1,146 @@
+import io
+import pytest
+
+from PIL import Image
+
+from gamehelper.image_sheets import ImageSheets
+
+
+def _card(i):
+    """A card with its own colour, and some noise so it doesn't compress well."""
+    im = Image.effect_noise((10, 20), 40).convert('RGBA')
+    im.paste(Image.new('RGBA', (4, 4), (i * 10 % 256, 100, 200, 255)), (0, 0))
+    return im
+
+
+class TestImageSheetsGrid:
+    """Tests for choosing the grid of each sheet."""
+
+    def test_grid_fills_max_size(self):
+        """The grid should take up to the maximum width and height."""
+        sheets = ImageSheets(card_width = 10, card_height = 20, max_width = 45, max_height = 65)
+        assert sheets.grid(12) == (4, 3)
+
+    def test_grid_is_squarest(self):
+        """With only a card limit, the grid should be as square as possible."""
+        sheets = ImageSheets(card_width = 10, card_height = 10, max_cards = 12)
+        assert sheets.grid(12) == (4, 3)
+        assert sheets.grid(9) == (3, 3)
+
+    def test_grid_has_fewest_empty_places(self):
+        """The grid should leave as few empty places as it can."""
+        sheets = ImageSheets(card_width = 10, card_height = 10, max_width = 30)
+        assert sheets.grid(7) == (1, 7)
+        assert sheets.grid(8) == (2, 4)
+
+    def test_grid_too_many_cards_raises_error(self):
+        """Asking for a grid of more cards than fit is an error."""
+        sheets = ImageSheets(card_width = 10, card_height = 10, max_width = 30, max_height = 30)
+        with pytest.raises(ValueError):
+            sheets.grid(10)
+
+    def test_card_bigger_than_sheet_raises_error(self):
+        """A card must fit in the maximum sheet size."""
+        with pytest.raises(ValueError):
+            ImageSheets(card_width = 10, card_height = 10, max_width = 9)
+
+    def test_bad_output_options_raise_error(self):
+        """A bad mode or format should be an error straight away, not when encoding."""
+        with pytest.raises(ValueError):
+            ImageSheets(card_width = 10, card_height = 10, mode = 'CMYK')
+        with pytest.raises(ValueError):
+            ImageSheets(card_width = 10, card_height = 10, mode = 'RGB', colour = (0, 0, 0, 0))
+        with pytest.raises(ValueError):
+            ImageSheets(card_width = 10, card_height = 10, format = 'NOTHING')
+        ImageSheets(card_width = 10, card_height = 10, mode = 'RGB', format = 'webp')
+
+
+class TestImageSheetsSplit:
+    """Tests for splitting cards across sheets."""
+
+    cards = [_card(i) for i in range(13)]
+
+    def _sheets(self, count, **kwargs):
+        sheets = ImageSheets(card_width = 10, card_height = 20, **kwargs)
+        for card in self.cards[:count]:
+            sheets.add(card)
+        return sheets.sheets()
+
+    def test_splits_by_max_cards(self):
+        """Cards should go onto new sheets, and the last one should be smaller."""
+        sheets = self._sheets(10, max_cards = 4)
+        assert [(columns, rows, cards) for _, columns, rows, cards in sheets] == [(4, 1, 4),
+                                                                                (4, 1, 4),
+                                                                                (2, 1, 2),
+                                                                                ]
+        assert Image.open(io.BytesIO(sheets[2][0])).size == (20, 20)
+
+    def test_splits_by_max_size(self):
+        """No sheet should be bigger than the maximum size."""
+        for data, _, _, _ in self._sheets(13, max_width = 35, max_height = 45):
+            width, height = Image.open(io.BytesIO(data)).size
+            assert width <= 35 and height <= 45
+
+    def test_cards_stay_in_order(self):
+        """Cards should appear in the order added, across sheets."""
+        sheets = self._sheets(7, max_cards = 3)
+        card   = 0
+        for data, columns, rows, cards in sheets:
+            im = Image.open(io.BytesIO(data))
+            for place in range(cards):
+                x = place % columns * 10
+                y = place // columns * 20
+                assert im.getpixel((x, y))[0] == card * 10
+                card += 1
+        assert card == 7
+
+    def test_splits_by_max_bytes(self):
+        """A sheet that's too many bytes should be split up."""
+        whole = self._sheets(8, max_cards = 8)
+        assert len(whole) == 1
+        limit  = len(whole[0][0]) // 2
+        sheets = self._sheets(8, max_cards = 8, max_bytes = limit)
+        assert len(sheets) > 1
+        assert sum(cards for _, _, _, cards in sheets) == 8
+        assert all(len(data) <= limit for data, _, _, _ in sheets)
+
+    def test_card_too_many_bytes_raises_error(self):
+        """If one card is too many bytes on its own, that's an error."""
+        with pytest.raises(ValueError):
+            self._sheets(2, max_cards = 2, max_bytes = 10)
+
+    def test_workers_make_same_output(self):
+        """Encoding in background threads or not should give the same sheets."""
+        with_threads    = self._sheets(9, max_cards = 2, workers = 3)
+        without_threads = self._sheets(9, max_cards = 2, workers = None)
+        assert [bytes(sheet[0]) for sheet in with_threads] == [bytes(sheet[0]) for sheet in without_threads]
+
+    def test_save(self, tmp_path):
+        """Each sheet should be saved to a numbered file."""
+        sheets = ImageSheets(card_width = 10, card_height = 20, max_cards = 2)
+        for i in range(3):
+            sheets.add(_card(i))
+        filenames = sheets.save(str(tmp_path / 'deck-{}.png'))
+        assert filenames == [str(tmp_path / 'deck-1.png'), str(tmp_path / 'deck-2.png')]
+        assert Image.open(filenames[1]).size == (10, 20)
+
+    def test_save_needs_sheet_number(self, tmp_path):
+        """Several sheets can't all be saved to one filename."""
+        sheets = ImageSheets(card_width = 10, card_height = 20, max_cards = 2)
+        for i in range(3):
+            sheets.add(_card(i))
+        with pytest.raises(ValueError):
+            sheets.save(str(tmp_path / 'deck.png'))
+        assert list(tmp_path.iterdir()) == []
+
+    def test_save_one_sheet_without_number(self, tmp_path):
+        """A single sheet can be saved to a plain filename."""
+        sheets = ImageSheets(card_width = 10, card_height = 20)
+        sheets.add(_card(0))
+        assert sheets.save(str(tmp_path / 'deck.png')) == [str(tmp_path / 'deck.png')]
+
+    def test_count(self):
+        """A card added with a count should fill that many places, across sheets."""
+        sheets = ImageSheets(card_width = 10, card_height = 20, max_cards = 4)
+        sheets.add(self.cards[0], count = 6)
+        assert [cards for _, _, _, cards in sheets.sheets()] == [4, 2]
@@ -1,8 +1,11 @@
+import io
 import re
 import time
 import pytest
 from datetime import datetime, timezone
 
+from PIL import Image
+
 from gamehelper.pdf_sheets import PDFSheets
 
 
@@ -70,3 +73,432 @@ class TestPDFSheetsOutput:
         ts_str        = match.group(1).decode()
         creation_date = datetime.strptime(ts_str, '%Y%m%d%H%M%S').replace(tzinfo = timezone.utc)
         assert before <= creation_date <= after
+
+
+class TestPDFSheetsAddAll:
+
+
+    def _cards(self, count):
+        """Generate distinct plain card images."""
+        for i in range(count):
+            yield Image.new('RGB', (63, 88), (i * 10, 0, 0))
+
+
+    def test_add_all_accepts_generator(self, tmp_path):
+        """Should add every card from a generator."""
+        sheets = PDFSheets(card_width = 63, card_height = 88)
+        sheets.add_all(self._cards(12))
+        sheets.add_backs_page()
+        assert sheets.pdf.pages_count == 4
+
+
+    def test_add_all_matches_add(self, tmp_path):
+        """Adding cards via add_all() should give the same PDF as add()."""
+        back = Image.new('RGB', (63, 88), (0, 0, 255))
+
+        a = PDFSheets(card_width = 63, card_height = 88)
+        for card in self._cards(5):
+            a.add(card, back = back)
+        a.add('tests/100x150.png')
+        a.add_backs_page()
+        a.output(str(tmp_path / 'a.pdf'))
+
+        b = PDFSheets(card_width = 63, card_height = 88)
+        b.add_all(self._cards(5), back = back)
+        b.add_all([('tests/100x150.png', None)])
+        b.add_backs_page()
+        b.output(str(tmp_path / 'b.pdf'))
+
+        assert (tmp_path / 'a.pdf').read_bytes() == (tmp_path / 'b.pdf').read_bytes()
+
+
+    def test_backs_are_not_held_as_images(self):
+        """Pending backs should be held by name, not as decoded images."""
+        sheets = PDFSheets(card_width = 63, card_height = 88)
+        sheets.add(Image.new('RGB', (63, 88)), back = Image.new('RGB', (63, 88)))
+        name, x, y = sheets.backs[0]
+        assert isinstance(name, str)
+
+
+    def test_back_filename_loaded_once(self):
+        """A back given by filename should only be loaded once."""
+        sheets = PDFSheets(card_width = 63, card_height = 88)
+        for card in self._cards(3):
+            sheets.add(card, back = 'tests/100x150.png')
+        assert len(sheets.pdf.image_cache.images) == 4
+
+
+    def test_no_backs_loaded_when_excluded(self):
+        """Backs shouldn't be loaded if they're not going to be included."""
+        sheets = PDFSheets(card_width = 63, card_height = 88, include_backs = False)
+        sheets.add(Image.new('RGB', (63, 88)), back = 'tests/100x150.png')
+        assert sheets.backs[0][0] is None
+
+
+class TestPDFSheetsWorkers:
+
+
+    def _build(self, path, **kwargs):
+        """Build a small deck, with backs, and return the PDF's bytes."""
+        sheets = PDFSheets(card_width = 63, card_height = 88, **kwargs)
+        back   = Image.new('RGB', (71, 96), (0, 0, 255))
+        for i in range(10):
+            sheets.add(Image.new('RGB', (71, 96), (i * 20, 0, 0)), back = back)
+            sheets.add('tests/100x150.png', back = 'tests/100x150.png')
+        sheets.add_backs_page()
+        sheets.output(str(path))
+        return path.read_bytes()
+
+
+    def test_workers_output_matches_serial(self, tmp_path):
+        """Encoding images in worker processes should give identical output."""
+        serial   = self._build(tmp_path / 'serial.pdf')
+        parallel = self._build(tmp_path / 'parallel.pdf', workers = 2)
+        assert serial == parallel
+
+
+    def test_pending_cards_placed_before_output(self, tmp_path):
+        """Cards still being encoded should be placed by the time of output."""
+        sheets = PDFSheets(card_width = 63, card_height = 88, workers = 2)
+        sheets.add(Image.new('RGB', (71, 96)))
+        sheets.output(str(tmp_path / 'out.pdf'))
+        assert len(sheets._pending) == 0
+        assert len(sheets.pdf.image_cache.images) == 1
+
+
+class TestPDFSheetsEncoding:
+
+
+    def _photo(self):
+        """An image with many colours, like a photograph."""
+        return Image.merge('RGB', [Image.effect_noise((200, 200), 60) for _ in range(3)])
+
+
+    def _only_image(self, sheets):
+        """The image info of the only image in the sheets."""
+        sheets._place_pending()
+        images = list(sheets.pdf.image_cache.images.values())
+        assert len(images) == 1
+        return images[0]
+
+
+    def test_dpi_downsamples_large_images(self):
+        """An image with more pixels than the dpi needs should be reduced."""
+        sheets = PDFSheets(card_width = 63, card_height = 88, dpi = 72)
+        sheets.add(Image.new('RGB', (1000, 1000)))
+        info = self._only_image(sheets)
+        # Card with gutters is 71mm x 96mm, which is 202 x 273 pixels at 72dpi
+        assert (info['w'], info['h']) == (202, 273)
+
+
+    def test_dpi_leaves_small_images(self):
+        """An image with fewer pixels than the dpi needs should be unchanged."""
+        sheets = PDFSheets(card_width = 63, card_height = 88, dpi = 300)
+        sheets.add('tests/100x150.png')
+        info = self._only_image(sheets)
+        assert (info['w'], info['h']) == (100, 150)
+
+
+    def test_jpeg_encoding(self):
+        """The JPEG encoding should store images as JPEGs."""
+        sheets = PDFSheets(card_width = 63, card_height = 88, encoding = 'jpeg')
+        sheets.add(Image.new('RGB', (100, 100), (255, 0, 0)))
+        assert self._only_image(sheets)['f'] == 'DCTDecode'
+
+
+    def test_jpeg_encoding_keeps_transparency(self):
+        """Images with transparency can't be JPEGs, so should be lossless."""
+        sheets = PDFSheets(card_width = 63, card_height = 88, encoding = 'jpeg')
+        sheets.add(Image.new('RGBA', (100, 100), (255, 0, 0, 128)))
+        info = self._only_image(sheets)
+        assert info['f'] == 'FlateDecode'
+        assert 'smask' in info
+
+
+    def test_auto_encoding_flat_art_is_lossless(self):
+        """The auto encoding should keep flat-colour art lossless."""
+        sheets = PDFSheets(card_width = 63, card_height = 88, encoding = 'auto')
+        sheets.add(Image.new('RGB', (100, 100), (255, 0, 0)))
+        assert self._only_image(sheets)['f'] == 'FlateDecode'
+
+
+    def test_auto_encoding_photo_is_jpeg(self):
+        """The auto encoding should store photographic images as JPEGs."""
+        sheets = PDFSheets(card_width = 63, card_height = 88, encoding = 'auto')
+        sheets.add(self._photo())
+        assert self._only_image(sheets)['f'] == 'DCTDecode'
+
+
+    def test_encoding_per_card(self):
+        """A card's encoding should override the sheet's."""
+        sheets = PDFSheets(card_width = 63, card_height = 88, encoding = 'jpeg')
+        sheets.add(self._photo(), encoding = 'lossless')
+        assert self._only_image(sheets)['f'] == 'FlateDecode'
+
+
+    def test_unknown_encoding_raises_error(self):
+        """An unknown encoding should be rejected."""
+        with pytest.raises(ValueError):
+            PDFSheets(card_width = 63, card_height = 88, encoding = 'gif')
+
+
+class TestPDFSheetsPassthrough:
+
+
+    def _image_info(self, sheets, name):
+        """The image info for the named image in the sheets."""
+        sheets._place_pending()
+        return sheets.pdf.image_cache.images[name]
+
+
+    def test_png_data_used_as_is(self, tmp_path):
+        """An RGB PNG's compressed data should go into the PDF unchanged."""
+        path = str(tmp_path / 'card.png')
+        Image.effect_noise((71, 96), 30).convert('RGB').save(path)
+
+        sheets = PDFSheets(card_width = 63, card_height = 88)
+        sheets.add(path)
+        info = self._image_info(sheets, path)
+
+        assert info['f'] == 'FlateDecode'
+        assert info['data'] in (tmp_path / 'card.png').read_bytes()
+
+
+    def test_png_with_alpha_is_decoded(self, tmp_path):
+        """A PNG with an alpha channel can't be used as is."""
+        path = str(tmp_path / 'card.png')
+        Image.new('RGBA', (71, 96), (255, 0, 0, 128)).save(path)
+
+        sheets = PDFSheets(card_width = 63, card_height = 88)
+        sheets.add(path)
+        info = self._image_info(sheets, path)
+
+        assert 'smask' in info
+        assert not(info['data'] in (tmp_path / 'card.png').read_bytes())
+
+
+    def test_unusual_png_left_to_fpdf(self, tmp_path):
+        """A PNG that's cut short or odd should give no info, not an error."""
+        from gamehelper.pdf_sheets import _png_info
+
+        path = tmp_path / 'card.png'
+        Image.effect_noise((71, 96), 30).convert('RGB').save(str(path))
+        data = path.read_bytes()
+        assert not(_png_info(str(path)) is None)
+
+        # Cut short in a chunk's header, in its data, and before any IDAT
+
+        for end in (len(data) - 5, len(data) - 20, 8 + 8 + 13 + 4, 8 + 4):
+            path.write_bytes(data[:end])
+            assert _png_info(str(path)) is None
+
+        # An IHDR of the wrong length
+
+        path.write_bytes(data[:8] + b'\x00\x00\x00\x02IHDR\x00\x00' + b'\x00' * 4 + data[8 + 8 + 13 + 4:])
+        assert _png_info(str(path)) is None
+
+
+    def test_jpeg_back_used_as_is(self, tmp_path):
+        """A JPEG back should go into the PDF unchanged."""
+        path = str(tmp_path / 'back.jpg')
+        Image.new('RGB', (71, 96), (0, 0, 255)).save(path)
+
+        sheets = PDFSheets(card_width = 63, card_height = 88)
+        sheets.add(Image.new('RGB', (71, 96)), back = path)
+        info = self._image_info(sheets, path)
+
+        assert info['f'] == 'DCTDecode'
+        assert info['data'] == (tmp_path / 'back.jpg').read_bytes()
+
+
+    def test_svg_drawn_by_fpdf(self, tmp_path):
+        """An SVG card or back should be drawn by fpdf, as a vector image."""
+        for workers in (None, 2):
+            sheets = PDFSheets(card_width = 63, card_height = 88, workers = workers)
+            sheets.add('tests/128x128.svg', back = 'tests/128x128.svg', count = 2)
+            sheets.add_all([('tests/128x128.svg', None)])
+            sheets.add_backs_page()
+            sheets.output(str(tmp_path / 'cards.pdf'))
+
+            assert sheets.pdf.image_cache.images == {}
+            assert (tmp_path / 'cards.pdf').read_bytes().startswith(b'%PDF')
+
+
+class TestPDFSheetsShards:
+
+
+    def _deck(self):
+        """A deck of cards with backs, some of them from files."""
+        for i in range(30):
+            if i % 3 == 0:
+                yield ('tests/100x150.png', 'tests/100x150.png')
+            else:
+                yield (Image.new('RGB', (71, 96), (i * 8, 0, 0)), None)
+
+
+    def _build(self, path, shard_pages = 1, **kwargs):
+        """Build the deck, starting part way through a page."""
+        sheets = PDFSheets(card_width = 63, card_height = 88, **kwargs)
+        sheets.add(Image.new('RGB', (71, 96)))
+        sheets.add_all(self._deck(), shard_pages = shard_pages)
+        sheets.add_backs_page()
+        sheets.output(str(path))
+        return path.read_bytes()
+
+
+    def test_cards_per_page(self):
+        """Should count how many cards fit on a page."""
+        assert PDFSheets(card_width = 63, card_height = 88).cards_per_page == 8
+        assert PDFSheets(card_width = 63, card_height = 88, gutter = 0).cards_per_page == 8
+        assert PDFSheets(card_width = 40, card_height = 40, gutter = 0).cards_per_page == 35
+
+
+    def test_shards_match_serial(self, tmp_path):
+        """Encoding shards in workers should give identical output."""
+        serial = self._build(tmp_path / 'serial.pdf')
+        assert self._build(tmp_path / 'a.pdf', workers = 2) == serial
+        assert self._build(tmp_path / 'b.pdf', workers = 2, shard_pages = 3) == serial
+
+
+    def test_shards_are_page_aligned(self, tmp_path, monkeypatch):
+        """The first shard should fill the current page, and the rest whole pages."""
+        sizes = []
+        original = PDFSheets._prepare_shard
+
+        def spy(self, shard):
+            sizes.append(len(shard))
+            return original(self, shard)
+
+        monkeypatch.setattr(PDFSheets, '_prepare_shard', spy)
+        self._build(tmp_path / 'out.pdf', workers = 2)
+        assert sizes == [7, 8, 8, 7]
+
+
+class TestPDFSheetsOutputTargets:
+
+
+    def _sheets(self):
+        """Sheets with a single card."""
+        sheets = PDFSheets(card_width = 63, card_height = 88)
+        sheets.add('tests/100x150.png')
+        sheets.add_backs_page()
+        return sheets
+
+
+    def test_output_returns_bytes(self, tmp_path):
+        """With no file, output() should return the same bytes it would write."""
+        self._sheets().output(str(tmp_path / 'out.pdf'))
+        pdf_bytes = self._sheets().output()
+        assert isinstance(pdf_bytes, memoryview)
+        assert pdf_bytes == (tmp_path / 'out.pdf').read_bytes()
+
+
+    def test_output_to_file_object(self, tmp_path):
+        """output() should write to a binary file object."""
+        self._sheets().output(str(tmp_path / 'out.pdf'))
+        buffer = io.BytesIO()
+        assert self._sheets().output(buffer) is None
+        assert buffer.getvalue() == (tmp_path / 'out.pdf').read_bytes()
+
+
+    def test_output_to_path(self, tmp_path):
+        """output() should accept a path object."""
+        self._sheets().output(tmp_path / 'out.pdf')
+        assert (tmp_path / 'out.pdf').read_bytes().startswith(b'%PDF')
+
+
+    def test_output_writes_in_chunks(self, monkeypatch):
+        """A file object should be written to in chunks."""
+        monkeypatch.setattr('gamehelper.pdf_sheets.output_chunk_size', 1000)
+        writes = []
+
+        class Recorder:
+            def write(self, data):
+                writes.append(len(data))
+
+        self._sheets().output(Recorder())
+        assert len(writes) > 1
+        assert max(writes) == 1000
+
+
+class TestPDFSheetsDedup:
+
+
+    def _spy(self, monkeypatch):
+        """Record the images that get encoded."""
+        calls = []
+        import gamehelper.pdf_sheets as pdf_sheets
+        original = pdf_sheets._encode_image
+
+        def spy(*job):
+            calls.append(job[0])
+            return original(*job)
+
+        monkeypatch.setattr(pdf_sheets, '_encode_image', spy)
+        return calls
+
+
+    def test_same_image_encoded_once(self, monkeypatch):
+        """The same image added again should only be encoded once."""
+        calls  = self._spy(monkeypatch)
+        sheets = PDFSheets(card_width = 63, card_height = 88)
+        card   = Image.new('RGB', (71, 96), 'gold')
+        for i in range(5):
+            sheets.add(card)
+        sheets.add(Image.new('RGB', (71, 96), 'silver'))
+        assert len(calls) == 2
+
+
+    def test_identical_images_encoded_once(self, monkeypatch):
+        """Separate but identical images should only be encoded once."""
+        calls  = self._spy(monkeypatch)
+        sheets = PDFSheets(card_width = 63, card_height = 88)
+        for i in range(5):
+            sheets.add(Image.new('RGB', (71, 96), 'gold'))
+        sheets.add(Image.new('RGB', (71, 96), 'silver'))
+        assert len(calls) == 2
+
+
+    def test_changed_image_encoded_again(self):
+        """An image drawn on after it's added should be a new image when added again."""
+        sheets = PDFSheets(card_width = 63, card_height = 88)
+        card   = Image.new('RGB', (71, 96), 'gold')
+        sheets.add(card)
+        card.paste((0, 0, 255), (10, 10, 30, 30))
+        sheets.add(card)
+        sheets.add_backs_page()
+        assert len(sheets.pdf.image_cache.images) == 2
+
+
+    def test_identical_images_stored_once(self):
+        """Separate but identical images should only be stored in the PDF once."""
+        sheets = PDFSheets(card_width = 63, card_height = 88)
+        for i in range(5):
+            sheets.add(Image.new('RGB', (71, 96), 'gold'))
+        sheets.add(Image.new('RGB', (71, 96), 'silver'))
+        sheets.add_backs_page()
+        assert len(sheets.pdf.image_cache.images) == 2
+
+
+    def test_count_matches_repeated_adds(self, tmp_path, monkeypatch):
+        """Adding a card with a count should be the same as adding it repeatedly."""
+        def build(path, use_count):
+            sheets = PDFSheets(card_width = 63, card_height = 88)
+            card   = Image.new('RGB', (71, 96), 'gold')
+            if use_count:
+                sheets.add(card, back = 'tests/100x150.png', count = 12)
+            else:
+                for _ in range(12):
+                    sheets.add(card, back = 'tests/100x150.png')
+            sheets.add_backs_page()
+            sheets.output(str(path))
+            return path.read_bytes()
+
+        counted  = build(tmp_path / 'a.pdf', True)
+        repeated = build(tmp_path / 'b.pdf', False)
+        assert counted == repeated
+
+        calls  = self._spy(monkeypatch)
+        sheets = PDFSheets(card_width = 63, card_height = 88)
+        sheets.add(Image.new('RGB', (71, 96), 'gold'), back = 'tests/100x150.png', count = 12)
+        assert len(calls) == 2
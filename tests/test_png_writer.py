@@ -0,0 +1,84 @@
+import io
+import pytest
+
+from PIL import Image
+
+from gamehelper.png_writer import PNGWriter
+
+
+class TestPNGWriter:
+
+
+    def _image(self, mode):
+        """An image with some variety in it."""
+        im = Image.effect_noise((40, 30), 50).convert(mode)
+        im.paste(Image.new(mode, (10, 10), 'red'), (5, 5))
+        return im
+
+
+    def _write(self, im, band_height):
+        """Write an image in bands and read it back."""
+        buffer = io.BytesIO()
+        writer = PNGWriter(buffer, im.width, im.height, mode = im.mode)
+        for top in range(0, im.height, band_height):
+            writer.write(im.crop((0, top, im.width, min(top + band_height, im.height))))
+        writer.close()
+        buffer.seek(0)
+        return Image.open(buffer)
+
+
+    def test_rgba_round_trip(self):
+        """An RGBA image written in bands should read back the same."""
+        im = self._image('RGBA')
+        back = self._write(im, 7)
+        assert back.mode == 'RGBA'
+        assert back.tobytes() == im.tobytes()
+
+
+    def test_rgb_round_trip(self):
+        """An RGB image written in bands should read back the same."""
+        im = self._image('RGB')
+        back = self._write(im, 30)
+        assert back.mode == 'RGB'
+        assert back.tobytes() == im.tobytes()
+
+
+    def test_unknown_mode_raises_error(self):
+        """Only RGB and RGBA are supported."""
+        with pytest.raises(ValueError):
+            PNGWriter(io.BytesIO(), 10, 10, mode = 'CMYK')
+
+
+    def test_wrong_width_raises_error(self):
+        """A band must be the full width of the image."""
+        writer = PNGWriter(io.BytesIO(), 10, 10)
+        with pytest.raises(ValueError):
+            writer.write(Image.new('RGBA', (9, 5)))
+
+
+    def test_too_many_rows_raises_error(self):
+        """Bands can't go beyond the height of the image."""
+        writer = PNGWriter(io.BytesIO(), 10, 10)
+        writer.write(Image.new('RGBA', (10, 5)))
+        with pytest.raises(ValueError):
+            writer.write(Image.new('RGBA', (10, 6)))
+
+
+    def test_close_before_all_rows_raises_error(self):
+        """The PNG can't be finished until all rows are written."""
+        writer = PNGWriter(io.BytesIO(), 10, 10)
+        writer.write(Image.new('RGBA', (10, 5)))
+        with pytest.raises(ValueError):
+            writer.close()
+
+
+    def test_workers_round_trip(self):
+        """Bands compressed by workers should read back the same."""
+        im     = self._image('RGBA')
+        buffer = io.BytesIO()
+        writer = PNGWriter(buffer, im.width, im.height, workers = 2)
+        for top in range(0, im.height, 4):
+            writer.write(im.crop((0, top, im.width, min(top + 4, im.height))))
+        writer.close()
+        buffer.seek(0)
+        assert Image.open(buffer).tobytes() == im.tobytes()
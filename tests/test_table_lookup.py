@@ -0,0 +1,50 @@
+import pytest
+
+from gamehelper.table_lookup import TableLookup
+
+
+class TestTableLookup:
+
+
+    def make_lookup(self):
+        return TableLookup(['Cost', 'Fire', 'Ice', None, 'Fire'],
+                           ['Cost', 'Fire', 'Ice', None],
+                           [['Cost', 'Fire', 'Ice', None],
+                            ['Fire', 1   , 2    , 'x' ],
+                            ['Ice' , 3   , 4    , None],
+                            [None  , 5   , 6    , None],
+                            ['Fire', 7   , 8    , None],
+                            ])
+
+
+    def test_value(self):
+        costs = self.make_lookup()
+
+        assert costs.value('Fire', 'Ice') == 2
+        assert costs['Ice', 'Fire'] == 3
+        assert ('Ice', 'Ice') in costs
+        assert not(('Ice', 'Water') in costs)
+
+        # The first of a repeated name is used, and blanks are ignored
+
+        assert costs['Fire', 'Fire'] == 1
+        with pytest.raises(LookupError):
+            costs[None, 'Fire']
+
+
+    def test_missing(self):
+        costs = self.make_lookup()
+
+        with pytest.raises(LookupError) as excinfo:
+            costs.value('Water', 'Fire')
+        assert 'Cannot find' in str(excinfo.value)
+
+        with pytest.raises(LookupError):
+            costs.value('Fire', 'Water')
+
+
+    def test_bad_shapes(self):
+        with pytest.raises(ValueError):
+            TableLookup(['A', 'B'], ['A'], [['A']])
+        with pytest.raises(ValueError):
+            TableLookup(['A'], ['A', 'B'], [['A']])
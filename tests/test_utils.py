@@ -1,6 +1,8 @@
 import pytest
 
-from gamehelper.utils import optimise, box, insert_new_lines
+from PIL import Image
+
+from gamehelper.utils import optimise, box, insert_new_lines, resize
 
 
 class TestOptimise:
@@ -350,3 +352,30 @@ class TestInsertNewLines:
         result = insert_new_lines("+1 Recognition if you voted Yes and Gov Auth inc'd", 12)
         for line in result.split('\n'):
             assert len(line) <= 12
+
+
+class TestResize:
+    """Tests for the resize() function."""
+
+    def test_each_policy_gives_size(self):
+        """Each policy should shrink and enlarge to the size asked for."""
+        im = Image.effect_noise((300, 200), 30).convert('RGBA')
+        for resampling in ['draft', 'fast', 'final']:
+            assert resize(im, (25, 20), resampling).size == (25, 20)
+            assert resize(im, (600, 400), resampling).size == (600, 400)
+
+    def test_flat_colour_kept(self):
+        """A flat colour should stay the same colour."""
+        im = Image.new('RGBA', (400, 300), (10, 20, 30, 255))
+        for resampling in ['draft', 'fast', 'final']:
+            assert resize(im, (40, 30), resampling).getcolors() == [(1200, (10, 20, 30, 255))]
+
+    def test_fast_same_as_pillow_default(self):
+        """The default policy should give just what a plain resize() does."""
+        im = Image.effect_noise((900, 600), 30).convert('RGBA')
+        for size in [(25, 20), (450, 300), (1200, 800)]:
+            assert resize(im, size).tobytes() == im.resize(size = size).tobytes()
+
+    def test_unknown_policy_raises_error(self):
+        with pytest.raises(ValueError, match = "one of \\['draft', 'fast', 'final'\\], but got 'best'"):
+            resize(Image.new('RGBA', (10, 10)), (5, 5), 'best')
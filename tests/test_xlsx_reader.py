@@ -0,0 +1,292 @@
+import datetime
+import json
+import os
+import pickle
+import struct
+import subprocess
+import sys
+
+import pytest
+
+import openpyxl
+from   openpyxl import Workbook
+
+from gamehelper             import xlsx_reader
+from gamehelper.excelhelper import ExcelHelper
+from test_excelhelper       import make_named_tables
+from gamehelper.xlsx_reader import XLSXCell, XLSXWorkbook, column_letter, coordinate_to_tuple, open_workbook, \
+                                  pack_cells, unpack_cells
+
+
+class Exploit:
+    def __reduce__(self):
+        return (pytest.fail, ('The snapshot was unpickled',))
+
+
+class TestXLSXReader:
+
+
+    def make_workbook(self, tmp_path):
+        filename = str(tmp_path / 'test.xlsx')
+        wb = Workbook()
+
+        ws = wb.active
+        ws.title = 'First'
+        ws['A1'] = 'Text'
+        ws['B1'] = 3
+        ws['C1'] = 2.5
+        ws['D1'] = True
+        ws['E1'] = datetime.datetime(2024, 5, 6, 7, 8, 9)
+        ws['F1'] = datetime.time(10, 30)
+        ws['G1'] = datetime.timedelta(hours = 30)
+        ws['H1'] = '=B1*2'
+        ws['A2'] = 45000
+        ws['A2'].number_format = 'yyyy-mm-dd'
+        ws['B2'] = 0.5
+        ws['B2'].number_format = '"Days" 0.00'
+        ws['AB30'] = 'Far'
+        ws['A3'] = 'Text'
+
+        ws2 = wb.create_sheet('Second')
+        ws2['B2'] = 'Second'
+        wb.active = ws2
+
+        wb.save(filename)
+        return filename
+
+
+    def test_values_match_openpyxl(self, tmp_path):
+        filename = self.make_workbook(tmp_path)
+        expected = openpyxl.load_workbook(filename, data_only = True)
+        wb       = XLSXWorkbook(filename)
+
+        assert wb.sheetnames == ['First', 'Second']
+        for ws in expected:
+            values = {k: cell.value for k, cell in ws._cells.items() if not(cell.value is None)}
+            assert {k: cell.value for k, cell in wb[ws.title]._cells.items()} == values
+
+        ws = wb['First']
+        assert type(ws['B1'].value) is int
+        assert type(ws['C1'].value) is float
+        assert ws['A2'].value == datetime.datetime(2023, 3, 15)
+        assert ws['B2'].value == 0.5
+
+        # Formulas give the cached value, which openpyxl doesn't save
+
+        assert ws['H1'].value is None
+
+        wb.close()
+
+
+    def test_worksheets(self, tmp_path):
+        wb = XLSXWorkbook(self.make_workbook(tmp_path))
+
+        assert wb.active.title == 'Second'
+        wb.active = wb['First']
+        assert wb.active.title == 'First'
+        wb.active = 1
+        assert wb.active.title == 'Second'
+
+        with pytest.raises(KeyError):
+            wb['Third']
+
+        ws = wb['First']
+        assert (ws.max_row, ws.max_column) == (30, 28)
+        assert ws['AB30'].coordinate == 'AB30'
+        assert ws.cell(row = 30, column = 28).value == 'Far'
+        assert list(ws.iter_rows(min_row = 1, max_row = 2, max_col = 3, values_only = True)) \
+            == [('Text', 3, 2.5), (datetime.datetime(2023, 3, 15), 0.5, None)]
+
+        ws.cell(row = 4, column = 1, value = 'New')
+        assert ws['A4'].value == 'New'
+
+
+    def test_coordinates(self):
+        assert column_letter(1) == 'A'
+        assert column_letter(26) == 'Z'
+        assert column_letter(28) == 'AB'
+        assert column_letter(703) == 'AAA'
+        assert coordinate_to_tuple('AB30') == (30, 28)
+        assert coordinate_to_tuple('$C$4') == (4, 3)
+
+        with pytest.raises(ValueError):
+            coordinate_to_tuple('30AB')
+
+
+    def test_excel_helper_values_only(self, tmp_path):
+        xh = ExcelHelper(self.make_workbook(tmp_path), values_only = True)
+
+        assert type(xh.wb) is XLSXWorkbook
+        assert xh.find('Second').coordinate == 'B2'
+
+        xh.wb.active = xh.wb['First']
+        assert xh.find_value_beside('Text') == 3
+        assert xh.find('Far').coordinate == 'AB30'
+        assert xh.find_values_beside('A1')[:3] == [3, 2.5, True]
+
+        xh.put_values_below('A3', ['Below'])
+        assert xh.find('Below').coordinate == 'A4'
+        xh.put_table('A31', [['Bottom', 1]])
+        assert xh.find_value_beside('Bottom') == 1
+
+        xh.close()
+
+
+    def test_snapshot(self, tmp_path, monkeypatch):
+        filename  = self.make_workbook(tmp_path)
+        cache_dir = str(tmp_path / 'cache')
+
+        wb = open_workbook(filename, cache_dir)
+        assert wb._snapshot is None
+        values = {ws.title: {k: cell.value for k, cell in ws._cells.items()} for ws in wb}
+        wb.close()
+        assert len(os.listdir(cache_dir)) == 1
+
+        # The header is JSON, and nothing in a snapshot is unpickled
+
+        with open(os.path.join(cache_dir, os.listdir(cache_dir)[0]), 'rb') as f:
+            length, = struct.unpack('<Q', f.read(8))
+            assert json.loads(f.read(length))['path'] == os.path.abspath(filename)
+
+        # Unchanged, so read the snapshot
+
+        wb = open_workbook(filename, cache_dir)
+        assert not(wb._snapshot is None)
+        assert wb.active.title == 'Second'
+        assert wb.epoch == XLSXWorkbook(filename).epoch
+        assert {ws.title: {k: cell.value for k, cell in ws._cells.items()} for ws in wb} == values
+        wb.close()
+
+        # Touched but the same, so still read the snapshot, and note the
+        # new time so the file needn't be hashed again
+
+        stat = os.stat(filename)
+        os.utime(filename, ns = (stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        wb = open_workbook(filename, cache_dir)
+        assert not(wb._snapshot is None)
+        wb.close()
+
+        def no_hashing(filename):
+            raise AssertionError('The file was hashed')
+
+        monkeypatch.setattr(xlsx_reader, 'file_hash', no_hashing)
+        wb = open_workbook(filename, cache_dir)
+        assert not(wb._snapshot is None)
+        wb.close()
+        monkeypatch.undo()
+
+        # Changed, so read the file again
+
+        changed = Workbook()
+        changed.active['A1'] = 'Changed'
+        changed.save(filename)
+        wb = open_workbook(filename, cache_dir)
+        assert wb._snapshot is None
+        assert wb.active['A1'].value == 'Changed'
+        wb.close()
+
+        wb = open_workbook(filename, cache_dir)
+        assert not(wb._snapshot is None)
+        assert wb.active['A1'].value == 'Changed'
+        wb.close()
+
+
+    def test_pack_cells(self):
+        values = ['Text', 3, -2**63, 2**70, 2.5, True, datetime.datetime(1805, 5, 6, 7, 8, 9, 10),
+                  datetime.time(10, 30, 1, 5), datetime.timedelta(hours = -30), 'Text']
+        cells  = {(r, r % 3 + 1): XLSXCell(r, r % 3 + 1, value) for r, value in enumerate(values, 1)}
+
+        blob, layout = pack_cells(cells)
+        unpacked     = unpack_cells(memoryview(blob), layout)
+        assert [(k, cell.value, type(cell.value)) for k, cell in unpacked.items()] \
+            == [(k, cell.value, type(cell.value)) for k, cell in cells.items()]
+
+        with pytest.raises(ValueError):
+            unpack_cells(blob[:-1], layout)
+
+        # The kinds of value come after the rows and columns
+
+        damaged = bytearray(blob)
+        damaged[8 * len(cells)] = 99
+        with pytest.raises(ValueError):
+            unpack_cells(damaged, layout)
+
+
+    def test_bad_snapshot_is_ignored(self, tmp_path):
+        filename  = self.make_workbook(tmp_path)
+        cache_dir = str(tmp_path / 'cache')
+        open_workbook(filename, cache_dir).close()
+
+        snapshot = os.path.join(cache_dir, os.listdir(cache_dir)[0])
+        with open(snapshot, 'wb') as f:
+            f.write(b'Not a snapshot')
+
+        wb = open_workbook(filename, cache_dir)
+        assert wb._snapshot is None
+        assert wb['First']['A1'].value == 'Text'
+        wb.close()
+
+        # A pickle that would run code if it were loaded is just ignored
+
+        payload = pickle.dumps(Exploit())
+        with open(snapshot, 'wb') as f:
+            f.write(struct.pack('<Q', len(payload)) + payload)
+
+        wb = open_workbook(filename, cache_dir)
+        assert wb._snapshot is None
+        wb.close()
+
+
+    def test_unwritable_cache_dir(self, tmp_path):
+        filename = self.make_workbook(tmp_path)
+        blocker  = tmp_path / 'blocker'
+        blocker.write_bytes(b'')
+
+        wb = open_workbook(filename, str(blocker / 'cache'))
+        assert wb['First']['A1'].value == 'Text'
+        wb.close()
+
+
+    def test_excel_helper_cache_dir(self, tmp_path):
+        filename  = self.make_workbook(tmp_path)
+        cache_dir = str(tmp_path / 'cache')
+
+        for _ in range(2):
+            xh = ExcelHelper(filename, values_only = True, cache_dir = cache_dir)
+            assert xh.find('Second').coordinate == 'B2'
+            xh.close()
+
+        with pytest.raises(ValueError):
+            ExcelHelper(filename, cache_dir = cache_dir)
+
+
+    def test_named_tables(self, tmp_path):
+        filename  = str(tmp_path / 'tables.xlsx')
+        cache_dir = str(tmp_path / 'cache')
+        make_named_tables().save(filename)
+
+        for _ in range(2):
+            xh = ExcelHelper(filename, values_only = True, cache_dir = cache_dir)
+
+            table = xh.wb["Bob's cards"].tables['Cards']
+            assert (table.ref, table.headerRowCount, table.totalsRowCount) == ('B3:C7', 1, 1)
+            assert table.column_names == ['Name', 'Cost']
+            assert xh.wb.defined_names['Prices'].attr_text == "'Bob''s cards'!$B$3:$C$4"
+
+            assert xh.named_dicts('Cards') == ExcelHelper(filename).named_dicts('Cards')
+            assert xh.named_table('Prices') == [['Fire', 3]]
+            assert xh.named_table('Local') == [[3], [None], [2]]
+
+            xh.wb.active = xh.wb["Bob's cards"]
+            assert xh.sheet_tables() == {'Cards': xh.named_dicts('Cards')}
+            xh.close()
+
+
+    def test_excel_helper_needs_no_openpyxl(self, tmp_path):
+        filename = self.make_workbook(tmp_path)
+        script   = ('import sys;'
+                    'from gamehelper.excelhelper import ExcelHelper;'
+                    f'xh = ExcelHelper({filename!r}, values_only = True);'
+                    'xh.find("Second");'
+                    'assert not("openpyxl" in sys.modules)')
+        subprocess.run([sys.executable, '-c', script], check = True)